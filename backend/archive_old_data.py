@@ -0,0 +1,46 @@
+"""
+Script to archive old notifications and orders
+Moves notifications and finished orders past their retention horizon to the
+archive tables (see services/archive_service.py). Safe to run from cron while
+the API is running; concurrent runs are skipped.
+
+Usage: python archive_old_data.py [--notification-days N] [--order-days N]
+"""
+import argparse
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+from services.archive_service import (
+    run_archival, NOTIFICATION_RETENTION_DAYS, ORDER_RETENTION_DAYS, ARCHIVE_BATCH_SIZE
+)
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old notifications and orders")
+    parser.add_argument("--notification-days", type=int, default=NOTIFICATION_RETENTION_DAYS)
+    parser.add_argument("--order-days", type=int, default=ORDER_RETENTION_DAYS)
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+    
+    print("=" * 60)
+    print("Archiving Old Notifications and Orders")
+    print("=" * 60)
+    print(f"   Notifications older than {args.notification_days} days")
+    print(f"   Delivered/cancelled orders older than {args.order_days} days")
+    
+    result = run_archival(
+        notification_retention_days=args.notification_days,
+        order_retention_days=args.order_days,
+        batch_size=args.batch_size
+    )
+    
+    if result['skipped']:
+        print("⏭️  Another archival run is in progress, skipping")
+        return
+    
+    print(f"✅ Archived {result['notifications']} notifications")
+    print(f"✅ Archived {result['orders']} orders")
+    print(f"✅ Deleted {result['webhook_events']} webhook events")
+
+if __name__ == "__main__":
+    main()
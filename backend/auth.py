@@ -1,26 +1,32 @@
 """
 JWT Authentication utilities
 """
+import hmac
+import os
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from repositories.user_repo import get_user_by_id
+from repositories.user_repo import get_user_principal
 
 # JWT Configuration
 SECRET_KEY = "your-secret-key-change-in-production-use-env-variable"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 1440  # 24 hours
 
+# Operator token for debugging and metrics endpoints (unset: those endpoints are disabled)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
 security = HTTPBearer()
 
-def create_access_token(user_id: str, restaurant_id: str) -> str:
+def create_access_token(user_id: str, restaurant_id: str, token_version: int = 0) -> str:
     """Create JWT access token"""
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode = {
         "sub": user_id,
         "restaurant_id": restaurant_id,
+        "ver": token_version,
         "exp": expire
     }
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
@@ -41,9 +47,15 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security))
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        # Verify user exists using repository
-        user = get_user_by_id(user_id)
-        if not user or user.restaurant_id != restaurant_id:
+        # Verify user still exists, is active and the token was not revoked.
+        # The principal is cached briefly, so this rarely touches the database.
+        principal = get_user_principal(user_id)
+        if (
+            not principal or
+            not principal["is_active"] or
+            principal["restaurant_id"] != restaurant_id or
+            principal["token_version"] != payload.get("ver", 0)
+        ):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid authentication credentials",
@@ -58,6 +70,32 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security))
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+def create_delivery_access_token(delivery_person_id: str) -> str:
+    """Create JWT access token for a delivery person"""
+    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    to_encode = {
+        "sub": delivery_person_id,
+        "role": "delivery",
+        "exp": expire
+    }
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+def get_current_delivery_person_id(credentials: HTTPAuthorizationCredentials = Depends(security)) -> str:
+    """Verify a delivery person JWT and return the delivery person ID"""
+    try:
+        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        payload = {}
+    
+    delivery_person_id = payload.get("sub")
+    if payload.get("role") != "delivery" or delivery_person_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid authentication credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return delivery_person_id
+
 def get_current_restaurant_id(
     token_data: dict = Depends(verify_token)
 ) -> str:
@@ -69,3 +107,10 @@ def get_current_user_id(
 ) -> str:
     """Get current user ID from token"""
     return token_data["user_id"]
+
+def verify_admin_token(x_admin_token: Optional[str] = Header(None, alias="X-Admin-Token")):
+    """Require the operator token (ADMIN_TOKEN) in the X-Admin-Token header"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
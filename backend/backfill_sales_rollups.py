@@ -0,0 +1,44 @@
+"""
+Script to (re)build the sales rollup tables
+Recomputes restaurant_sales_hourly and restaurant_item_sales_daily from orders
+and orders_archive, one UTC day per transaction. Run once after applying
+migrations/add_sales_rollups.sql; new orders are rolled up as they are written.
+Safe to run while the API is running.
+
+Usage: python backfill_sales_rollups.py [--start YYYY-MM-DD] [--end YYYY-MM-DD]
+       (defaults to the full order history)
+"""
+import argparse
+import sys
+import os
+from datetime import date
+sys.path.insert(0, os.path.dirname(__file__))
+
+from repositories.sales_rollup_repo import get_order_date_range, rebuild_sales_rollups
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild sales rollups from orders")
+    parser.add_argument("--start", type=date.fromisoformat, help="First UTC day to rebuild")
+    parser.add_argument("--end", type=date.fromisoformat, help="Last UTC day to rebuild")
+    args = parser.parse_args()
+    
+    print("=" * 60)
+    print("Rebuilding Sales Rollups")
+    print("=" * 60)
+    
+    start, end = args.start, args.end
+    if start is None or end is None:
+        order_range = get_order_date_range()
+        if order_range is None:
+            print("ℹ️  No orders found, nothing to do")
+            return
+        start = start or order_range[0]
+        end = end or order_range[1]
+    
+    print(f"   Days {start} to {end}")
+    result = rebuild_sales_rollups(start, end)
+    print(f"✅ Rebuilt {result['days']} days")
+    print(f"✅ {result['hourly_rows']} hourly rows, {result['item_rows']} item rows")
+
+if __name__ == "__main__":
+    main()
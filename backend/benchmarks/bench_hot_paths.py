@@ -0,0 +1,407 @@
+"""
+Benchmark: repository and conversion hot paths
+Times the functions on the per-request paths at several data sizes and stores
+the results as JSON, so an optimization (or a regression) shows up as a number:
+
+    order_db_to_model             items per order: 1, 5, 25 (ORM instances)
+    order_from_row                items per order: 1, 5, 25 (Core row tuples)
+    order_to_response             items per order: 1, 5, 25
+    restaurant_db_to_model        restaurants converted: 1, 100, 1000 (ORM instances)
+    restaurant_from_row           restaurants converted: 1, 100, 1000 (Core row tuples)
+    find_restaurants_by_location  restaurants in the geo index: 100, 1k, 10k
+    render_menu_messages          menu items: 10, 100, 500 (the menu text sent
+                                  on WhatsApp, formerly format_menu_message)
+    calculate_restaurant_rating   orders per restaurant: 100, 1k, 5k    (--db)
+    generate_next_id              synthetic orders in the table: 400, 4k, 20k (--db)
+    get_orders_by_restaurant      a page of 50 orders, orders per restaurant: 100, 1k, 5k (--db)
+
+The first seven run in memory. The --db cases seed synthetic tenants
+(benchmarks/synthetic_data.py) into DATABASE_URL and remove them afterwards.
+
+Each case is timed with timeit: the call count is calibrated to at least
+--min-time seconds, repeated 5 times, and the best and median time per call
+are recorded. Comparisons use the best time (the least noisy). The conversion
+and order listing cases also record the memory allocated by one call
+(tracemalloc): retained_bytes is what the returned objects keep alive, peak_bytes
+the high-water mark while the call runs.
+
+Usage:
+    python benchmarks/bench_hot_paths.py run [--db] [--output baseline.json]
+    python benchmarks/bench_hot_paths.py run [--db] --compare baseline.json [--threshold 0.15]
+    python benchmarks/bench_hot_paths.py compare baseline.json current.json [--threshold 0.15]
+
+compare (and run --compare) exit with status 1 when a case is slower than the
+baseline by more than the threshold (default 15%). Record the baseline on the
+machine that runs the comparison.
+
+The committed reference baseline is benchmarks/baselines/hot_paths.json (run
+with --db). Its "reference" block records the machine it was taken on (CPU
+model and count, Python, PostgreSQL); against it, only compare runs from the
+same kind of machine, or re-record it there first:
+
+    python benchmarks/bench_hot_paths.py run --db --output benchmarks/baselines/hot_paths.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_data import generate_tenants
+
+ITEMS_PER_ORDER = [1, 5, 25]
+RESTAURANT_BATCHES = [1, 100, 1_000]
+GEO_INDEX_SIZES = [100, 1_000, 10_000]
+MENU_SIZES = [10, 100, 500]
+ORDERS_PER_RESTAURANT = [100, 1_000, 5_000]
+
+REPEATS = 5
+DEFAULT_THRESHOLD = 0.15
+
+
+def measure(func: Callable[[], object], min_time: float) -> Dict:
+    """Time per call of func: best and median of REPEATS calibrated runs"""
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    if elapsed < min_time:
+        number = max(1, int(number * min_time / max(elapsed, 1e-9)))
+    per_call = [total / number for total in timer.repeat(repeat=REPEATS, number=number)]
+    return {
+        'best_us': min(per_call) * 1e6,
+        'median_us': statistics.median(per_call) * 1e6,
+        'number': number,
+        'repeats': REPEATS,
+    }
+
+
+def measure_memory(func: Callable[[], object]) -> Dict:
+    """Bytes allocated by one call of func (after a warm-up call)"""
+    func()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        result = func()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return {'retained_bytes': current - before, 'peak_bytes': peak - before}
+
+
+def _decimal(value) -> Optional[Decimal]:
+    return None if value is None else Decimal(str(value))
+
+
+# -------------------------------
+# In-memory cases
+# -------------------------------
+
+def _order_fixture():
+    """One synthetic order row (values as the database returns them) and its product rows"""
+    data = generate_tenants(restaurants=1, products=max(ITEMS_PER_ORDER), customers=10, orders=1)
+    order_row = dict(data.tenants[0].orders[0])
+    for column in ('delivery_fee', 'subtotal', 'total_amount'):
+        order_row[column] = _decimal(order_row[column])
+    order_row['customer_rating'] = Decimal("4.50")
+    return order_row, data.tenants[0].products
+
+
+def bench_order_db_to_model(min_time: float) -> Dict[str, Dict]:
+    from model_converters import order_db_to_model
+    from models_db import OrderDB, OrderItemDB
+
+    order_row, products = _order_fixture()
+    db_order = OrderDB(**order_row)
+
+    results = {}
+    for count in ITEMS_PER_ORDER:
+        db_items = [
+            OrderItemDB(id=f"item_{i}", order_id=db_order.id, product_id=product['id'],
+                        product_name=product['name'], quantity=2, price=_decimal(product['price']))
+            for i, product in enumerate(products[:count])
+        ]
+        convert = lambda: order_db_to_model(db_order, db_items)
+        results[f"order_db_to_model[items={count}]"] = {**measure(convert, min_time), **measure_memory(convert)}
+    return results
+
+
+def bench_order_from_row(min_time: float) -> Dict[str, Dict]:
+    from model_converters import ORDER_COLUMNS, order_from_row, order_item_from_row
+
+    order_row, products = _order_fixture()
+    # Numeric columns are selected as float (see model_converters.ORDER_COLUMNS)
+    row = tuple(
+        float(order_row[column.key]) if isinstance(order_row.get(column.key), Decimal) else order_row.get(column.key)
+        for column in ORDER_COLUMNS
+    )
+
+    results = {}
+    for count in ITEMS_PER_ORDER:
+        item_rows = [(row[0], product['id'], product['name'], 2, float(product['price']))
+                     for product in products[:count]]
+        convert = lambda: order_from_row(row, [order_item_from_row(item_row) for item_row in item_rows])
+        results[f"order_from_row[items={count}]"] = {**measure(convert, min_time), **measure_memory(convert)}
+    return results
+
+
+def bench_order_to_response(min_time: float) -> Dict[str, Dict]:
+    from models.order import Order, OrderItem
+    from routers.orders import order_to_response
+
+    order_row, products = _order_fixture()
+    results = {}
+    for count in ITEMS_PER_ORDER:
+        order = Order(
+            id=order_row['id'], restaurant_id=order_row['restaurant_id'], customer_id=order_row['customer_id'],
+            customer_phone=order_row['customer_phone'], customer_name=order_row['customer_name'],
+            items=[OrderItem(product['id'], product['name'], 2, float(product['price']))
+                   for product in products[:count]],
+            order_type=order_row['order_type'], delivery_fee=float(order_row['delivery_fee']),
+            total_amount=float(order_row['total_amount']), status=order_row['status'],
+            created_at=order_row['created_at'].isoformat(), updated_at=order_row['updated_at'].isoformat(),
+            delivery_address=order_row['delivery_address'], customer_rating=4.5,
+        )
+        convert = lambda: order_to_response(order)
+        results[f"order_to_response[items={count}]"] = {**measure(convert, min_time), **measure_memory(convert)}
+    return results
+
+
+def bench_restaurant_db_to_model(min_time: float) -> Dict[str, Dict]:
+    from model_converters import restaurant_db_to_model
+    from models_db import RestaurantDB
+
+    data = generate_tenants(restaurants=max(RESTAURANT_BATCHES), products=0, customers=1, orders=0)
+    db_restaurants = []
+    for row in data.restaurants:
+        row = dict(row)
+        for column in ('latitude', 'longitude', 'delivery_fee'):
+            row[column] = _decimal(row[column])
+        db_restaurants.append(RestaurantDB(upi_password="", upi_qr_code="", **row))
+
+    results = {}
+    for count in RESTAURANT_BATCHES:
+        batch = db_restaurants[:count]
+        results[f"restaurant_db_to_model[restaurants={count}]"] = measure(
+            lambda: [restaurant_db_to_model(db_restaurant) for db_restaurant in batch], min_time
+        )
+    return results
+
+
+def bench_restaurant_from_row(min_time: float) -> Dict[str, Dict]:
+    from model_converters import RESTAURANT_COLUMNS, restaurant_from_row
+
+    data = generate_tenants(restaurants=max(RESTAURANT_BATCHES), products=0, customers=1, orders=0)
+    rows = [tuple({**row, 'upi_password': "", 'upi_qr_code': ""}[column.key] for column in RESTAURANT_COLUMNS)
+            for row in data.restaurants]
+
+    results = {}
+    for count in RESTAURANT_BATCHES:
+        batch = rows[:count]
+        results[f"restaurant_from_row[restaurants={count}]"] = measure(
+            lambda: [restaurant_from_row(row) for row in batch], min_time
+        )
+    return results
+
+
+def bench_find_restaurants_by_location(min_time: float) -> Dict[str, Dict]:
+    from geo_index import RestaurantGeoIndex
+    from models.restaurant import Restaurant
+    from repositories import restaurant_repo
+    from synthetic_data import CENTER_LAT, CENTER_LON
+
+    data = generate_tenants(restaurants=max(GEO_INDEX_SIZES), products=0, customers=1, orders=0)
+    restaurants = [Restaurant(**row) for row in data.restaurants]
+    rng = random.Random(7)
+    ratings = {
+        restaurant.id: {'overall_rating': rng.uniform(3.0, 5.0), 'customer_rating': None,
+                        'total_orders': rng.randint(0, 500)}
+        for restaurant in restaurants
+    }
+
+    shared_index = restaurant_repo.restaurant_geo_index
+    results = {}
+    try:
+        for count in GEO_INDEX_SIZES:
+            # An index without loaders: searches never reach the database
+            index = RestaurantGeoIndex()
+            index.load(restaurants[:count], ratings)
+            restaurant_repo.restaurant_geo_index = index
+            results[f"find_restaurants_by_location[restaurants={count}]"] = measure(
+                lambda: restaurant_repo.find_restaurants_by_location(CENTER_LAT, CENTER_LON, radius_km=10.0),
+                min_time
+            )
+    finally:
+        restaurant_repo.restaurant_geo_index = shared_index
+    return results
+
+
+def bench_render_menu_messages(min_time: float) -> Dict[str, Dict]:
+    from models.product import Product
+    from services.menu_message_service import render_menu_messages
+
+    data = generate_tenants(restaurants=1, products=max(MENU_SIZES), customers=1, orders=0)
+    products = [Product(**row) for row in data.tenants[0].products]
+    results = {}
+    for count in MENU_SIZES:
+        menu = products[:count]
+        results[f"render_menu_messages[items={count}]"] = measure(
+            lambda: render_menu_messages("Spice Garden", "spicegarden@upi", menu), min_time
+        )
+    return results
+
+
+# -------------------------------
+# Database cases
+# -------------------------------
+
+def bench_database(min_time: float) -> Dict[str, Dict]:
+    from id_generator import generate_next_id
+    from repositories.order_repo import get_orders_by_restaurant
+    from repositories.rating_repo import calculate_restaurant_rating
+    from synthetic_data import cleanup_database, seed_database
+
+    results = {}
+    try:
+        for count in ORDERS_PER_RESTAURANT:
+            data = generate_tenants(restaurants=4, products=30, customers=200, orders=count)
+            seed_database(data)
+            restaurant_id = data.restaurants[0]['id']
+            results[f"calculate_restaurant_rating[orders={count}]"] = measure(
+                lambda: calculate_restaurant_rating(restaurant_id), min_time
+            )
+            # Plus the orders already in the database
+            results[f"generate_next_id[orders={count * len(data.tenants)}]"] = measure(
+                lambda: generate_next_id("orders"), min_time
+            )
+            list_page = lambda: get_orders_by_restaurant(restaurant_id, limit=50)
+            results[f"get_orders_by_restaurant[orders={count},page=50]"] = {
+                **measure(list_page, min_time), **measure_memory(list_page)
+            }
+    finally:
+        cleanup_database()
+    return results
+
+
+# -------------------------------
+# Commands
+# -------------------------------
+
+def run(include_db: bool, min_time: float) -> Dict:
+    cases = [bench_order_db_to_model, bench_order_from_row, bench_order_to_response,
+             bench_restaurant_db_to_model, bench_restaurant_from_row,
+             bench_find_restaurants_by_location, bench_render_menu_messages]
+    if include_db:
+        cases.append(bench_database)
+
+    results = {}
+    for case in cases:
+        for name, result in case(min_time).items():
+            results[name] = result
+            memory = f"{result['retained_bytes']:>10} B kept" if 'retained_bytes' in result else ""
+            print(f"{name:<52}{result['best_us']:>12.2f} us{result['median_us']:>12.2f} us (median){memory}")
+    return {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'reference': reference_machine(include_db),
+        'results': results,
+    }
+
+
+def _cpu_model() -> str:
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def reference_machine(include_db: bool) -> Dict:
+    """What the numbers were measured on (results only compare on similar machines)"""
+    import sqlalchemy
+
+    reference = {
+        'cpu': _cpu_model(),
+        'cpus': os.cpu_count(),
+        'python': f"{platform.python_implementation()} {platform.python_version()}",
+        'os': platform.platform(),
+        'sqlalchemy': sqlalchemy.__version__,
+    }
+    if include_db:
+        from sqlalchemy import text
+        from database import engine
+        with engine.connect() as conn:
+            reference['postgres'] = conn.execute(text("SHOW server_version")).scalar()
+    return reference
+
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> bool:
+    """Print the change of every case; returns False if any case regressed beyond threshold"""
+    print(f"\n{'case':<52}{'baseline us':>14}{'current us':>14}{'change':>9}")
+    ok = True
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            print(f"{name:<52}{'-':>14}{result['best_us']:>14.2f}{'new':>9}")
+            continue
+        change = result['best_us'] / base['best_us'] - 1
+        regressed = change > threshold
+        ok = ok and not regressed
+        print(f"{name:<52}{base['best_us']:>14.2f}{result['best_us']:>14.2f}{change:>+8.1%}"
+              f"{'  REGRESSION' if regressed else ''}")
+    for name in baseline['results'].keys() - current['results'].keys():
+        print(f"{name:<52}{'(not run)':>14}")
+    print(f"\n{'OK' if ok else 'FAILED'}: threshold {threshold:.0%} (best time per call)")
+    return ok
+
+
+def _load(path: str) -> Dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hot path micro-benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--db", action="store_true", help="include the database cases (uses DATABASE_URL)")
+    run_parser.add_argument("--min-time", type=float, default=0.2, help="seconds per timing run")
+    run_parser.add_argument("--output", help="write the results (e.g. a new baseline) to this file")
+    run_parser.add_argument("--compare", metavar="BASELINE", help="compare with a baseline file")
+    run_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        sys.exit(0 if compare(_load(args.baseline), _load(args.current), args.threshold) else 1)
+
+    if args.db and not os.getenv("DATABASE_URL"):
+        sys.exit("Set DATABASE_URL for the database cases (synthetic rows are added and removed)")
+    current = run(args.db, args.min_time)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+        print(f"Results written to {args.output}")
+    if args.compare and not compare(_load(args.compare), current, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark: password verification on login
+Measures login (bcrypt verify) throughput through the password hashing pool
+with 1..N worker threads, and how long the event loop is blocked while a burst
+of logins is processed inline vs. in the pool. Runs fully in memory.
+
+Usage: python benchmarks/bench_login.py [rounds]
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.password_service import PasswordHasher
+
+ROUNDS = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+LOGINS_PER_WORKER = 8
+PASSWORD = "correct horse battery staple"
+
+
+async def measure_loop_lag(stop: asyncio.Event) -> float:
+    """Largest delay seen by a 5ms ticker while the burst runs"""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.005)
+        worst = max(worst, time.perf_counter() - start - 0.005)
+    return worst
+
+
+async def login_burst(hasher: PasswordHasher, stored: str, logins: int, inline: bool):
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+    await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    if inline:
+        for _ in range(logins):
+            assert hasher.verify_sync(PASSWORD, stored)
+            await asyncio.sleep(0)
+    else:
+        results = await asyncio.gather(*(hasher.verify(PASSWORD, stored) for _ in range(logins)))
+        assert all(results)
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    return logins / elapsed, await lag_task * 1000
+
+
+async def run():
+    cpus = os.cpu_count() or 1
+    worker_counts = sorted({1, 2, 4, cpus} | ({cpus // 2} if cpus > 4 else set()))
+    stored = PasswordHasher(rounds=ROUNDS, max_workers=1).hash_sync(PASSWORD)
+
+    print("=" * 66)
+    print(f"Login benchmark (bcrypt rounds={ROUNDS}, {cpus} CPUs)")
+    print("=" * 66)
+    print(f"{'mode':<14} {'workers':>8} {'logins/s':>12} {'speedup':>10} {'max loop lag ms':>16}")
+
+    baseline = None
+    for workers in worker_counts:
+        hasher = PasswordHasher(rounds=ROUNDS, max_workers=workers)
+        logins = LOGINS_PER_WORKER * workers
+        if baseline is None:
+            baseline, lag_ms = await login_burst(hasher, stored, logins, inline=True)
+            print(f"{'inline':<14} {'-':>8} {baseline:>12.1f} {1.0:>9.1f}x {lag_ms:>16.1f}")
+        throughput, lag_ms = await login_burst(hasher, stored, logins, inline=False)
+        print(f"{'pool':<14} {workers:>8} {throughput:>12.1f} {throughput / baseline:>9.1f}x {lag_ms:>16.1f}")
+        hasher.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
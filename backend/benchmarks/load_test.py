@@ -0,0 +1,316 @@
+"""
+Benchmark: end-to-end load test of the API
+Seeds synthetic tenants (benchmarks/synthetic_data.py) and drives the FastAPI
+app in-process (httpx ASGI transport, one event loop like one uvicorn worker)
+with two kinds of virtual users:
+
+    customers   WhatsApp conversation on /whatsapp (hi -> share location ->
+                pick a restaurant), menu load, order placement (70% COD,
+                30% online with a payment link and one status poll)
+    staff       one per restaurant: dashboard order list, then polls for
+                changes, moves open orders along (preparing -> ready ->
+                delivered) and loads the dashboard stats now and then
+
+Twilio and Razorpay are replaced by local stubs (optionally with an
+artificial latency), so nothing leaves the machine. Reports throughput and
+p50/p95/p99 latency per endpoint.
+
+Requires httpx (pip install httpx) and a database with the schema
+(init-db.sql + migrations); the synthetic rows are removed afterwards (--keep
+to leave them).
+
+Usage: DATABASE_URL=postgresql://... python benchmarks/load_test.py
+           [--restaurants 20] [--customers 50] [--duration 30] [--json results.json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import sys
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic_data import ID_PREFIX, customer_phone, generate_tenants, seed_database, cleanup_database
+
+MENU_LINK = re.compile(r"/menu/([^?\s<]+)\?token=")
+NEXT_STATUS = {"pending": "preparing", "preparing": "ready", "ready": "delivered"}
+
+
+# -------------------------------
+# External service stubs
+# -------------------------------
+
+class _StubTwilioMessages:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def create(self, from_=None, to=None, body=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)  # Blocking like the real client (send_whatsapp_message runs it in a thread)
+        return type("StubMessage", (), {"sid": f"SM{uuid.uuid4().hex}"})()
+
+
+class StubTwilioClient:
+    latency = 0.0
+
+    def __init__(self, *args, **kwargs):
+        self.messages = _StubTwilioMessages(StubTwilioClient.latency)
+
+
+class _StubPaymentLinks:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.links: Dict[str, Dict] = {}
+
+    def create(self, data: Dict) -> Dict:
+        if self.latency:
+            time.sleep(self.latency)
+        link_id = f"plink_{ID_PREFIX}{uuid.uuid4().hex[:14]}"
+        link = {
+            "id": link_id, "status": "created", "amount": data["amount"],
+            "notes": data.get("notes", {}), "short_url": f"https://rzp.io/l/{link_id}",
+        }
+        self.links[link_id] = link
+        return link
+
+    def fetch(self, link_id: str) -> Dict:
+        if self.latency:
+            time.sleep(self.latency)
+        return self.links[link_id]
+
+
+class StubRazorpayClient:
+    def __init__(self, latency: float):
+        self.payment_link = _StubPaymentLinks(latency)
+
+
+def install_stubs(twilio_latency: float, razorpay_latency: float):
+    import twilio.rest
+    from services import payment_service
+
+    StubTwilioClient.latency = twilio_latency
+    twilio.rest.Client = StubTwilioClient
+    payment_service.razorpay_client = StubRazorpayClient(razorpay_latency)
+
+
+# -------------------------------
+# Measurements
+# -------------------------------
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def request(self, client, name: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except Exception:
+            self.errors[name] += 1
+            raise
+        self.latencies[name].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[name] += 1
+        return response
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an unsorted list"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))]
+
+
+def summarize(recorder: Recorder, elapsed: float) -> Dict:
+    endpoints = {}
+    for name in sorted(recorder.latencies):
+        values = recorder.latencies[name]
+        endpoints[name] = {
+            'requests': len(values),
+            'errors': recorder.errors.get(name, 0),
+            'throughput_rps': len(values) / elapsed,
+            'p50_ms': percentile(values, 0.50) * 1000,
+            'p95_ms': percentile(values, 0.95) * 1000,
+            'p99_ms': percentile(values, 0.99) * 1000,
+        }
+    total = sum(len(values) for values in recorder.latencies.values())
+    return {'elapsed_seconds': elapsed, 'requests': total, 'throughput_rps': total / elapsed,
+            'endpoints': endpoints}
+
+
+def print_summary(summary: Dict):
+    print(f"\n{'endpoint':<24}{'requests':>10}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, stats in summary['endpoints'].items():
+        print(f"{name:<24}{stats['requests']:>10}{stats['errors']:>8}{stats['throughput_rps']:>9.1f}"
+              f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}")
+    print(f"\nTotal: {summary['requests']} requests in {summary['elapsed_seconds']:.1f}s "
+          f"({summary['throughput_rps']:.1f} req/s)")
+
+
+# -------------------------------
+# Virtual users
+# -------------------------------
+
+async def whatsapp(client, recorder: Recorder, label: str, customer: Dict, phone: str, **fields):
+    data = {"From": f"whatsapp:{phone}", "MessageSid": f"{ID_PREFIX}{uuid.uuid4().hex}",
+            "ProfileName": customer['name'], **fields}
+    return await recorder.request(client, label, "POST", "/whatsapp", data=data)
+
+
+async def customer_user(client, recorder: Recorder, data, index: int, deadline: float,
+                        think: float, rng: random.Random):
+    customer = data.customers[index % len(data.customers)]
+    phone = customer_phone(index % len(data.customers))
+    while time.monotonic() < deadline:
+        await whatsapp(client, recorder, "whatsapp: greeting", customer, phone, Body="hi")
+        await asyncio.sleep(think)
+        await whatsapp(client, recorder, "whatsapp: location", customer, phone, Body="",
+                       Latitude=str(customer['latitude']), Longitude=str(customer['longitude']))
+        await asyncio.sleep(think)
+        reply = await whatsapp(client, recorder, "whatsapp: select", customer, phone, Body="1")
+        match = MENU_LINK.search(reply.text)
+        restaurant_id = match.group(1) if match else rng.choice(data.restaurants)['id']
+        await asyncio.sleep(think)
+
+        menu = await recorder.request(client, "menu: public", "GET", f"/api/public/menu/{restaurant_id}")
+        products = [item for item in menu.json()["menu"]
+                    if item["is_available"]] if menu.status_code == 200 else []
+        if not products:
+            continue
+        await asyncio.sleep(think)
+
+        items = [{"product_id": item["id"], "quantity": rng.randint(1, 3), "price": item["price"]}
+                 for item in rng.sample(products, min(len(products), rng.randint(1, 3)))]
+        online = rng.random() < 0.3
+        order = await recorder.request(client, "orders: create", "POST", "/api/v1/orders", json={
+            "restaurant_id": restaurant_id,
+            "customer_name": customer['name'],
+            "customer_phone": phone,
+            "items": items,
+            "total_amount": sum(item["quantity"] * item["price"] for item in items),
+            "payment_method": "online" if online else "cod",
+            "delivery_address": "Synthetic address, Lucknow",
+        })
+        link_id = order.json().get("razorpay_payment_link_id") if order.status_code == 201 else None
+        if link_id:
+            await asyncio.sleep(think)
+            await recorder.request(client, "payments: status", "GET", f"/api/v1/payments/status/{link_id}")
+        await asyncio.sleep(think)
+
+
+async def staff_user(client, recorder: Recorder, tenant, deadline: float, poll: float):
+    import auth
+
+    headers = {"Authorization": f"Bearer {auth.create_access_token(tenant.user['id'], tenant.restaurant['id'])}"}
+    orders = await recorder.request(client, "orders: list", "GET", "/api/v1/orders", headers=headers)
+    open_orders = {order["id"]: order["status"] for order in (orders.json() if orders.status_code == 200 else [])
+                   if order["status"] in NEXT_STATUS}
+    changes = await recorder.request(client, "orders: changes", "GET", "/api/v1/orders/changes", headers=headers)
+    watermark = changes.json().get("watermark") if changes.status_code == 200 else None
+
+    polls = 0
+    while time.monotonic() < deadline:
+        await asyncio.sleep(poll)
+        polls += 1
+        changes = await recorder.request(client, "orders: changes", "GET", "/api/v1/orders/changes",
+                                         headers=headers, params={"since": watermark} if watermark else None)
+        if changes.status_code == 200:
+            body = changes.json()
+            watermark = body.get("watermark") or watermark
+            for order in body.get("orders", []):
+                if order["status"] in NEXT_STATUS:
+                    open_orders[order["id"]] = order["status"]
+                else:
+                    open_orders.pop(order["id"], None)
+
+        if open_orders:
+            order_id, current = next(iter(open_orders.items()))
+            update = await recorder.request(client, "orders: update status", "PATCH",
+                                            f"/api/v1/orders/{order_id}/status",
+                                            headers=headers, json={"status": NEXT_STATUS[current]})
+            new_status = update.json().get("status") if update.status_code == 200 else None
+            if new_status in NEXT_STATUS:
+                open_orders[order_id] = new_status
+            else:
+                open_orders.pop(order_id, None)
+
+        if polls % 5 == 0:
+            await recorder.request(client, "dashboard: stats", "GET", "/api/v1/dashboard/stats", headers=headers)
+
+
+async def run_load(data, customers: int, staff: int, duration: float, think: float, poll: float,
+                   seed: int) -> Dict:
+    import httpx
+    from main import app
+
+    recorder = Recorder()
+    rng = random.Random(seed)
+    # Unhandled errors become 500 responses (counted as errors) as under uvicorn
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as client:
+        start = time.monotonic()
+        deadline = start + duration
+        tasks = [customer_user(client, recorder, data, i, deadline, think, random.Random(rng.random()))
+                 for i in range(customers)]
+        tasks += [staff_user(client, recorder, tenant, deadline, poll) for tenant in data.tenants[:staff]]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        elapsed = time.monotonic() - start
+    failures = [result for result in results if isinstance(result, Exception)]
+    if failures:
+        print(f"⚠️ {len(failures)} virtual users stopped with an error, first: {failures[0]!r}")
+    return summarize(recorder, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end load test with synthetic tenants")
+    parser.add_argument("--restaurants", type=int, default=20)
+    parser.add_argument("--products", type=int, default=30, help="menu items per restaurant")
+    parser.add_argument("--history", type=int, default=200, help="historical orders per restaurant")
+    parser.add_argument("--customers", type=int, default=50, help="concurrent customer conversations")
+    parser.add_argument("--staff", type=int, default=None, help="dashboards polling (default: one per restaurant)")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of traffic")
+    parser.add_argument("--think-ms", type=float, default=100, help="customer pause between steps")
+    parser.add_argument("--poll-ms", type=float, default=1000, help="dashboard poll interval")
+    parser.add_argument("--twilio-ms", type=float, default=0, help="artificial Twilio API latency")
+    parser.add_argument("--razorpay-ms", type=float, default=0, help="artificial Razorpay API latency")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--keep", action="store_true", help="keep the synthetic data afterwards")
+    args = parser.parse_args()
+
+    if not os.getenv("DATABASE_URL"):
+        sys.exit("Set DATABASE_URL to the database to load (synthetic rows are added to it)")
+    logging.disable(logging.WARNING)  # Per-request logging would dominate the measurements
+
+    install_stubs(args.twilio_ms / 1000, args.razorpay_ms / 1000)
+    data = generate_tenants(args.restaurants, args.products, max(args.customers, 1) * 4,
+                            args.history, seed=args.seed)
+    print(f"Seeding {args.restaurants} restaurants, {args.restaurants * args.products} products, "
+          f"{len(data.customers)} customers, {args.restaurants * args.history} orders...")
+    seed_database(data)
+    try:
+        staff = args.restaurants if args.staff is None else args.staff
+        print(f"Running {args.customers} customers and {staff} dashboards for {args.duration:.0f}s...")
+        summary = asyncio.run(run_load(data, args.customers, staff, args.duration,
+                                       args.think_ms / 1000, args.poll_ms / 1000, args.seed))
+    finally:
+        if not args.keep:
+            cleanup_database()
+
+    summary['parameters'] = vars(args)
+    print_summary(summary)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
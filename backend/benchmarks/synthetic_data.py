@@ -0,0 +1,251 @@
+"""
+Synthetic tenants for benchmarks
+Generates N restaurants with owners, menus, customers and order history,
+scaled up from the shapes of the demo data in data/*_data.py (names,
+descriptions, categories, prices and cuisine types are cycled with variations).
+
+Everything generated is recognizable, so a run can be cleaned up from a
+shared development database:
+    restaurant, user, product, order and order item IDs start with "lt_"
+    customer phone numbers start with +9171
+
+Usage from a benchmark:
+    tenants = generate_tenants(restaurants=20, products=30, customers=200, orders=200)
+    seed_database(tenants)
+    ...
+    cleanup_database()
+"""
+import os
+import random
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.customers_data import CUSTOMERS
+from data.products_data import PRODUCTS
+from data.restaurants_data import RESTAURANTS
+
+ID_PREFIX = "lt_"
+PHONE_PREFIX = "+9171"
+
+# Synthetic tenants are spread over a ~30km box around Lucknow (as the demo data)
+CENTER_LAT, CENTER_LON = 26.8467, 80.9462
+SPREAD_DEGREES = 0.15
+
+# Order history: share of each final status, the rest is still open
+HISTORY_STATUSES = [("delivered", 0.80), ("cancelled", 0.08), ("ready", 0.04),
+                    ("preparing", 0.04), ("pending", 0.04)]
+
+INSERT_CHUNK = 1000
+
+
+@dataclass
+class Tenant:
+    """One restaurant with its owner, menu and order history (rows as column dicts)"""
+    restaurant: Dict
+    user: Dict
+    products: List[Dict] = field(default_factory=list)
+    orders: List[Dict] = field(default_factory=list)
+    order_items: List[Dict] = field(default_factory=list)
+
+
+@dataclass
+class SyntheticData:
+    tenants: List[Tenant]
+    customers: List[Dict]
+
+    @property
+    def restaurants(self) -> List[Dict]:
+        return [tenant.restaurant for tenant in self.tenants]
+
+
+def _restaurant_row(index: int, rng: random.Random) -> Dict:
+    template = list(RESTAURANTS.values())[index % len(RESTAURANTS)]
+    return {
+        'id': f"{ID_PREFIX}r{index:06d}",
+        'name': f"{template.name} {index + 1}",
+        'phone': f"+9180{index:08d}",
+        'address': template.address,
+        'latitude': CENTER_LAT + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES),
+        'longitude': CENTER_LON + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES),
+        'delivery_fee': template.delivery_fee,
+        'is_active': True,
+        'upi_id': f"loadtest{index}@upi",
+        'cuisine_type': template.cuisine_type,
+    }
+
+
+def _product_rows(restaurant_id: str, count: int, rng: random.Random) -> List[Dict]:
+    templates = list(PRODUCTS.values())
+    rows = []
+    for i in range(count):
+        template = templates[(i + rng.randrange(len(templates))) % len(templates)]
+        rows.append({
+            'id': f"{restaurant_id}_p{i:04d}",
+            'restaurant_id': restaurant_id,
+            'name': f"{template.name} #{i + 1}",
+            'description': template.description,
+            'price': round(template.price * rng.uniform(0.8, 1.3)),
+            'category': template.category,
+            'is_available': rng.random() > 0.05,
+        })
+    return rows
+
+
+def customer_phone(index: int) -> str:
+    return f"{PHONE_PREFIX}{index:08d}"
+
+
+def _customer_rows(count: int, rng: random.Random) -> List[Dict]:
+    templates = list(CUSTOMERS.values())
+    rows = []
+    for i in range(count):
+        template = templates[i % len(templates)]
+        rows.append({
+            'id': f"{ID_PREFIX}c{i:07d}",
+            'restaurant_id': None,
+            'phone': customer_phone(i),
+            'name': f"Customer {template.id} {i + 1}",
+            'latitude': CENTER_LAT + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES),
+            'longitude': CENTER_LON + rng.uniform(-SPREAD_DEGREES, SPREAD_DEGREES),
+        })
+    return rows
+
+
+def _history_status(rng: random.Random) -> str:
+    roll = rng.random()
+    for status, share in HISTORY_STATUSES:
+        if roll < share:
+            return status
+        roll -= share
+    return HISTORY_STATUSES[0][0]
+
+
+def _order_rows(tenant: Tenant, customers: List[Dict], count: int, history_days: int,
+                rng: random.Random, now: datetime):
+    available = [product for product in tenant.products if product['is_available']] or tenant.products
+    restaurant = tenant.restaurant
+    for i in range(count):
+        order_id = f"{restaurant['id']}_o{i:06d}"
+        customer = customers[rng.randrange(len(customers))]
+        created_at = now - timedelta(seconds=rng.uniform(0, history_days * 86400))
+        status = _history_status(rng)
+        subtotal = 0.0
+        for j, product in enumerate(rng.sample(available, min(len(available), rng.randint(1, 4)))):
+            quantity = rng.randint(1, 3)
+            subtotal += product['price'] * quantity
+            tenant.order_items.append({
+                'id': f"{order_id}_i{j}",
+                'order_id': order_id,
+                'product_id': product['id'],
+                'product_name': product['name'],
+                'quantity': quantity,
+                'price': product['price'],
+                'created_at': created_at,
+            })
+        delivery = rng.random() < 0.6
+        delivery_fee = restaurant['delivery_fee'] if delivery else 0.0
+        tenant.orders.append({
+            'id': order_id,
+            'restaurant_id': restaurant['id'],
+            'customer_id': customer['id'],
+            'customer_phone': customer['phone'],
+            'customer_name': customer['name'],
+            'order_type': "delivery" if delivery else "pickup",
+            'status': status,
+            'delivery_fee': delivery_fee,
+            'subtotal': subtotal,
+            'total_amount': subtotal + delivery_fee,
+            'payment_method': "cod" if rng.random() < 0.7 else "online",
+            'payment_status': "paid" if status == "delivered" else "pending",
+            'delivery_address': "Synthetic address, Lucknow" if delivery else None,
+            'customer_rating': rng.choice([None, None, 3.0, 4.0, 4.5, 5.0]) if status == "delivered" else None,
+            'created_at': created_at,
+            'updated_at': created_at,
+        })
+
+
+def generate_tenants(restaurants: int = 20, products: int = 30, customers: int = 200,
+                     orders: int = 200, history_days: int = 30, seed: int = 42) -> SyntheticData:
+    """
+    Build the rows for `restaurants` tenants with `products` menu items and
+    `orders` historical orders each, placed by `customers` shared customers
+    """
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    customer_rows = _customer_rows(customers, rng)
+    tenants = []
+    for index in range(restaurants):
+        restaurant = _restaurant_row(index, rng)
+        tenant = Tenant(
+            restaurant=restaurant,
+            user={
+                'id': f"{ID_PREFIX}u{index:06d}",
+                'email': f"owner{index}@loadtest.local",
+                'password': "!",  # No login: benchmarks mint tokens with auth.create_access_token
+                'restaurant_id': restaurant['id'],
+                'name': f"Owner {index + 1}",
+                'is_active': True,
+            },
+            products=_product_rows(restaurant['id'], products, rng),
+        )
+        _order_rows(tenant, customer_rows, orders, history_days, rng, now)
+        tenants.append(tenant)
+    return SyntheticData(tenants=tenants, customers=customer_rows)
+
+
+def _insert(conn, table, rows: List[Dict]):
+    for start in range(0, len(rows), INSERT_CHUNK):
+        conn.execute(table.insert(), rows[start:start + INSERT_CHUNK])
+
+
+def seed_database(data: SyntheticData):
+    """Insert the synthetic rows (removing a previous synthetic data set first)
+    and build the sales rollups of their days"""
+    from database import engine
+    from geo_index import restaurant_geo_index
+    from models_db import CustomerDB, OrderDB, OrderItemDB, ProductDB, RestaurantDB, UserDB
+    from repositories.order_repo import ensure_order_partitions
+    from repositories.sales_rollup_repo import rebuild_sales_rollups
+
+    cleanup_database()
+    ensure_order_partitions()
+    with engine.begin() as conn:
+        _insert(conn, RestaurantDB.__table__, data.restaurants)
+        _insert(conn, UserDB.__table__, [tenant.user for tenant in data.tenants])
+        _insert(conn, ProductDB.__table__, [row for tenant in data.tenants for row in tenant.products])
+        _insert(conn, CustomerDB.__table__, data.customers)
+        _insert(conn, OrderDB.__table__, [row for tenant in data.tenants for row in tenant.orders])
+        _insert(conn, OrderItemDB.__table__, [row for tenant in data.tenants for row in tenant.order_items])
+    restaurant_geo_index.invalidate()
+
+    # Rollups are maintained by the order writes of the API, not by these bulk inserts
+    created = [row['created_at'] for tenant in data.tenants for row in tenant.orders]
+    if created:
+        rebuild_sales_rollups(min(created).date(), max(created).date())
+
+
+def cleanup_database():
+    """Delete everything created by seed_database and by benchmark traffic against it"""
+    from sqlalchemy import text
+    from database import engine
+
+    restaurants = "(SELECT id FROM restaurants WHERE id LIKE :prefix)"
+    statements = [
+        f"DELETE FROM order_items WHERE order_id IN (SELECT id FROM orders WHERE restaurant_id IN {restaurants})",
+        f"DELETE FROM payments WHERE restaurant_id IN {restaurants}",
+        f"DELETE FROM orders WHERE restaurant_id IN {restaurants}",
+        "DELETE FROM customer_sessions WHERE phone_number LIKE :phone",
+        "DELETE FROM webhook_events WHERE event_id LIKE :prefix",
+        "DELETE FROM orders WHERE customer_phone LIKE :phone",
+        "DELETE FROM customers WHERE phone LIKE :phone",
+        # users, products, settings, notifications, ratings and rollups cascade
+        "DELETE FROM restaurants WHERE id LIKE :prefix",
+    ]
+    params = {'prefix': ID_PREFIX.replace("_", "\\_") + "%", 'phone': PHONE_PREFIX + "%"}
+    with engine.begin() as conn:
+        for statement in statements:
+            conn.execute(text(statement), params)
@@ -56,7 +56,9 @@ def init_db():
         OrderDB, OrderItemDB, CustomerSessionDB, 
         SubscriptionDB, PaymentDB, RestaurantRatingDB,
         RestaurantUPIQRCodeHistoryDB, RestaurantSettingsDB,
-        RestaurantNotificationDB, DeliveryPersonDB
+        RestaurantNotificationDB, DeliveryPersonDB,
+        RestaurantArchivedOrderTotalsDB, RestaurantArchivedNotificationTotalsDB, RestaurantSalesHourlyDB,
+        RestaurantItemSalesDailyDB, WebhookEventDB
     )
     
     # Create all tables (if they don't exist)
@@ -0,0 +1,241 @@
+"""
+Geo Index - Vectorized distance and ranking for restaurant search
+Keeps restaurant coordinates, ratings and cuisine codes in contiguous NumPy
+arrays so a search is a single pass over the arrays instead of a Python loop
+with one rating lookup per restaurant.
+
+The index is rebuilt lazily: restaurant writes call invalidate(), order writes
+mark the restaurant's rating stale, and the next search refreshes what it needs.
+"""
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from models.restaurant import Restaurant
+
+EARTH_RADIUS_KM = 6371.0
+
+# Ranking weights: 60% rating, 40% distance (distance normalized over 15km)
+RATING_WEIGHT = 0.6
+DISTANCE_WEIGHT = 0.4
+DISTANCE_NORMALIZATION_KM = 15.0
+
+# Reload from the database at least this often so writes made by other
+# worker processes are picked up
+MAX_INDEX_AGE_SECONDS = 60.0
+
+# Cuisine filter -> restaurant cuisine types it matches.
+# Any filter not listed here matches its own cuisine type exactly.
+CUISINE_FILTER_MATCHES = {
+    "veg": ("veg", "both", "full-meal"),
+    "non-veg": ("non-veg", "both", "full-meal"),
+    "snack": ("snack",),
+    "full-meal": ("full-meal",),
+    "both": ("both", "full-meal"),
+}
+
+
+def cuisine_types_for_filter(cuisine_filter: str) -> Tuple[str, ...]:
+    """Get the restaurant cuisine types matched by a cuisine filter"""
+    cuisine_filter = cuisine_filter.lower()
+    return CUISINE_FILTER_MATCHES.get(cuisine_filter, (cuisine_filter,))
+
+
+def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Calculate distance between two points in kilometers"""
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+
+    a = (math.sin(dlat / 2) ** 2 +
+         math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) *
+         math.sin(dlon / 2) ** 2)
+
+    c = 2 * math.asin(math.sqrt(a))
+    return EARTH_RADIUS_KM * c
+
+
+class RestaurantGeoIndex:
+    """In-memory columnar index of active restaurants for location search"""
+
+    def __init__(
+        self,
+        restaurant_loader: Optional[Callable[[], List[Restaurant]]] = None,
+        rating_loader: Optional[Callable[[List[str]], Dict[str, Dict]]] = None,
+    ):
+        self._restaurant_loader = restaurant_loader
+        self._rating_loader = rating_loader
+        self._lock = threading.RLock()
+        self.load([])
+        # Loaded from the database on first search
+        self._dirty = restaurant_loader is not None
+
+    def load(self, restaurants: List[Restaurant], ratings: Optional[Dict[str, Dict]] = None):
+        """
+        Build the arrays from a list of restaurants.
+        Ratings not provided are marked stale and fetched on the first search
+        that needs them.
+        """
+        ratings = ratings or {}
+        count = len(restaurants)
+        cuisine_vocab: Dict[str, int] = {}
+        cuisine_codes = np.empty(count, dtype=np.int16)
+        for i, restaurant in enumerate(restaurants):
+            cuisine = (restaurant.cuisine_type or "both").lower()
+            cuisine_codes[i] = cuisine_vocab.setdefault(cuisine, len(cuisine_vocab))
+
+        lat_rad = np.radians(np.fromiter((r.latitude for r in restaurants), dtype=np.float64, count=count))
+        lon_rad = np.radians(np.fromiter((r.longitude for r in restaurants), dtype=np.float64, count=count))
+
+        with self._lock:
+            self._restaurants = list(restaurants)
+            self._positions = {r.id: i for i, r in enumerate(restaurants)}
+            self._lat_rad = lat_rad
+            self._lon_rad = lon_rad
+            self._cos_lat = np.cos(lat_rad)
+            self._cuisine_vocab = cuisine_vocab
+            self._cuisine_codes = cuisine_codes
+            self._overall_rating = np.full(count, 4.0)
+            self._customer_rating = np.full(count, np.nan)
+            self._total_orders = np.zeros(count, dtype=np.int64)
+            self._rating_stale = np.ones(count, dtype=bool)
+            self._set_ratings(ratings)
+            self._loaded_at = time.monotonic()
+            self._dirty = False
+
+    def invalidate(self):
+        """Drop the index so the next search reloads restaurants from the database"""
+        with self._lock:
+            self._dirty = True
+
+    def mark_rating_stale(self, restaurant_id: str):
+        """Mark a restaurant's rating for refresh (called when its orders change)"""
+        with self._lock:
+            position = self._positions.get(restaurant_id)
+            if position is not None:
+                self._rating_stale[position] = True
+
+    def __len__(self) -> int:
+        return len(self._restaurants)
+
+    def search(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float = 50.0,
+        cuisine_type: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[dict]:
+        """
+        Find restaurants within radius_km sorted by combined score (rating + distance),
+        closest first on ties. Returns the same dicts as
+        restaurant_repo.find_restaurants_by_location.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            distances = self._distances_from(latitude, longitude)
+            candidates = np.flatnonzero(distances <= radius_km)
+            if cuisine_type and cuisine_type.lower() != "all":
+                candidates = candidates[self._cuisine_mask(cuisine_type)[candidates]]
+            if candidates.size == 0:
+                return []
+
+            self._refresh_stale_ratings(candidates)
+
+            candidate_distances = distances[candidates]
+            overall = self._overall_rating[candidates]
+            normalized_distance = np.maximum(0.0, 1.0 - candidate_distances / DISTANCE_NORMALIZATION_KM)
+            scores = (overall / 5.0) * RATING_WEIGHT + normalized_distance * DISTANCE_WEIGHT
+            rounded_distances = np.round(candidate_distances, 2)
+
+            # Only the top `limit` entries need a full sort
+            if limit is not None and limit < candidates.size:
+                if limit <= 0:
+                    return []
+                top = np.argpartition(-scores, limit - 1)[:limit]
+            else:
+                top = np.arange(candidates.size)
+            order = top[np.lexsort((rounded_distances[top], -scores[top]))]
+
+            results = []
+            for j in order:
+                position = candidates[j]
+                customer_rating = self._customer_rating[position]
+                results.append({
+                    'restaurant': self._restaurants[position],
+                    'distance': float(rounded_distances[j]),
+                    'rating': float(overall[j]),
+                    'customer_rating': None if np.isnan(customer_rating) else float(customer_rating),
+                    'total_orders': int(self._total_orders[position]),
+                    'combined_score': float(scores[j])  # For sorting
+                })
+            return results
+
+    def nearest(self, latitude: float, longitude: float) -> Optional[Restaurant]:
+        """Get the closest active restaurant regardless of distance"""
+        self._ensure_loaded()
+        with self._lock:
+            if not self._restaurants:
+                return None
+            distances = self._distances_from(latitude, longitude)
+            return self._restaurants[int(np.argmin(distances))]
+
+    def _distances_from(self, latitude: float, longitude: float) -> np.ndarray:
+        """Haversine distance in km from a point to every indexed restaurant"""
+        lat = math.radians(latitude)
+        lon = math.radians(longitude)
+        a = (np.sin((self._lat_rad - lat) / 2) ** 2 +
+             math.cos(lat) * self._cos_lat * np.sin((self._lon_rad - lon) / 2) ** 2)
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    def _cuisine_mask(self, cuisine_type: str) -> np.ndarray:
+        codes = [self._cuisine_vocab[c] for c in cuisine_types_for_filter(cuisine_type) if c in self._cuisine_vocab]
+        return np.isin(self._cuisine_codes, codes)
+
+    def _set_ratings(self, ratings: Dict[str, Dict]):
+        for restaurant_id, rating in ratings.items():
+            position = self._positions.get(restaurant_id)
+            if position is None:
+                continue
+            self._overall_rating[position] = rating['overall_rating']
+            customer_rating = rating.get('customer_rating')
+            self._customer_rating[position] = np.nan if customer_rating is None else customer_rating
+            self._total_orders[position] = rating.get('total_orders', 0)
+            self._rating_stale[position] = False
+
+    def _refresh_stale_ratings(self, candidates: np.ndarray):
+        stale = candidates[self._rating_stale[candidates]]
+        if stale.size == 0 or self._rating_loader is None:
+            return
+        restaurant_ids = [self._restaurants[i].id for i in stale]
+        self._set_ratings(self._rating_loader(restaurant_ids))
+
+    def _ensure_loaded(self):
+        if self._restaurant_loader is None:
+            return
+        with self._lock:
+            expired = (
+                self._loaded_at is None or
+                time.monotonic() - self._loaded_at > MAX_INDEX_AGE_SECONDS
+            )
+            if self._dirty or expired:
+                self.load(self._restaurant_loader())
+
+
+def _load_active_restaurants() -> List[Restaurant]:
+    from repositories.restaurant_repo import get_all_restaurants
+    return get_all_restaurants()
+
+
+def _load_ratings(restaurant_ids: List[str]) -> Dict[str, Dict]:
+    from repositories.rating_repo import get_restaurant_ratings
+    return get_restaurant_ratings(restaurant_ids)
+
+
+# Shared index used by the restaurant and customer repositories
+restaurant_geo_index = RestaurantGeoIndex(
+    restaurant_loader=_load_active_restaurants,
+    rating_loader=_load_ratings,
+)
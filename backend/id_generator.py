@@ -3,22 +3,37 @@ ID Generator Utility
 Generates 9-digit serial numbers for all entities
 Format: "000000001", "000000002", etc. (zero-padded to 9 digits)
 """
+from typing import List
 from database import SessionLocal
 from sqlalchemy import text, func
 from models_db import RestaurantDB, UserDB, ProductDB, CustomerDB, OrderDB, OrderItemDB, CustomerSessionDB
 
 
-def generate_next_id(table_name: str) -> str:
+def lock_id_allocation(db, table_name: str):
+    """
+    Serialize ID allocation for a table until the caller's transaction ends
+    (transaction-level advisory lock)
+    Take it, allocate with generate_next_id(table_name, db) and insert the rows
+    before committing: concurrent writers that do the same wait instead of
+    computing the same MAX + 1.
+    """
+    db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {'key': f"id_generator:{table_name}"})
+
+
+def generate_next_id(table_name: str, db=None) -> str:
     """
     Generate next sequential 9-digit ID for a table
     
     Args:
         table_name: Name of the table (e.g., 'restaurants', 'users', 'products', etc.)
+        db: Session to read in (after lock_id_allocation); a short-lived one if omitted
     
     Returns:
         str: 9-digit zero-padded ID (e.g., "000000001", "000000002")
     """
-    db = SessionLocal()
+    own_session = db is None
+    if own_session:
+        db = SessionLocal()
     try:
         # Strategy 1: Try to find max numeric ID (for pure numeric IDs)
         result = db.execute(text(f"""
@@ -62,11 +77,14 @@ def generate_next_id(table_name: str) -> str:
         return str(next_id).zfill(9)
         
     except Exception as e:
+        if not own_session:
+            raise
         # Ultimate fallback: start from 1
         print(f"Warning: Could not determine max ID for {table_name}: {e}. Starting from 1.")
         return "000000001"
     finally:
-        db.close()
+        if own_session:
+            db.close()
 
 
 def generate_restaurant_id() -> str:
@@ -79,9 +97,22 @@ def generate_user_id() -> str:
     return generate_next_id('users')
 
 
-def generate_product_id() -> str:
+def generate_product_id(db=None) -> str:
     """Generate next product ID"""
-    return generate_next_id('products')
+    return generate_next_id('products', db)
+
+
+def generate_product_ids(count: int, db=None) -> List[str]:
+    """
+    Allocate `count` consecutive product IDs with a single MAX scan
+    (for bulk menu imports; pass the session that holds lock_id_allocation)
+    """
+    if count <= 0:
+        return []
+    first = int(generate_next_id('products', db))
+    if first + count - 1 > 999999999:
+        raise ValueError("Maximum ID limit reached for products")
+    return [str(first + i).zfill(9) for i in range(count)]
 
 
 def generate_customer_id() -> str:
@@ -21,6 +21,7 @@ CREATE TABLE IF NOT EXISTS restaurants (
     cuisine_type VARCHAR(50) NOT NULL DEFAULT 'both',
     subscription_plan VARCHAR(50) DEFAULT 'free',
     subscription_end_date DATE NULL,
+    menu_version INT NOT NULL DEFAULT 0,
     created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
 );
@@ -39,6 +40,7 @@ CREATE TABLE IF NOT EXISTS users (
     updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     is_active BOOLEAN NOT NULL DEFAULT TRUE,
     last_login TIMESTAMP NULL,
+    token_version INTEGER NOT NULL DEFAULT 0,
     -- Multi-Factor Authentication (MFA)
     two_factor_enabled BOOLEAN NOT NULL DEFAULT FALSE,
     two_factor_secret VARCHAR(255) NULL,
@@ -60,6 +62,7 @@ CREATE TABLE IF NOT EXISTS products (
     category VARCHAR(100) NOT NULL,
     is_available BOOLEAN NOT NULL DEFAULT TRUE,
     image_url VARCHAR(500) NULL,
+    preparation_time INT NULL,
     created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     CONSTRAINT fk_products_restaurant FOREIGN KEY (restaurant_id) REFERENCES restaurants(id) ON DELETE CASCADE
@@ -87,8 +90,11 @@ CREATE TABLE IF NOT EXISTS customers (
 CREATE INDEX IF NOT EXISTS idx_customers_restaurant_id ON customers(restaurant_id);
 
 -- Orders Table
+-- Range-partitioned by month on created_at (see migrations/partition_orders_by_month.sql).
+-- The partition key must be part of the primary key, so other tables cannot
+-- declare foreign keys to orders(id).
 CREATE TABLE IF NOT EXISTS orders (
-    id VARCHAR(50) PRIMARY KEY,
+    id VARCHAR(50) NOT NULL,
     restaurant_id VARCHAR(50) NOT NULL,
     customer_id VARCHAR(50) NOT NULL,
     customer_phone VARCHAR(20) NOT NULL,
@@ -106,10 +112,11 @@ CREATE TABLE IF NOT EXISTS orders (
     notes TEXT NULL,
     created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT orders_pkey PRIMARY KEY (id, created_at),
     CONSTRAINT fk_orders_restaurant FOREIGN KEY (restaurant_id) REFERENCES restaurants(id) ON DELETE CASCADE,
     CONSTRAINT fk_orders_customer FOREIGN KEY (customer_id) REFERENCES customers(id) ON DELETE CASCADE,
     CONSTRAINT chk_customer_rating CHECK (customer_rating IS NULL OR (customer_rating >= 1 AND customer_rating <= 5))
-);
+) PARTITION BY RANGE (created_at);
 
 CREATE INDEX IF NOT EXISTS idx_orders_restaurant_id ON orders(restaurant_id);
 CREATE INDEX IF NOT EXISTS idx_orders_customer_id ON orders(customer_id);
@@ -117,7 +124,57 @@ CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status);
 CREATE INDEX IF NOT EXISTS idx_orders_payment_status ON orders(payment_status);
 CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders(created_at);
 CREATE INDEX IF NOT EXISTS idx_orders_restaurant_status ON orders(restaurant_id, status);
+CREATE INDEX IF NOT EXISTS idx_orders_restaurant_created ON orders(restaurant_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_orders_restaurant_updated ON orders(restaurant_id, updated_at);
 CREATE INDEX IF NOT EXISTS idx_orders_customer_created ON orders(customer_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_orders_ready_delivery ON orders(created_at, id) WHERE order_type = 'delivery' AND status = 'ready';
+
+-- Create the monthly partition of orders containing month_start (no-op if it exists).
+-- Rows that already landed in orders_default for that month are moved into it.
+-- Callers are serialized by a transaction-level advisory lock, so workers
+-- starting together don't race between the existence check and CREATE TABLE.
+CREATE OR REPLACE FUNCTION create_orders_partition(month_start DATE)
+RETURNS TEXT AS $$
+DECLARE
+    start_ts TIMESTAMP := date_trunc('month', month_start);
+    end_ts TIMESTAMP := date_trunc('month', month_start) + INTERVAL '1 month';
+    partition_name TEXT := 'orders_' || to_char(month_start, 'YYYY_MM');
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('orders_partitions'));
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN partition_name;
+    END IF;
+
+    EXECUTE format('CREATE TABLE %I (LIKE orders INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', partition_name);
+    IF to_regclass('orders_default') IS NOT NULL THEN
+        EXECUTE format(
+            'WITH moved AS (DELETE FROM orders_default WHERE created_at >= %L AND created_at < %L RETURNING *) '
+            'INSERT INTO %I SELECT * FROM moved',
+            start_ts, end_ts, partition_name
+        );
+    END IF;
+    EXECUTE format(
+        'ALTER TABLE orders ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        partition_name, start_ts, end_ts
+    );
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Make sure partitions exist for the current month and months_ahead months after it
+CREATE OR REPLACE FUNCTION ensure_orders_partitions(months_ahead INT DEFAULT 3)
+RETURNS VOID AS $$
+DECLARE
+    m INT;
+BEGIN
+    FOR m IN 0..months_ahead LOOP
+        PERFORM create_orders_partition((date_trunc('month', CURRENT_DATE) + make_interval(months => m))::DATE);
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT ensure_orders_partitions(3);
+CREATE TABLE IF NOT EXISTS orders_default PARTITION OF orders DEFAULT;
 
 -- Order Items Table
 CREATE TABLE IF NOT EXISTS order_items (
@@ -128,7 +185,6 @@ CREATE TABLE IF NOT EXISTS order_items (
     quantity INT NOT NULL DEFAULT 1,
     price DECIMAL(10, 2) NOT NULL,
     created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-    CONSTRAINT fk_order_items_order FOREIGN KEY (order_id) REFERENCES orders(id) ON DELETE CASCADE,
     CONSTRAINT fk_order_items_product FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE RESTRICT
 );
 
@@ -192,8 +248,8 @@ CREATE TABLE IF NOT EXISTS payments (
     metadata JSONB NULL,
     created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-    CONSTRAINT fk_payments_restaurant FOREIGN KEY (restaurant_id) REFERENCES restaurants(id) ON DELETE SET NULL,
-    CONSTRAINT fk_payments_order FOREIGN KEY (order_id) REFERENCES orders(id) ON DELETE SET NULL
+    -- order_id has no foreign key: payment history outlives archived orders
+    CONSTRAINT fk_payments_restaurant FOREIGN KEY (restaurant_id) REFERENCES restaurants(id) ON DELETE SET NULL
 );
 
 CREATE INDEX IF NOT EXISTS idx_payments_restaurant_id ON payments(restaurant_id);
@@ -454,17 +510,139 @@ CREATE TABLE IF NOT EXISTS restaurant_notifications (
     updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     
     CONSTRAINT fk_notifications_restaurant FOREIGN KEY (restaurant_id) 
-        REFERENCES restaurants(id) ON DELETE CASCADE,
-    CONSTRAINT fk_notifications_order FOREIGN KEY (order_id) 
-        REFERENCES orders(id) ON DELETE SET NULL
+        REFERENCES restaurants(id) ON DELETE CASCADE
 );
 
 CREATE INDEX IF NOT EXISTS idx_notifications_restaurant_id ON restaurant_notifications(restaurant_id);
 CREATE INDEX IF NOT EXISTS idx_notifications_order_id ON restaurant_notifications(order_id);
 CREATE INDEX IF NOT EXISTS idx_notifications_status ON restaurant_notifications(status);
 CREATE INDEX IF NOT EXISTS idx_notifications_created_at ON restaurant_notifications(created_at);
+CREATE INDEX IF NOT EXISTS idx_notifications_restaurant_created ON restaurant_notifications(restaurant_id, created_at, id);
 
 -- Trigger to auto-update updated_at for notifications
 CREATE TRIGGER update_notifications_updated_at BEFORE UPDATE ON restaurant_notifications 
 FOR EACH ROW EXECUTE FUNCTION update_settings_updated_at_column();
 
+
+-- Delivery persons (riders) and order dispatch
+CREATE TABLE IF NOT EXISTS delivery_persons (
+    id VARCHAR(50) PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    phone VARCHAR(20) NOT NULL UNIQUE,
+    email VARCHAR(255) NOT NULL UNIQUE,
+    password_hash VARCHAR(255) NOT NULL,
+    vehicle_type VARCHAR(20) NOT NULL DEFAULT 'bike',
+    license_number VARCHAR(100) NULL,
+    is_available BOOLEAN NOT NULL DEFAULT FALSE,
+    current_latitude DECIMAL(10, 8) NULL,
+    current_longitude DECIMAL(11, 8) NULL,
+    last_location_update TIMESTAMP WITH TIME ZONE NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+ALTER TABLE orders
+ADD COLUMN IF NOT EXISTS delivery_person_id VARCHAR(50) NULL
+    REFERENCES delivery_persons(id) ON DELETE SET NULL;
+
+ALTER TABLE orders
+ADD COLUMN IF NOT EXISTS assigned_at TIMESTAMP WITH TIME ZONE NULL;
+
+CREATE INDEX IF NOT EXISTS idx_orders_delivery_person_id ON orders(delivery_person_id);
+
+-- Archive tables for old notifications and orders (services/archive_service.py)
+CREATE TABLE IF NOT EXISTS restaurant_notifications_archive (LIKE restaurant_notifications INCLUDING DEFAULTS);
+ALTER TABLE restaurant_notifications_archive DROP CONSTRAINT IF EXISTS restaurant_notifications_archive_pkey;
+ALTER TABLE restaurant_notifications_archive ADD PRIMARY KEY (id);
+-- Compress message bodies even when they are short
+ALTER TABLE restaurant_notifications_archive SET (toast_tuple_target = 128);
+CREATE INDEX IF NOT EXISTS idx_notifications_archive_restaurant_created ON restaurant_notifications_archive(restaurant_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_notifications_archive_order_id ON restaurant_notifications_archive(order_id);
+
+CREATE TABLE IF NOT EXISTS orders_archive (LIKE orders INCLUDING DEFAULTS);
+ALTER TABLE orders_archive DROP CONSTRAINT IF EXISTS orders_archive_pkey;
+ALTER TABLE orders_archive ADD PRIMARY KEY (id);
+ALTER TABLE orders_archive SET (toast_tuple_target = 128);
+CREATE INDEX IF NOT EXISTS idx_orders_archive_restaurant_created ON orders_archive(restaurant_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_orders_archive_customer_id ON orders_archive(customer_id);
+
+CREATE TABLE IF NOT EXISTS order_items_archive (LIKE order_items INCLUDING DEFAULTS);
+ALTER TABLE order_items_archive DROP CONSTRAINT IF EXISTS order_items_archive_pkey;
+ALTER TABLE order_items_archive ADD PRIMARY KEY (id);
+CREATE INDEX IF NOT EXISTS idx_order_items_archive_order_id ON order_items_archive(order_id);
+
+-- Archived orders still count towards ratings and dashboard totals
+CREATE TABLE IF NOT EXISTS restaurant_archived_order_totals (
+    restaurant_id VARCHAR(50) PRIMARY KEY,
+    archived_orders INT NOT NULL DEFAULT 0,
+    delivered_orders INT NOT NULL DEFAULT 0,
+    cancelled_orders INT NOT NULL DEFAULT 0,
+    rated_orders INT NOT NULL DEFAULT 0,
+    rating_sum DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    delivered_revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    archived_through TIMESTAMP WITH TIME ZONE NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT fk_archived_totals_restaurant FOREIGN KEY (restaurant_id) REFERENCES restaurants(id) ON DELETE CASCADE
+);
+
+-- Archived notifications still count towards the notification stats
+CREATE TABLE IF NOT EXISTS restaurant_archived_notification_totals (
+    restaurant_id VARCHAR(50) NOT NULL,
+    notification_event VARCHAR(50) NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    archived_notifications INT NOT NULL DEFAULT 0,
+    clicked_notifications INT NOT NULL DEFAULT 0,
+    archived_through TIMESTAMP WITH TIME ZONE NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (restaurant_id, notification_event, status),
+    CONSTRAINT fk_archived_notification_totals_restaurant FOREIGN KEY (restaurant_id) REFERENCES restaurants(id) ON DELETE CASCADE
+);
+
+-- Sales rollups for dashboard analytics (maintained by repositories/order_repo.py)
+CREATE TABLE IF NOT EXISTS restaurant_sales_hourly (
+    restaurant_id VARCHAR(50) NOT NULL REFERENCES restaurants(id) ON DELETE CASCADE,
+    bucket_date DATE NOT NULL,
+    hour SMALLINT NOT NULL CHECK (hour >= 0 AND hour <= 23),
+    orders_count INT NOT NULL DEFAULT 0,
+    pending_orders INT NOT NULL DEFAULT 0,
+    preparing_orders INT NOT NULL DEFAULT 0,
+    ready_orders INT NOT NULL DEFAULT 0,
+    delivered_orders INT NOT NULL DEFAULT 0,
+    cancelled_orders INT NOT NULL DEFAULT 0,
+    revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (restaurant_id, bucket_date, hour)
+);
+
+CREATE TABLE IF NOT EXISTS restaurant_item_sales_daily (
+    restaurant_id VARCHAR(50) NOT NULL REFERENCES restaurants(id) ON DELETE CASCADE,
+    bucket_date DATE NOT NULL,
+    product_id VARCHAR(50) NOT NULL,
+    product_name VARCHAR(255) NOT NULL,
+    quantity INT NOT NULL DEFAULT 0,
+    revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (restaurant_id, bucket_date, product_id)
+);
+
+-- Idempotency ledger and work queue for incoming webhooks
+-- (see repositories/webhook_event_repo.py and services/webhook_queue_service.py)
+-- Processed rows older than WEBHOOK_EVENT_RETENTION_DAYS are deleted by the archival job.
+CREATE TABLE IF NOT EXISTS webhook_events (
+    source VARCHAR(20) NOT NULL,
+    event_id VARCHAR(255) NOT NULL,
+    received_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    status VARCHAR(20) NOT NULL DEFAULT 'done',
+    ordering_key VARCHAR(100) NULL,
+    payload TEXT NULL,
+    attempts INT NOT NULL DEFAULT 0,
+    claimed_at TIMESTAMP WITH TIME ZONE NULL,
+    lease_owner VARCHAR(100) NULL,
+    lease_expires_at TIMESTAMP WITH TIME ZONE NULL,
+    last_error TEXT NULL,
+    PRIMARY KEY (source, event_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_webhook_events_received_at ON webhook_events(received_at);
+CREATE INDEX IF NOT EXISTS idx_webhook_events_queued ON webhook_events(claimed_at) WHERE status = 'queued';
+CREATE INDEX IF NOT EXISTS idx_webhook_events_lease ON webhook_events(lease_expires_at) WHERE status = 'queued';
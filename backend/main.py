@@ -2,14 +2,15 @@
 Main FastAPI Application
 WhatsApp Business Ordering System Backend
 """
+import asyncio
 import logging
 import os
 import time
-from fastapi import FastAPI, Form, Request, HTTPException, Query
-from fastapi.responses import PlainTextResponse, Response, HTMLResponse
+from fastapi import FastAPI, Depends, Form, Request, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, HTMLResponse
 from twilio.twiml.messaging_response import MessagingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from routers import auth, dashboard, menu, orders, webhook, settings, notifications, payments, delivery
+from routers import auth, dashboard, menu, orders, webhook, settings, notifications, payments, delivery, debug
 from typing import Optional
 from datetime import datetime, timedelta
 from repositories.session_repo import get_session, get_session_by_phone, create_session, update_session
@@ -20,7 +21,16 @@ from models.session import CustomerSession
 from models.customer import Customer
 from models.order import Order, OrderItem
 from services.order_service import create_new_order
-from services.whatsapp_service import send_order_status_notification
+from services.whatsapp_service import send_order_status_notification, send_whatsapp_message, twiml_message_bodies
+from services.webhook_queue_service import enqueue_webhook, queue_mode_enabled, register_webhook_handler
+from repositories.webhook_event_repo import claim_webhook_event, release_webhook_event, WEBHOOK_SOURCE_TWILIO
+from services.metrics_service import (
+    METRICS_QUERY_HEADER, MetricsMiddleware, PROMETHEUS_CONTENT_TYPE, instrument_engine, render_metrics
+)
+from services.query_inspector import QueryInspectorMiddleware, inspector_enabled
+from services.password_service import PasswordHasherBusyError, PASSWORD_HASH_RETRY_AFTER
+from database import engine
+from auth import verify_admin_token
 import urllib.parse
 
 # Twilio credentials (HARDCODED)
@@ -53,8 +63,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "X-Next-Cursor",  # Cursor pagination (notifications)
+    ] + (
+        ["X-DB-Queries", "X-DB-Checkouts"]  # Per-request database usage (METRICS_QUERY_HEADER)
+        if METRICS_QUERY_HEADER else []
+    ),
 )
 
+# Per-route latency and database usage, exposed on /metrics
+instrument_engine(engine)
+app.add_middleware(MetricsMiddleware)
+
+# N+1 and slow query warnings per request (QUERY_INSPECTOR=log, development only)
+if inspector_enabled():
+    app.add_middleware(QueryInspectorMiddleware)
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(dashboard.router)
@@ -65,6 +89,17 @@ app.include_router(settings.router)
 app.include_router(notifications.router)
 app.include_router(payments.router)
 app.include_router(delivery.router)
+app.include_router(debug.router)
+
+@app.exception_handler(PasswordHasherBusyError)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusyError):
+    """Login/signup bursts beyond the hashing pool's capacity are shed, not queued"""
+    logger.warning(f"Shedding {request.method} {request.url.path}: {exc}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy, please retry shortly"},
+        headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER)},
+    )
 
 @app.get("/")
 async def root():
@@ -81,11 +116,48 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy"}
 
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(verify_admin_token)])
+async def metrics():
+    """Prometheus scrape endpoint (metrics of this worker process, X-Admin-Token required)"""
+    return Response(content=render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
 @app.on_event("startup")
 async def startup_event():
     """Log startup information"""
     logger.info("🚀 WhatsApp Business Ordering System API started")
     logger.info("📱 Webhook endpoint: /whatsapp")
+    
+    # Periodically write coalesced rider locations to the database
+    from services.location_service import rider_locations
+    app.state.location_flush_task = asyncio.create_task(rider_locations.run())
+    
+    # Move old notifications and orders to the archive tables
+    from services.archive_service import run_periodically, ARCHIVE_INTERVAL_HOURS
+    if ARCHIVE_INTERVAL_HOURS > 0:
+        app.state.archive_task = asyncio.create_task(run_periodically())
+    
+    # Create next months' orders partitions before they are needed
+    from services import partition_service
+    app.state.partition_task = asyncio.create_task(partition_service.run_periodically())
+    
+    # Worker pool for queued webhook ingestion (WEBHOOK_INGESTION_MODE=queue)
+    from services.webhook_queue_service import start_webhook_workers
+    start_webhook_workers()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background tasks"""
+    from services.webhook_queue_service import stop_webhook_workers
+    await stop_webhook_workers()
+    
+    for name in ("location_flush_task", "archive_task", "partition_task"):
+        task = getattr(app.state, name, None)
+        if task:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
 
 # -------------------------------
 # Twilio WhatsApp Webhook Endpoint
@@ -96,10 +168,58 @@ async def whatsapp_reply(
     Body: Optional[str] = Form(None),
     Latitude: Optional[str] = Form(None),
     Longitude: Optional[str] = Form(None),
-    ProfileName: Optional[str] = Form(None)  # Customer name from WhatsApp
+    ProfileName: Optional[str] = Form(None),  # Customer name from WhatsApp
+    MessageSid: Optional[str] = Form(None)
 ):
     """
     Endpoint to receive incoming WhatsApp messages from Twilio.
+    Retried deliveries (same MessageSid) are acknowledged without processing.
+    With WEBHOOK_INGESTION_MODE=queue the message is stored and acknowledged
+    right away; a webhook worker builds the reply and sends it through the
+    Twilio API (services/webhook_queue_service.py).
+    """
+    message = {
+        "From": From, "Body": Body, "Latitude": Latitude,
+        "Longitude": Longitude, "ProfileName": ProfileName
+    }
+    if queue_mode_enabled():
+        phone_number = From.replace("whatsapp:", "").strip()
+        if not enqueue_webhook(WEBHOOK_SOURCE_TWILIO, MessageSid, "whatsapp_reply", message,
+                               ordering_key=phone_number):
+            logger.info(f"⏭️ Duplicate WhatsApp message {MessageSid}, already received")
+        return Response(content=str(MessagingResponse()), media_type="application/xml")
+    
+    if MessageSid and not claim_webhook_event(WEBHOOK_SOURCE_TWILIO, MessageSid):
+        logger.info(f"⏭️ Duplicate WhatsApp message {MessageSid}, already processed")
+        return Response(content=str(MessagingResponse()), media_type="application/xml")
+    
+    try:
+        return build_whatsapp_reply(**message)
+    except Exception:
+        # Forget the claim so Twilio's retry of this message is processed
+        if MessageSid:
+            release_webhook_event(WEBHOOK_SOURCE_TWILIO, MessageSid)
+        raise
+
+
+async def process_queued_whatsapp_reply(message: dict):
+    """Queued /whatsapp message: build the reply off the event loop and send it"""
+    reply = await asyncio.to_thread(build_whatsapp_reply, **message)
+    for body in twiml_message_bodies(reply.body):
+        await send_whatsapp_message(message["From"], body)
+
+register_webhook_handler("whatsapp_reply", process_queued_whatsapp_reply)
+
+
+def build_whatsapp_reply(
+    From: str,
+    Body: Optional[str] = None,
+    Latitude: Optional[str] = None,
+    Longitude: Optional[str] = None,
+    ProfileName: Optional[str] = None
+) -> Response:
+    """
+    Build the TwiML reply to an incoming WhatsApp message.
     Handles location-based restaurant selection flow:
     1. First message -> Ask for location
     2. Location shared -> Show nearest restaurants
@@ -764,82 +884,47 @@ async def get_filtered_restaurants(
     try:
         logger.info(f"📋 Fetching restaurants - lat={latitude}, lon={longitude}, max_dist={max_distance}, cuisine={cuisine_type}")
         
-        # Find nearby restaurants - if location provided, use it; otherwise get all restaurants
+        # Restaurants joined with settings and persisted rating, cuisine filtered in SQL
+        from repositories.restaurant_repo import get_restaurant_listing
+        
         if latitude is not None and longitude is not None:
+            # Ranked by rating + distance on the geo index, then settings for the hits in one query
             radius_km = max_distance if max_distance is not None else 50.0
-            nearby_restaurants = find_restaurants_by_location(latitude, longitude, radius_km=radius_km)
+            nearby_restaurants = find_restaurants_by_location(
+                latitude, longitude, radius_km=radius_km, cuisine_type=cuisine_type
+            )
+            listing_by_id = {
+                row['id']: row
+                for row in get_restaurant_listing(restaurant_ids=[item['restaurant'].id for item in nearby_restaurants])
+            }
+            listing = []
+            for item in nearby_restaurants:
+                row = listing_by_id.get(item['restaurant'].id)
+                if row:
+                    row['rating'] = item['rating']  # Live rating from the ranking
+                    listing.append(row)
         else:
             # If no location provided, get all restaurants
-            from repositories.restaurant_repo import get_all_restaurants
-            all_restaurants = get_all_restaurants()
-            nearby_restaurants = [{'restaurant': r, 'distance': 0.0, 'rating': 4.0} for r in all_restaurants]
-        
-        # Filter by cuisine type if specified
-        if cuisine_type and cuisine_type.lower() != "all":
-            filtered_restaurants = []
-            filter_cuisine = cuisine_type.lower()
-            
-            for item in nearby_restaurants:
-                restaurant = item['restaurant']
-                # Get restaurant cuisine type (default to "both" if not set)
-                restaurant_cuisine = getattr(restaurant, 'cuisine_type', 'both').lower()
-                
-                # Match logic
-                should_include = False
-                
-                if filter_cuisine == "veg":
-                    # Veg filter: show restaurants that serve veg (veg, both, full-meal)
-                    should_include = restaurant_cuisine in ["veg", "both", "full-meal"]
-                elif filter_cuisine == "non-veg":
-                    # Non-veg filter: show restaurants that serve non-veg (non-veg, both, full-meal)
-                    should_include = restaurant_cuisine in ["non-veg", "both", "full-meal"]
-                elif filter_cuisine == "snack":
-                    # Snack filter: show only snack restaurants
-                    should_include = restaurant_cuisine == "snack"
-                elif filter_cuisine == "full-meal":
-                    # Full meal filter: show full-meal restaurants
-                    should_include = restaurant_cuisine == "full-meal"
-                elif filter_cuisine == "both":
-                    # Both filter: show restaurants that serve both
-                    should_include = restaurant_cuisine in ["both", "full-meal"]
-                else:
-                    # Exact match for any other cuisine type
-                    should_include = restaurant_cuisine == filter_cuisine
-                
-                if should_include:
-                    filtered_restaurants.append(item)
-            
-            nearby_restaurants = filtered_restaurants
-        
-        # Get settings for delivery_available and minimum_order_value
-        from repositories.settings_repo import get_settings_by_restaurant_id
+            listing = get_restaurant_listing(cuisine_type=cuisine_type)
         
         # Format response according to spec
-        restaurants_list = []
-        for item in nearby_restaurants:
-            restaurant = item['restaurant']
-            # Get rating information from the item (already calculated in find_restaurants_by_location)
-            rating = item.get('rating', 4.0)  # Overall rating (1-5)
-            
-            # Get settings
-            settings = get_settings_by_restaurant_id(restaurant.id)
-            delivery_available = getattr(settings, 'delivery_available', True) if settings else True
-            minimum_order_value = float(getattr(settings, 'minimum_order_value', 0.0)) if settings else 0.0
-            
-            restaurants_list.append({
-                "id": restaurant.id,
-                "name": restaurant.name,
-                "phone": restaurant.phone,
-                "address": restaurant.address or "",
-                "latitude": float(restaurant.latitude) if restaurant.latitude else None,
-                "longitude": float(restaurant.longitude) if restaurant.longitude else None,
-                "is_active": restaurant.is_active,
-                "rating": rating,
+        restaurants_list = [
+            {
+                "id": row['id'],
+                "name": row['name'],
+                "phone": row['phone'],
+                "address": row['address'],
+                "latitude": row['latitude'] or None,
+                "longitude": row['longitude'] or None,
+                "is_active": row['is_active'],
+                "rating": row['rating'],
                 "image_url": None,  # Can be added later if image support is implemented
-                "cuisine_type": getattr(restaurant, 'cuisine_type', None),
-                "delivery_available": delivery_available,
-                "minimum_order_value": minimum_order_value
-            })
+                "cuisine_type": row['cuisine_type'],
+                "delivery_available": row['delivery_available'],
+                "minimum_order_value": row['minimum_order_value']
+            }
+            for row in listing
+        ]
         
         return {
             "restaurants": restaurants_list,
@@ -0,0 +1,45 @@
+-- Migration: Archive tables for old notifications and orders
+-- services/archive_service.py moves rows older than the retention horizon out
+-- of the hot tables into these tables. Archive tables have the same columns
+-- (LIKE ... INCLUDING DEFAULTS) but no foreign keys and only lookup indexes.
+-- Any column later added to restaurant_notifications, orders or order_items
+-- must be added to the matching *_archive table as well.
+
+CREATE TABLE IF NOT EXISTS restaurant_notifications_archive (LIKE restaurant_notifications INCLUDING DEFAULTS);
+ALTER TABLE restaurant_notifications_archive DROP CONSTRAINT IF EXISTS restaurant_notifications_archive_pkey;
+ALTER TABLE restaurant_notifications_archive ADD PRIMARY KEY (id);
+-- Compress message bodies even when they are short
+ALTER TABLE restaurant_notifications_archive SET (toast_tuple_target = 128);
+CREATE INDEX IF NOT EXISTS idx_notifications_archive_restaurant_created ON restaurant_notifications_archive(restaurant_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_notifications_archive_order_id ON restaurant_notifications_archive(order_id);
+
+CREATE TABLE IF NOT EXISTS orders_archive (LIKE orders INCLUDING DEFAULTS);
+ALTER TABLE orders_archive DROP CONSTRAINT IF EXISTS orders_archive_pkey;
+ALTER TABLE orders_archive ADD PRIMARY KEY (id);
+ALTER TABLE orders_archive SET (toast_tuple_target = 128);
+CREATE INDEX IF NOT EXISTS idx_orders_archive_restaurant_created ON orders_archive(restaurant_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_orders_archive_customer_id ON orders_archive(customer_id);
+
+CREATE TABLE IF NOT EXISTS order_items_archive (LIKE order_items INCLUDING DEFAULTS);
+ALTER TABLE order_items_archive DROP CONSTRAINT IF EXISTS order_items_archive_pkey;
+ALTER TABLE order_items_archive ADD PRIMARY KEY (id);
+CREATE INDEX IF NOT EXISTS idx_order_items_archive_order_id ON order_items_archive(order_id);
+
+-- Archived orders still count towards ratings and dashboard totals
+CREATE TABLE IF NOT EXISTS restaurant_archived_order_totals (
+    restaurant_id VARCHAR(50) PRIMARY KEY,
+    archived_orders INT NOT NULL DEFAULT 0,
+    delivered_orders INT NOT NULL DEFAULT 0,
+    cancelled_orders INT NOT NULL DEFAULT 0,
+    rated_orders INT NOT NULL DEFAULT 0,
+    rating_sum DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    delivered_revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    archived_through TIMESTAMP WITH TIME ZONE NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT fk_archived_totals_restaurant FOREIGN KEY (restaurant_id) REFERENCES restaurants(id) ON DELETE CASCADE
+);
+
+-- Payment history must survive order archival, so payments.order_id becomes a
+-- plain reference instead of a SET NULL foreign key
+ALTER TABLE payments DROP CONSTRAINT IF EXISTS fk_payments_order;
+ALTER TABLE payments DROP CONSTRAINT IF EXISTS payments_order_id_fkey;
@@ -0,0 +1,25 @@
+-- Migration: Totals of archived notifications
+-- Notifications moved to restaurant_notifications_archive are counted here
+-- (per restaurant, event and status) in the same transaction, so the
+-- all-history notification stats do not change when rows are archived.
+-- Counts of notifications archived before this migration are backfilled.
+
+-- Archived notifications still count towards the notification stats
+CREATE TABLE IF NOT EXISTS restaurant_archived_notification_totals (
+    restaurant_id VARCHAR(50) NOT NULL,
+    notification_event VARCHAR(50) NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    archived_notifications INT NOT NULL DEFAULT 0,
+    clicked_notifications INT NOT NULL DEFAULT 0,
+    archived_through TIMESTAMP WITH TIME ZONE NULL,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (restaurant_id, notification_event, status),
+    CONSTRAINT fk_archived_notification_totals_restaurant FOREIGN KEY (restaurant_id) REFERENCES restaurants(id) ON DELETE CASCADE
+);
+
+INSERT INTO restaurant_archived_notification_totals
+    (restaurant_id, notification_event, status, archived_notifications, clicked_notifications, archived_through)
+SELECT restaurant_id, notification_event, status, count(*), count(button_clicked), max(created_at)
+FROM restaurant_notifications_archive
+GROUP BY restaurant_id, notification_event, status
+ON CONFLICT (restaurant_id, notification_event, status) DO NOTHING;
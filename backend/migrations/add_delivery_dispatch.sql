@@ -0,0 +1,31 @@
+-- Migration: Rider dispatch for delivery orders
+-- Ready delivery orders are assigned to the nearest available delivery person.
+-- The assignment is stored on the order; the rider's last location ping time
+-- is kept so stale positions can be recognised.
+
+CREATE TABLE IF NOT EXISTS delivery_persons (
+    id VARCHAR(50) PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    phone VARCHAR(20) NOT NULL UNIQUE,
+    email VARCHAR(255) NOT NULL UNIQUE,
+    password_hash VARCHAR(255) NOT NULL,
+    vehicle_type VARCHAR(20) NOT NULL DEFAULT 'bike',
+    license_number VARCHAR(100) NULL,
+    is_available BOOLEAN NOT NULL DEFAULT FALSE,
+    current_latitude DECIMAL(10, 8) NULL,
+    current_longitude DECIMAL(11, 8) NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+ALTER TABLE delivery_persons
+ADD COLUMN IF NOT EXISTS last_location_update TIMESTAMP WITH TIME ZONE NULL;
+
+ALTER TABLE orders
+ADD COLUMN IF NOT EXISTS delivery_person_id VARCHAR(50) NULL
+    REFERENCES delivery_persons(id) ON DELETE SET NULL;
+
+ALTER TABLE orders
+ADD COLUMN IF NOT EXISTS assigned_at TIMESTAMP WITH TIME ZONE NULL;
+
+CREATE INDEX IF NOT EXISTS idx_orders_delivery_person_id ON orders(delivery_person_id);
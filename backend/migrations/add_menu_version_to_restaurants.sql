@@ -0,0 +1,7 @@
+-- Migration: Menu version per restaurant
+-- Incremented in the same transaction as every product change (single,
+-- bulk import or bulk update), so cached menus can be keyed by
+-- (restaurant_id, menu_version) and never served stale.
+
+ALTER TABLE restaurants
+ADD COLUMN IF NOT EXISTS menu_version INT NOT NULL DEFAULT 0;
@@ -0,0 +1,7 @@
+-- Migration: Composite index for restaurant notification listing
+-- The notifications page and stats filter by restaurant and a created_at window
+-- and page newest first on (created_at, id). One composite index serves the
+-- filter, the order and the keyset cursor without a sort.
+
+CREATE INDEX IF NOT EXISTS idx_notifications_restaurant_created
+ON restaurant_notifications(restaurant_id, created_at, id);
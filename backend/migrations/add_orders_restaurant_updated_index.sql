@@ -0,0 +1,7 @@
+-- Migration: Index for the dashboard delta sync (GET /api/v1/orders/changes)
+-- The dashboard polls for orders of one restaurant whose updated_at is after
+-- the last watermark. orders is partitioned, so the index is created on every
+-- partition (and on partitions created later).
+
+CREATE INDEX IF NOT EXISTS idx_orders_restaurant_updated
+ON orders(restaurant_id, updated_at);
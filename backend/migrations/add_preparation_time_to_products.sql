@@ -0,0 +1,6 @@
+-- Migration: Preparation time per product
+-- The menu API accepts preparation_time (minutes) on create and update;
+-- store it next to image_url so it is returned on reads.
+
+ALTER TABLE products
+ADD COLUMN IF NOT EXISTS preparation_time INT NULL;
@@ -0,0 +1,8 @@
+-- Migration: Partial index for ready delivery orders
+-- The delivery app polls for orders that are ready to be picked up.
+-- Only a handful of orders are in this state at any time, so a partial index
+-- keeps the lookup cheap regardless of how large the orders table grows.
+
+CREATE INDEX IF NOT EXISTS idx_orders_ready_delivery
+ON orders(created_at, id)
+WHERE order_type = 'delivery' AND status = 'ready';
@@ -0,0 +1,32 @@
+-- Migration: Sales rollup tables for dashboard analytics
+-- Orders are aggregated per restaurant and UTC hour (status counts, revenue)
+-- and order items per restaurant, UTC day and product (quantity, revenue).
+-- repositories/order_repo.py keeps both up to date on every order write;
+-- run python backfill_sales_rollups.py once after applying this migration
+-- (and whenever the rollups need to be rebuilt).
+
+CREATE TABLE IF NOT EXISTS restaurant_sales_hourly (
+    restaurant_id VARCHAR(50) NOT NULL REFERENCES restaurants(id) ON DELETE CASCADE,
+    bucket_date DATE NOT NULL,
+    hour SMALLINT NOT NULL CHECK (hour >= 0 AND hour <= 23),
+    orders_count INT NOT NULL DEFAULT 0,
+    pending_orders INT NOT NULL DEFAULT 0,
+    preparing_orders INT NOT NULL DEFAULT 0,
+    ready_orders INT NOT NULL DEFAULT 0,
+    delivered_orders INT NOT NULL DEFAULT 0,
+    cancelled_orders INT NOT NULL DEFAULT 0,
+    revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (restaurant_id, bucket_date, hour)
+);
+
+CREATE TABLE IF NOT EXISTS restaurant_item_sales_daily (
+    restaurant_id VARCHAR(50) NOT NULL REFERENCES restaurants(id) ON DELETE CASCADE,
+    bucket_date DATE NOT NULL,
+    product_id VARCHAR(50) NOT NULL,
+    product_name VARCHAR(255) NOT NULL,
+    quantity INT NOT NULL DEFAULT 0,
+    revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (restaurant_id, bucket_date, product_id)
+);
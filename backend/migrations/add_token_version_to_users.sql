@@ -0,0 +1,6 @@
+-- Add token_version to users table
+-- Issued JWTs carry the version they were created with; bumping it (password
+-- change, deactivation) revokes every older token without a per-request lookup.
+
+ALTER TABLE users
+ADD COLUMN IF NOT EXISTS token_version INTEGER NOT NULL DEFAULT 0;
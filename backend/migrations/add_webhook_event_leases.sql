@@ -0,0 +1,14 @@
+-- Migration: Leases for queued webhook events
+-- A queued event belongs to the process that queued (or recovered) it until
+-- its lease expires; the process renews the leases of its events with a
+-- heartbeat. Other processes only take over events whose lease expired, so
+-- an event waiting in a live process's in-memory queue is never processed twice.
+
+ALTER TABLE webhook_events ADD COLUMN IF NOT EXISTS lease_owner VARCHAR(100) NULL;
+ALTER TABLE webhook_events ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMP WITH TIME ZONE NULL;
+
+-- Events queued before this migration can be recovered immediately
+UPDATE webhook_events SET lease_expires_at = claimed_at
+WHERE status = 'queued' AND lease_expires_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_webhook_events_lease ON webhook_events(lease_expires_at) WHERE status = 'queued';
@@ -0,0 +1,16 @@
+-- Migration: Work queue columns for queued webhook ingestion
+-- With WEBHOOK_INGESTION_MODE=queue, webhooks are acknowledged as soon as the
+-- delivery is stored in webhook_events (status 'queued') and processed by a
+-- background worker pool (services/webhook_queue_service.py). Rows of the
+-- synchronous mode are plain ledger entries (status 'done').
+-- Events left 'queued' (worker crashed, process restarted) are picked up again
+-- through the partial index.
+
+ALTER TABLE webhook_events ADD COLUMN IF NOT EXISTS status VARCHAR(20) NOT NULL DEFAULT 'done';
+ALTER TABLE webhook_events ADD COLUMN IF NOT EXISTS ordering_key VARCHAR(100) NULL;
+ALTER TABLE webhook_events ADD COLUMN IF NOT EXISTS payload TEXT NULL;
+ALTER TABLE webhook_events ADD COLUMN IF NOT EXISTS attempts INT NOT NULL DEFAULT 0;
+ALTER TABLE webhook_events ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMP WITH TIME ZONE NULL;
+ALTER TABLE webhook_events ADD COLUMN IF NOT EXISTS last_error TEXT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_webhook_events_queued ON webhook_events(claimed_at) WHERE status = 'queued';
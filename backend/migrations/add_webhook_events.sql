@@ -0,0 +1,16 @@
+-- Migration: Idempotency ledger for incoming webhooks
+-- Razorpay retries webhooks (and may deliver one event more than once) and
+-- Twilio retries message posts. Each delivery is recorded here by Razorpay
+-- event ID (X-Razorpay-Event-Id) or Twilio MessageSid before it is processed;
+-- a delivery whose key is already present is acknowledged without doing any
+-- work. The primary key makes the check a single index lookup. Rows older
+-- than WEBHOOK_EVENT_RETENTION_DAYS are deleted by the archival job.
+
+CREATE TABLE IF NOT EXISTS webhook_events (
+    source VARCHAR(20) NOT NULL,
+    event_id VARCHAR(255) NOT NULL,
+    received_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (source, event_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_webhook_events_received_at ON webhook_events(received_at);
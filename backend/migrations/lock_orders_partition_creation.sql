@@ -0,0 +1,38 @@
+-- Migration: Serialize orders partition creation
+-- create_orders_partition() checked for the partition and then created it, so
+-- two workers running ensure_orders_partitions() at startup could both pass
+-- the check; one then failed with duplicate_table and its whole call rolled
+-- back. The function now takes an advisory lock first.
+
+-- Create the monthly partition of orders containing month_start (no-op if it exists).
+-- Rows that already landed in orders_default for that month are moved into it.
+-- Callers are serialized by a transaction-level advisory lock, so workers
+-- starting together don't race between the existence check and CREATE TABLE.
+CREATE OR REPLACE FUNCTION create_orders_partition(month_start DATE)
+RETURNS TEXT AS $$
+DECLARE
+    start_ts TIMESTAMP := date_trunc('month', month_start);
+    end_ts TIMESTAMP := date_trunc('month', month_start) + INTERVAL '1 month';
+    partition_name TEXT := 'orders_' || to_char(month_start, 'YYYY_MM');
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('orders_partitions'));
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN partition_name;
+    END IF;
+
+    EXECUTE format('CREATE TABLE %I (LIKE orders INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', partition_name);
+    IF to_regclass('orders_default') IS NOT NULL THEN
+        EXECUTE format(
+            'WITH moved AS (DELETE FROM orders_default WHERE created_at >= %L AND created_at < %L RETURNING *) '
+            'INSERT INTO %I SELECT * FROM moved',
+            start_ts, end_ts, partition_name
+        );
+    END IF;
+    EXECUTE format(
+        'ALTER TABLE orders ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        partition_name, start_ts, end_ts
+    );
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
@@ -0,0 +1,109 @@
+-- Migration: Partition orders by month on created_at
+-- orders becomes a declaratively range-partitioned table with one partition per
+-- month (orders_YYYY_MM) plus orders_default as a safety net. Queries with
+-- created_at bounds only touch the matching partitions, and old months can be
+-- vacuumed, reindexed or detached independently.
+--
+-- Partitioned tables need the partition key in every unique constraint, so the
+-- primary key becomes (id, created_at) and order ids can no longer be the
+-- target of foreign keys: order_items.order_id and
+-- restaurant_notifications.order_id become plain references (the application
+-- deletes items itself). Order ids stay unique - they come from id_generator.
+--
+-- Future partitions are created by ensure_orders_partitions(), which the API
+-- calls on startup and daily (services/partition_service.py).
+-- Requires PostgreSQL 13+.
+
+BEGIN;
+
+ALTER TABLE order_items DROP CONSTRAINT IF EXISTS fk_order_items_order;
+ALTER TABLE order_items DROP CONSTRAINT IF EXISTS order_items_order_id_fkey;
+ALTER TABLE restaurant_notifications DROP CONSTRAINT IF EXISTS fk_notifications_order;
+ALTER TABLE restaurant_notifications DROP CONSTRAINT IF EXISTS restaurant_notifications_order_id_fkey;
+
+ALTER TABLE orders RENAME TO orders_unpartitioned;
+
+CREATE TABLE orders (LIKE orders_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+PARTITION BY RANGE (created_at);
+
+-- Create the monthly partition of orders containing month_start (no-op if it exists).
+-- Rows that already landed in orders_default for that month are moved into it.
+CREATE OR REPLACE FUNCTION create_orders_partition(month_start DATE)
+RETURNS TEXT AS $$
+DECLARE
+    start_ts TIMESTAMP := date_trunc('month', month_start);
+    end_ts TIMESTAMP := date_trunc('month', month_start) + INTERVAL '1 month';
+    partition_name TEXT := 'orders_' || to_char(month_start, 'YYYY_MM');
+BEGIN
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN partition_name;
+    END IF;
+
+    EXECUTE format('CREATE TABLE %I (LIKE orders INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', partition_name);
+    IF to_regclass('orders_default') IS NOT NULL THEN
+        EXECUTE format(
+            'WITH moved AS (DELETE FROM orders_default WHERE created_at >= %L AND created_at < %L RETURNING *) '
+            'INSERT INTO %I SELECT * FROM moved',
+            start_ts, end_ts, partition_name
+        );
+    END IF;
+    EXECUTE format(
+        'ALTER TABLE orders ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        partition_name, start_ts, end_ts
+    );
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Make sure partitions exist for the current month and months_ahead months after it
+CREATE OR REPLACE FUNCTION ensure_orders_partitions(months_ahead INT DEFAULT 3)
+RETURNS VOID AS $$
+DECLARE
+    m INT;
+BEGIN
+    FOR m IN 0..months_ahead LOOP
+        PERFORM create_orders_partition((date_trunc('month', CURRENT_DATE) + make_interval(months => m))::DATE);
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- One partition per month that has orders, up to 3 months ahead
+DO $$
+DECLARE
+    month_start DATE;
+BEGIN
+    SELECT date_trunc('month', COALESCE(MIN(created_at), CURRENT_DATE))::DATE
+    INTO month_start FROM orders_unpartitioned;
+    WHILE month_start < date_trunc('month', CURRENT_DATE) LOOP
+        PERFORM create_orders_partition(month_start);
+        month_start := (month_start + INTERVAL '1 month')::DATE;
+    END LOOP;
+END $$;
+SELECT ensure_orders_partitions(3);
+CREATE TABLE IF NOT EXISTS orders_default PARTITION OF orders DEFAULT;
+
+INSERT INTO orders SELECT * FROM orders_unpartitioned;
+DROP TABLE orders_unpartitioned;
+
+ALTER TABLE orders ADD CONSTRAINT orders_pkey PRIMARY KEY (id, created_at);
+ALTER TABLE orders ADD CONSTRAINT fk_orders_restaurant
+    FOREIGN KEY (restaurant_id) REFERENCES restaurants(id) ON DELETE CASCADE;
+ALTER TABLE orders ADD CONSTRAINT fk_orders_customer
+    FOREIGN KEY (customer_id) REFERENCES customers(id) ON DELETE CASCADE;
+ALTER TABLE orders ADD CONSTRAINT fk_orders_delivery_person
+    FOREIGN KEY (delivery_person_id) REFERENCES delivery_persons(id) ON DELETE SET NULL;
+
+CREATE INDEX IF NOT EXISTS idx_orders_restaurant_id ON orders(restaurant_id);
+CREATE INDEX IF NOT EXISTS idx_orders_customer_id ON orders(customer_id);
+CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status);
+CREATE INDEX IF NOT EXISTS idx_orders_payment_status ON orders(payment_status);
+CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders(created_at);
+CREATE INDEX IF NOT EXISTS idx_orders_restaurant_status ON orders(restaurant_id, status);
+CREATE INDEX IF NOT EXISTS idx_orders_restaurant_created ON orders(restaurant_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_orders_customer_created ON orders(customer_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_orders_ready_delivery ON orders(created_at, id) WHERE order_type = 'delivery' AND status = 'ready';
+CREATE INDEX IF NOT EXISTS idx_orders_delivery_person_id ON orders(delivery_person_id);
+
+CREATE TRIGGER update_orders_updated_at BEFORE UPDATE ON orders FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+COMMIT;
@@ -13,6 +13,13 @@ from models_db import (
 )
 import json
 from datetime import datetime
+from typing import List, Sequence
+from sqlalchemy import Float, cast
+
+def _float_column(column):
+    """Select a NUMERIC column as double precision: the driver returns a float
+    instead of a Decimal that would be converted right away"""
+    return cast(column, Float).label(column.key)
 
 # Restaurant conversions
 def restaurant_db_to_model(db_restaurant: RestaurantDB) -> Restaurant:
@@ -32,6 +39,34 @@ def restaurant_db_to_model(db_restaurant: RestaurantDB) -> Restaurant:
         cuisine_type=db_restaurant.cuisine_type or "both",
     )
 
+# Read-only paths select RESTAURANT_COLUMNS with a Core select() and build the
+# model from the row tuple: no ORM instance, identity map entry or Decimal per row
+RESTAURANT_COLUMNS = (
+    RestaurantDB.id, RestaurantDB.name, RestaurantDB.phone, RestaurantDB.address,
+    _float_column(RestaurantDB.latitude), _float_column(RestaurantDB.longitude),
+    _float_column(RestaurantDB.delivery_fee), RestaurantDB.is_active, RestaurantDB.upi_id,
+    RestaurantDB.upi_password, RestaurantDB.upi_qr_code, RestaurantDB.cuisine_type,
+)
+
+def restaurant_from_row(row: Sequence) -> Restaurant:
+    """Convert a RESTAURANT_COLUMNS row to Restaurant model"""
+    (restaurant_id, name, phone, address, latitude, longitude, delivery_fee, is_active,
+     upi_id, upi_password, upi_qr_code, cuisine_type) = row
+    return Restaurant(
+        id=restaurant_id,
+        name=name,
+        phone=phone,
+        address=address,
+        latitude=latitude,
+        longitude=longitude,
+        delivery_fee=delivery_fee,
+        is_active=is_active,
+        upi_id=upi_id or "",
+        upi_password=upi_password or "",
+        upi_qr_code=upi_qr_code or "",
+        cuisine_type=cuisine_type or "both",
+    )
+
 def restaurant_model_to_db(model: Restaurant) -> dict:
     """Convert Restaurant model to dict for DB insertion"""
     return {
@@ -61,6 +96,8 @@ def user_db_to_model(db_user: UserDB) -> User:
         two_factor_enabled=db_user.two_factor_enabled if hasattr(db_user, 'two_factor_enabled') else False,
         two_factor_secret=db_user.two_factor_secret or "" if hasattr(db_user, 'two_factor_secret') else "",
         two_factor_backup_codes=db_user.two_factor_backup_codes or "" if hasattr(db_user, 'two_factor_backup_codes') else "",
+        is_active=db_user.is_active,
+        token_version=db_user.token_version or 0,
     )
 
 def user_model_to_db(model: User) -> dict:
@@ -89,6 +126,8 @@ def product_db_to_model(db_product: ProductDB) -> Product:
         is_available=db_product.is_available,
         discounted_price=float(db_product.discounted_price) if db_product.discounted_price else None,
         discount_percentage=float(db_product.discount_percentage) if db_product.discount_percentage else None,
+        image_url=db_product.image_url,
+        preparation_time=db_product.preparation_time,
     )
 
 def product_model_to_db(model: Product) -> dict:
@@ -103,6 +142,8 @@ def product_model_to_db(model: Product) -> dict:
         'is_available': model.is_available,
         'discounted_price': model.discounted_price,
         'discount_percentage': model.discount_percentage,
+        'image_url': model.image_url,
+        'preparation_time': model.preparation_time,
     }
 
 # Order conversions
@@ -136,6 +177,52 @@ def order_db_to_model(db_order: OrderDB, db_items: list[OrderItemDB]) -> Order:
         payment_method=db_order.payment_method,
         customer_upi_name=db_order.customer_upi_name,
         customer_rating=float(db_order.customer_rating) if db_order.customer_rating else None,
+        delivery_person_id=db_order.delivery_person_id,
+    )
+
+# Read-only order paths (listings, polling, lookups) select these columns with
+# a Core select() and build the models straight from the row tuples
+ORDER_COLUMNS = (
+    OrderDB.id, OrderDB.restaurant_id, OrderDB.customer_id, OrderDB.customer_phone,
+    OrderDB.customer_name, OrderDB.order_type, _float_column(OrderDB.delivery_fee),
+    _float_column(OrderDB.total_amount), OrderDB.status, OrderDB.created_at, OrderDB.updated_at,
+    OrderDB.delivery_address, OrderDB.payment_status, OrderDB.payment_method,
+    OrderDB.customer_upi_name, _float_column(OrderDB.customer_rating), OrderDB.delivery_person_id,
+)
+ORDER_ITEM_COLUMNS = (
+    OrderItemDB.order_id, OrderItemDB.product_id, OrderItemDB.product_name,
+    OrderItemDB.quantity, _float_column(OrderItemDB.price),
+)
+
+def order_item_from_row(row: Sequence) -> OrderItem:
+    """Convert an ORDER_ITEM_COLUMNS row to OrderItem model"""
+    _, product_id, product_name, quantity, price = row
+    return OrderItem(product_id=product_id, product_name=product_name, quantity=quantity, price=price)
+
+def order_from_row(row: Sequence, items: List[OrderItem]) -> Order:
+    """Convert an ORDER_COLUMNS row and its items to Order model"""
+    (order_id, restaurant_id, customer_id, customer_phone, customer_name, order_type, delivery_fee,
+     total_amount, status, created_at, updated_at, delivery_address, payment_status, payment_method,
+     customer_upi_name, customer_rating, delivery_person_id) = row
+    return Order(
+        id=order_id,
+        restaurant_id=restaurant_id,
+        customer_id=customer_id,
+        customer_phone=customer_phone,
+        customer_name=customer_name,
+        items=items,
+        order_type=order_type,
+        delivery_fee=delivery_fee,
+        total_amount=total_amount,
+        status=status,
+        created_at=created_at.isoformat() if created_at else datetime.now().isoformat(),
+        updated_at=updated_at.isoformat() if updated_at else datetime.now().isoformat(),
+        delivery_address=delivery_address,
+        payment_status=payment_status,
+        payment_method=payment_method,
+        customer_upi_name=customer_upi_name,
+        customer_rating=customer_rating or None,
+        delivery_person_id=delivery_person_id,
     )
 
 from typing import Tuple
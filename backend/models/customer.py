@@ -3,7 +3,7 @@ Customer model - Pure data structure
 """
 from dataclasses import dataclass
 
-@dataclass
+@dataclass(slots=True)
 class Customer:
     """Customer entity"""
     id: str
@@ -4,7 +4,7 @@ Delivery Person model - Pure data structure
 from dataclasses import dataclass
 from typing import Optional
 
-@dataclass
+@dataclass(slots=True)
 class DeliveryPerson:
     """Delivery person model"""
     id: str
@@ -17,3 +17,5 @@ class DeliveryPerson:
     is_available: bool = False
     current_latitude: Optional[float] = None
     current_longitude: Optional[float] = None
+    last_location_update: Optional[str] = None  # ISO format timestamp of the last location ping
+    created_at: Optional[str] = None  # ISO format timestamp
@@ -5,7 +5,7 @@ from dataclasses import dataclass
 from typing import Optional
 from datetime import datetime
 
-@dataclass
+@dataclass(slots=True)
 class RestaurantNotification:
     """Restaurant notification entity"""
     id: str
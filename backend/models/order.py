@@ -4,7 +4,7 @@ Order models - Pure data structures
 from dataclasses import dataclass, field
 from typing import List, Optional
 
-@dataclass
+@dataclass(slots=True)
 class OrderItem:
     """Order line item"""
     product_id: str
@@ -12,7 +12,7 @@ class OrderItem:
     quantity: int
     price: float
 
-@dataclass
+@dataclass(slots=True)
 class Order:
     """Order entity"""
     id: str
@@ -32,6 +32,7 @@ class Order:
     payment_method: str = "cod"  # "cod" or "online"
     customer_upi_name: Optional[str] = None  # UPI name shown when payment is verified
     customer_rating: Optional[float] = None  # Rating given by customer after delivery (1-5)
+    delivery_person_id: Optional[str] = None  # Assigned delivery person (set by dispatch only)
     # For backward compatibility
     @property
     def subtotal(self) -> float:
@@ -4,7 +4,7 @@ Product model - Pure data structure
 from dataclasses import dataclass
 from typing import Optional
 
-@dataclass
+@dataclass(slots=True)
 class Product:
     """Menu item/product"""
     id: str
@@ -16,5 +16,7 @@ class Product:
     is_available: bool = True
     discounted_price: Optional[float] = None  # Discounted price (if any)
     discount_percentage: Optional[float] = None  # Discount percentage (calculated)
+    image_url: Optional[str] = None
+    preparation_time: Optional[int] = None  # Minutes
 
 
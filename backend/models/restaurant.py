@@ -3,7 +3,7 @@ Restaurant model - Pure data structure
 """
 from dataclasses import dataclass
 
-@dataclass
+@dataclass(slots=True)
 class Restaurant:
     """Restaurant entity"""
     id: str
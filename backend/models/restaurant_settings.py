@@ -4,7 +4,7 @@ Restaurant Settings Model
 from dataclasses import dataclass
 from typing import Optional
 
-@dataclass
+@dataclass(slots=True)
 class RestaurantSettings:
     """Restaurant settings entity"""
     id: str
@@ -7,7 +7,7 @@ from typing import List, Optional, Dict, TYPE_CHECKING
 if TYPE_CHECKING:
     from models.order import OrderItem
 
-@dataclass
+@dataclass(slots=True)
 class CustomerSession:
     """Customer WhatsApp session"""
     phone_number: str
@@ -3,7 +3,7 @@ User model - Pure data structure
 """
 from dataclasses import dataclass
 
-@dataclass
+@dataclass(slots=True)
 class User:
     """Restaurant admin user"""
     id: str
@@ -14,5 +14,7 @@ class User:
     two_factor_enabled: bool = False
     two_factor_secret: str = ""  # TOTP secret key
     two_factor_backup_codes: str = ""  # JSON array of backup codes
+    is_active: bool = True
+    token_version: int = 0  # Bumped to revoke previously issued JWTs
 
 
@@ -2,7 +2,7 @@
 SQLAlchemy Database Models
 These models map to the PostgreSQL database tables
 """
-from sqlalchemy import Column, String, Integer, Float, Boolean, Text, Date, DateTime, ForeignKey, DECIMAL
+from sqlalchemy import Column, String, Integer, SmallInteger, Float, Boolean, Text, Date, DateTime, ForeignKey, DECIMAL
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -26,6 +26,7 @@ class RestaurantDB(Base):
     cuisine_type = Column(String(50), nullable=False, default='both')
     subscription_plan = Column(String(50), default='free')
     subscription_end_date = Column(Date, nullable=True)
+    menu_version = Column(Integer, nullable=False, server_default='0')  # Bumped on every menu change
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     
@@ -69,6 +70,7 @@ class UserDB(Base):
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     is_active = Column(Boolean, nullable=False, default=True)
     last_login = Column(DateTime(timezone=True), nullable=True)
+    token_version = Column(Integer, nullable=False, default=0, server_default='0')  # Bumped to revoke issued JWTs
     
     # Multi-Factor Authentication (MFA)
     two_factor_enabled = Column(Boolean, nullable=False, default=False)
@@ -90,6 +92,7 @@ class UserDB(Base):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'is_active': self.is_active,
             'last_login': self.last_login.isoformat() if self.last_login else None,
+            'token_version': self.token_version,
         }
 
 
@@ -107,6 +110,7 @@ class ProductDB(Base):
     category = Column(String(100), nullable=False)
     is_available = Column(Boolean, nullable=False, default=True)
     image_url = Column(String(500), nullable=True)
+    preparation_time = Column(Integer, nullable=True)  # Minutes
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     
@@ -127,6 +131,7 @@ class ProductDB(Base):
             'category': self.category,
             'is_available': self.is_available,
             'image_url': self.image_url,
+            'preparation_time': self.preparation_time,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
         }
@@ -167,6 +172,8 @@ class CustomerDB(Base):
 class OrderDB(Base):
     """Order model for database"""
     __tablename__ = 'orders'
+    # Partitioned by month on created_at (see init-db.sql); the table's primary
+    # key is (id, created_at), ids alone are still unique.
     
     id = Column(String(50), primary_key=True)
     restaurant_id = Column(String(50), ForeignKey('restaurants.id', ondelete='CASCADE'), nullable=False)
@@ -183,13 +190,18 @@ class OrderDB(Base):
     customer_upi_name = Column(String(255), nullable=True)
     delivery_address = Column(Text, nullable=True)
     customer_rating = Column(DECIMAL(3, 2), nullable=True)
+    delivery_person_id = Column(String(50), ForeignKey('delivery_persons.id', ondelete='SET NULL'), nullable=True)
+    assigned_at = Column(DateTime(timezone=True), nullable=True)  # When a delivery person was assigned
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     
     # Relationships
     restaurant = relationship("RestaurantDB", back_populates="orders")
     customer = relationship("CustomerDB", back_populates="orders")
-    items = relationship("OrderItemDB", back_populates="order", cascade="all, delete-orphan")
+    items = relationship(
+        "OrderItemDB", back_populates="order", cascade="all, delete-orphan",
+        primaryjoin="OrderDB.id == foreign(OrderItemDB.order_id)"
+    )
     
     def to_dict(self):
         """Convert to dictionary"""
@@ -219,7 +231,7 @@ class OrderItemDB(Base):
     __tablename__ = 'order_items'
     
     id = Column(String(50), primary_key=True)
-    order_id = Column(String(50), ForeignKey('orders.id', ondelete='CASCADE'), nullable=False)
+    order_id = Column(String(50), nullable=False, index=True)  # No FK: orders is partitioned
     product_id = Column(String(50), ForeignKey('products.id', ondelete='RESTRICT'), nullable=False)
     product_name = Column(String(255), nullable=False)
     quantity = Column(Integer, nullable=False)
@@ -227,7 +239,10 @@ class OrderItemDB(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     
     # Relationships
-    order = relationship("OrderDB", back_populates="items")
+    order = relationship(
+        "OrderDB", back_populates="items",
+        primaryjoin="OrderDB.id == foreign(OrderItemDB.order_id)"
+    )
     product = relationship("ProductDB", back_populates="order_items")
     
     def to_dict(self):
@@ -317,7 +332,7 @@ class PaymentDB(Base):
     
     id = Column(String(50), primary_key=True)
     restaurant_id = Column(String(50), ForeignKey('restaurants.id', ondelete='SET NULL'), nullable=True)
-    order_id = Column(String(50), ForeignKey('orders.id', ondelete='SET NULL'), nullable=True)
+    order_id = Column(String(50), nullable=True)  # No FK: payment history outlives archived orders
     transaction_type = Column(String(20), nullable=False)
     amount = Column(DECIMAL(10, 2), nullable=False)
     payment_method = Column(String(50), nullable=False)
@@ -414,13 +429,85 @@ class RestaurantRatingDB(Base):
         }
 
 
+class RestaurantArchivedOrderTotalsDB(Base):
+    """Running totals of a restaurant's orders moved to orders_archive"""
+    __tablename__ = 'restaurant_archived_order_totals'
+    
+    restaurant_id = Column(String(50), ForeignKey('restaurants.id', ondelete='CASCADE'), primary_key=True)
+    archived_orders = Column(Integer, nullable=False, default=0)
+    delivered_orders = Column(Integer, nullable=False, default=0)
+    cancelled_orders = Column(Integer, nullable=False, default=0)
+    rated_orders = Column(Integer, nullable=False, default=0)
+    rating_sum = Column(DECIMAL(14, 2), nullable=False, default=0)
+    delivered_revenue = Column(DECIMAL(14, 2), nullable=False, default=0)
+    archived_through = Column(DateTime(timezone=True), nullable=True)  # created_at of the newest archived order
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+    
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            'restaurant_id': self.restaurant_id,
+            'archived_orders': self.archived_orders,
+            'delivered_orders': self.delivered_orders,
+            'cancelled_orders': self.cancelled_orders,
+            'rated_orders': self.rated_orders,
+            'rating_sum': float(self.rating_sum),
+            'delivered_revenue': float(self.delivered_revenue),
+            'archived_through': self.archived_through.isoformat() if self.archived_through else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+
+class RestaurantArchivedNotificationTotalsDB(Base):
+    """Counts of a restaurant's notifications moved to restaurant_notifications_archive, by event and status"""
+    __tablename__ = 'restaurant_archived_notification_totals'
+    
+    restaurant_id = Column(String(50), ForeignKey('restaurants.id', ondelete='CASCADE'), primary_key=True)
+    notification_event = Column(String(50), primary_key=True)
+    status = Column(String(20), primary_key=True)
+    archived_notifications = Column(Integer, nullable=False, default=0)
+    clicked_notifications = Column(Integer, nullable=False, default=0)  # With a button_clicked
+    archived_through = Column(DateTime(timezone=True), nullable=True)  # created_at of the newest archived notification
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
+class RestaurantSalesHourlyDB(Base):
+    """Per-restaurant order counts and revenue per UTC hour (sales rollup)"""
+    __tablename__ = 'restaurant_sales_hourly'
+    
+    restaurant_id = Column(String(50), ForeignKey('restaurants.id', ondelete='CASCADE'), primary_key=True)
+    bucket_date = Column(Date, primary_key=True)  # UTC day of created_at
+    hour = Column(SmallInteger, primary_key=True)  # UTC hour of created_at, 0-23
+    orders_count = Column(Integer, nullable=False, default=0)
+    pending_orders = Column(Integer, nullable=False, default=0)
+    preparing_orders = Column(Integer, nullable=False, default=0)
+    ready_orders = Column(Integer, nullable=False, default=0)
+    delivered_orders = Column(Integer, nullable=False, default=0)
+    cancelled_orders = Column(Integer, nullable=False, default=0)
+    revenue = Column(DECIMAL(14, 2), nullable=False, default=0)  # total_amount of delivered orders
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
+class RestaurantItemSalesDailyDB(Base):
+    """Per-restaurant quantities sold per product per UTC day (sales rollup, cancelled orders excluded)"""
+    __tablename__ = 'restaurant_item_sales_daily'
+    
+    restaurant_id = Column(String(50), ForeignKey('restaurants.id', ondelete='CASCADE'), primary_key=True)
+    bucket_date = Column(Date, primary_key=True)
+    product_id = Column(String(50), primary_key=True)  # No FK: keeps history of deleted products
+    product_name = Column(String(255), nullable=False)
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(DECIMAL(14, 2), nullable=False, default=0)  # price * quantity
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
 class RestaurantNotificationDB(Base):
     """Restaurant Notification model for database"""
     __tablename__ = 'restaurant_notifications'
     
     id = Column(String(50), primary_key=True)
     restaurant_id = Column(String(50), ForeignKey('restaurants.id', ondelete='CASCADE'), nullable=False)
-    order_id = Column(String(50), ForeignKey('orders.id', ondelete='SET NULL'), nullable=True)
+    order_id = Column(String(50), nullable=True)  # No FK: orders is partitioned
     notification_type = Column(String(20), nullable=False)  # 'whatsapp', 'email', 'sms'
     notification_event = Column(String(50), nullable=False)  # 'new_order', 'order_status_changed', etc.
     recipient = Column(String(255), nullable=False)  # phone number, email, etc.
@@ -434,7 +521,10 @@ class RestaurantNotificationDB(Base):
     
     # Relationships
     restaurant = relationship("RestaurantDB", backref="notifications")
-    order = relationship("OrderDB", backref="notifications")
+    order = relationship(
+        "OrderDB", backref="notifications",
+        primaryjoin="OrderDB.id == foreign(RestaurantNotificationDB.order_id)"
+    )
     
     def to_dict(self):
         """Convert to dictionary"""
@@ -554,6 +644,7 @@ class DeliveryPersonDB(Base):
     is_available = Column(Boolean, nullable=False, default=False)
     current_latitude = Column(DECIMAL(10, 8), nullable=True)
     current_longitude = Column(DECIMAL(11, 8), nullable=True)
+    last_location_update = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     
@@ -570,6 +661,27 @@ class DeliveryPersonDB(Base):
             'is_available': self.is_available,
             'current_latitude': float(self.current_latitude) if self.current_latitude else None,
             'current_longitude': float(self.current_longitude) if self.current_longitude else None,
+            'last_location_update': self.last_location_update.isoformat() if self.last_location_update else None,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
         }
+
+
+class WebhookEventDB(Base):
+    """
+    Idempotency ledger of webhook deliveries (Razorpay event ID, Twilio MessageSid),
+    also the work queue of the queued ingestion mode (services/webhook_queue_service.py)
+    """
+    __tablename__ = 'webhook_events'
+    
+    source = Column(String(20), primary_key=True)  # 'razorpay' or 'twilio'
+    event_id = Column(String(255), primary_key=True)
+    received_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+    status = Column(String(20), nullable=False, default='done', server_default='done')  # 'queued', 'done', 'failed'
+    ordering_key = Column(String(100), nullable=True)  # Events with the same key are processed in order
+    payload = Column(Text, nullable=True)  # JSON of the delivery (queued events)
+    attempts = Column(Integer, nullable=False, default=0, server_default='0')
+    claimed_at = Column(DateTime(timezone=True), nullable=True)  # When a worker last took the event
+    lease_owner = Column(String(100), nullable=True)  # Process holding the queued event
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)  # Renewed by the owner's heartbeat
+    last_error = Column(Text, nullable=True)
@@ -0,0 +1,262 @@
+"""
+Archive Repository - Data access layer for archived notifications and orders
+Archive tables mirror the columns of restaurant_notifications, orders and
+order_items (see migrations/add_archive_tables.sql). Rows are moved in batches:
+copy into the archive and delete from the hot table in one transaction.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Column, MetaData, Table, case, delete, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from database import SessionLocal
+from models_db import (
+    OrderDB, OrderItemDB, RestaurantNotificationDB, RestaurantArchivedOrderTotalsDB,
+    RestaurantArchivedNotificationTotalsDB
+)
+from models.order import Order
+from models.notification import RestaurantNotification
+from model_converters import order_db_to_model
+
+# Orders in these states never change again and may be archived
+ARCHIVABLE_ORDER_STATUSES = ("delivered", "cancelled")
+
+# Archive tables are managed by migrations, not Base.metadata.create_all
+_archive_metadata = MetaData()
+
+
+def _archive_table(source: Table, name: str) -> Table:
+    """Same columns as `source`, without keys or constraints"""
+    return Table(name, _archive_metadata, *[
+        Column(column.name, column.type, primary_key=column.primary_key, nullable=column.nullable)
+        for column in source.columns
+    ])
+
+
+notifications_archive = _archive_table(RestaurantNotificationDB.__table__, "restaurant_notifications_archive")
+orders_archive = _archive_table(OrderDB.__table__, "orders_archive")
+order_items_archive = _archive_table(OrderItemDB.__table__, "order_items_archive")
+
+
+def _copy_rows(db, source: Table, target: Table, condition):
+    """INSERT INTO target (...) SELECT ... FROM source WHERE condition"""
+    columns = [column.name for column in target.columns]
+    db.execute(insert(target).from_select(
+        columns, select(*[source.c[name] for name in columns]).where(condition)
+    ))
+
+
+def _add_notification_totals(db, condition):
+    """Add the notifications matching condition (about to be archived) to
+    restaurant_archived_notification_totals, in the caller's transaction"""
+    notifications = RestaurantNotificationDB.__table__
+    totals = RestaurantArchivedNotificationTotalsDB.__table__
+    batch_totals = select(
+        notifications.c.restaurant_id,
+        notifications.c.notification_event,
+        notifications.c.status,
+        func.count(),
+        func.count(notifications.c.button_clicked),
+        func.max(notifications.c.created_at),
+    ).where(condition).group_by(
+        notifications.c.restaurant_id, notifications.c.notification_event, notifications.c.status
+    )
+    upsert = pg_insert(totals).from_select([
+        'restaurant_id', 'notification_event', 'status',
+        'archived_notifications', 'clicked_notifications', 'archived_through'
+    ], batch_totals)
+    db.execute(upsert.on_conflict_do_update(
+        index_elements=[totals.c.restaurant_id, totals.c.notification_event, totals.c.status],
+        set_={
+            'archived_notifications': totals.c.archived_notifications + upsert.excluded.archived_notifications,
+            'clicked_notifications': totals.c.clicked_notifications + upsert.excluded.clicked_notifications,
+            'archived_through': func.greatest(totals.c.archived_through, upsert.excluded.archived_through),
+            'updated_at': func.now(),
+        }
+    ))
+
+
+def archive_notifications_batch(cutoff: datetime, batch_size: int = 1000) -> int:
+    """
+    Move up to batch_size notifications created before cutoff to the archive
+    Their counts are added to restaurant_archived_notification_totals in the
+    same transaction, so the notification stats do not change.
+    Returns: number of notifications moved
+    """
+    source = RestaurantNotificationDB.__table__
+    db = SessionLocal()
+    try:
+        ids = db.execute(
+            select(source.c.id).where(source.c.created_at < cutoff)
+            .order_by(source.c.created_at).limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).scalars().all()
+        if not ids:
+            return 0
+
+        _add_notification_totals(db, source.c.id.in_(ids))
+        _copy_rows(db, source, notifications_archive, source.c.id.in_(ids))
+        db.execute(delete(source).where(source.c.id.in_(ids)))
+        db.commit()
+        return len(ids)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def archive_orders_batch(cutoff: datetime, batch_size: int = 1000) -> int:
+    """
+    Move up to batch_size finished orders created before cutoff, with their
+    items and notifications, to the archive
+    Their counts and revenue are added to restaurant_archived_order_totals (and
+    their notifications to restaurant_archived_notification_totals) in the same
+    transaction, so ratings, dashboard totals and notification stats do not change.
+    Returns: number of orders moved
+    """
+    orders = OrderDB.__table__
+    items = OrderItemDB.__table__
+    notifications = RestaurantNotificationDB.__table__
+    totals = RestaurantArchivedOrderTotalsDB.__table__
+    db = SessionLocal()
+    try:
+        ids = db.execute(
+            select(orders.c.id).where(
+                orders.c.created_at < cutoff,
+                orders.c.status.in_(ARCHIVABLE_ORDER_STATUSES)
+            ).order_by(orders.c.created_at).limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).scalars().all()
+        if not ids:
+            return 0
+
+        in_batch = orders.c.id.in_(ids)
+        delivered = orders.c.status == "delivered"
+        batch_totals = select(
+            orders.c.restaurant_id,
+            func.count(),
+            func.sum(case((delivered, 1), else_=0)),
+            func.sum(case((orders.c.status == "cancelled", 1), else_=0)),
+            func.count(orders.c.customer_rating),
+            func.coalesce(func.sum(orders.c.customer_rating), 0),
+            func.coalesce(func.sum(case((delivered, orders.c.total_amount), else_=0)), 0),
+            func.max(orders.c.created_at),
+        ).where(in_batch).group_by(orders.c.restaurant_id)
+        upsert = pg_insert(totals).from_select([
+            'restaurant_id', 'archived_orders', 'delivered_orders', 'cancelled_orders',
+            'rated_orders', 'rating_sum', 'delivered_revenue', 'archived_through'
+        ], batch_totals)
+        db.execute(upsert.on_conflict_do_update(
+            index_elements=[totals.c.restaurant_id],
+            set_={
+                'archived_orders': totals.c.archived_orders + upsert.excluded.archived_orders,
+                'delivered_orders': totals.c.delivered_orders + upsert.excluded.delivered_orders,
+                'cancelled_orders': totals.c.cancelled_orders + upsert.excluded.cancelled_orders,
+                'rated_orders': totals.c.rated_orders + upsert.excluded.rated_orders,
+                'rating_sum': totals.c.rating_sum + upsert.excluded.rating_sum,
+                'delivered_revenue': totals.c.delivered_revenue + upsert.excluded.delivered_revenue,
+                'archived_through': func.greatest(totals.c.archived_through, upsert.excluded.archived_through),
+                'updated_at': func.now(),
+            }
+        ))
+
+        _copy_rows(db, items, order_items_archive, items.c.order_id.in_(ids))
+        _copy_rows(db, orders, orders_archive, in_batch)
+        _add_notification_totals(db, notifications.c.order_id.in_(ids))
+        _copy_rows(db, notifications, notifications_archive, notifications.c.order_id.in_(ids))
+        db.execute(delete(notifications).where(notifications.c.order_id.in_(ids)))
+        # No FK cascade from orders: it is partitioned (see init-db.sql)
+        db.execute(delete(items).where(items.c.order_id.in_(ids)))
+        db.execute(delete(orders).where(in_batch))
+        db.commit()
+        return len(ids)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def get_archived_order_totals(restaurant_ids: List[str]) -> Dict[str, Dict]:
+    """Archived order totals per restaurant (restaurants without archived orders are omitted)"""
+    if not restaurant_ids:
+        return {}
+    db = SessionLocal()
+    try:
+        rows = db.query(RestaurantArchivedOrderTotalsDB).filter(
+            RestaurantArchivedOrderTotalsDB.restaurant_id.in_(restaurant_ids)
+        ).all()
+        return {row.restaurant_id: row.to_dict() for row in rows}
+    finally:
+        db.close()
+
+
+def get_archived_notification_counts(restaurant_id: str, since: Optional[datetime] = None,
+                                     until: Optional[datetime] = None) -> List[Tuple[str, str, int, int]]:
+    """
+    Counts of the restaurant's archived notifications created in [since, until)
+    Read from restaurant_archived_notification_totals when the window covers
+    all archived notifications, otherwise from the archive table itself.
+    Returns: [(event, status, count, clicked count)]
+    """
+    totals = RestaurantArchivedNotificationTotalsDB.__table__
+    db = SessionLocal()
+    try:
+        rows = db.execute(select(
+            totals.c.notification_event, totals.c.status,
+            totals.c.archived_notifications, totals.c.clicked_notifications, totals.c.archived_through
+        ).where(totals.c.restaurant_id == restaurant_id)).all()
+        if not rows:
+            return []
+        archived_through = max((row.archived_through for row in rows if row.archived_through), default=None)
+        if since is None and (until is None or archived_through is None or until > archived_through):
+            return [(row[0], row[1], row[2], row[3]) for row in rows]
+        
+        archive = notifications_archive
+        conditions = [archive.c.restaurant_id == restaurant_id]
+        if since is not None:
+            if archived_through is not None and since > archived_through:
+                return []
+            conditions.append(archive.c.created_at >= since)
+        if until is not None:
+            conditions.append(archive.c.created_at < until)
+        return [tuple(row) for row in db.execute(select(
+            archive.c.notification_event, archive.c.status, func.count(), func.count(archive.c.button_clicked)
+        ).where(*conditions).group_by(archive.c.notification_event, archive.c.status)).all()]
+    finally:
+        db.close()
+
+
+def get_archived_order(order_id: str) -> Optional[Order]:
+    """Read-through lookup of an order that was moved to the archive"""
+    db = SessionLocal()
+    try:
+        db_order = db.execute(
+            select(orders_archive).where(orders_archive.c.id == order_id)
+        ).first()
+        if not db_order:
+            return None
+        db_items = db.execute(
+            select(order_items_archive).where(order_items_archive.c.order_id == order_id)
+        ).all()
+        return order_db_to_model(db_order, db_items)
+    finally:
+        db.close()
+
+
+def get_archived_notification_by_order_id(order_id: str) -> Optional[RestaurantNotification]:
+    """Read-through lookup of the most recent archived notification for an order"""
+    db = SessionLocal()
+    try:
+        n = db.execute(
+            select(notifications_archive).where(notifications_archive.c.order_id == order_id)
+            .order_by(notifications_archive.c.created_at.desc()).limit(1)
+        ).first()
+        if not n:
+            return None
+        from repositories.notification_repo import _notification_db_to_model
+        return _notification_db_to_model(n)
+    finally:
+        db.close()
@@ -89,42 +89,6 @@ def find_nearest_restaurant(customer_latitude: float, customer_longitude: float)
     """
     Find nearest restaurant based on customer location
     """
-    from repositories.restaurant_repo import get_all_restaurants
-    import math
+    from geo_index import restaurant_geo_index
     
-    restaurants = get_all_restaurants()
-    if not restaurants:
-        return None
-    
-    nearest_restaurant = None
-    min_distance = float('inf')
-    
-    # Calculate distance using Haversine formula
-    def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-        """Calculate distance between two points in kilometers"""
-        R = 6371  # Earth radius in kilometers
-        
-        dlat = math.radians(lat2 - lat1)
-        dlon = math.radians(lon2 - lon1)
-        
-        a = (math.sin(dlat / 2) ** 2 +
-             math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) *
-             math.sin(dlon / 2) ** 2)
-        
-        c = 2 * math.asin(math.sqrt(a))
-        return R * c
-    
-    for restaurant in restaurants:
-        if not restaurant.is_active:
-            continue
-        
-        distance = haversine_distance(
-            customer_latitude, customer_longitude,
-            restaurant.latitude, restaurant.longitude
-        )
-        
-        if distance < min_distance:
-            min_distance = distance
-            nearest_restaurant = restaurant
-    
-    return nearest_restaurant
+    return restaurant_geo_index.nearest(customer_latitude, customer_longitude)
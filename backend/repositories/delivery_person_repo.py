@@ -1,7 +1,9 @@
 """
 Delivery Person Repository - Data access layer for delivery persons
 """
-from typing import Optional
+from typing import List, Optional, Tuple
+from datetime import datetime
+from sqlalchemy import bindparam, update
 from models.delivery_person import DeliveryPerson
 from database import SessionLocal
 from models_db import DeliveryPersonDB
@@ -105,6 +107,84 @@ def update_delivery_person(person: DeliveryPerson) -> Optional[DeliveryPerson]:
     finally:
         db.close()
 
+def get_available_delivery_persons() -> List[DeliveryPerson]:
+    """Get all delivery persons who are available and have a known location"""
+    db = SessionLocal()
+    try:
+        db_persons = db.query(DeliveryPersonDB).filter(
+            DeliveryPersonDB.is_available == True,
+            DeliveryPersonDB.current_latitude.isnot(None),
+            DeliveryPersonDB.current_longitude.isnot(None)
+        ).all()
+        return [delivery_person_db_to_model(p) for p in db_persons]
+    finally:
+        db.close()
+
+def set_delivery_person_availability(person_id: str, is_available: bool) -> bool:
+    """Set availability of a delivery person with a single UPDATE"""
+    db = SessionLocal()
+    try:
+        updated = db.query(DeliveryPersonDB).filter(
+            DeliveryPersonDB.id == person_id
+        ).update({DeliveryPersonDB.is_available: is_available}, synchronize_session=False)
+        db.commit()
+        return updated > 0
+    except Exception as e:
+        db.rollback()
+        raise e
+    finally:
+        db.close()
+
+def update_delivery_person_location(person_id: str, latitude: float, longitude: float,
+                                    timestamp: Optional[datetime] = None) -> bool:
+    """Store the latest location of a delivery person with a single UPDATE"""
+    db = SessionLocal()
+    try:
+        updated = db.query(DeliveryPersonDB).filter(
+            DeliveryPersonDB.id == person_id
+        ).update({
+            DeliveryPersonDB.current_latitude: latitude,
+            DeliveryPersonDB.current_longitude: longitude,
+            DeliveryPersonDB.last_location_update: timestamp or datetime.now(),
+        }, synchronize_session=False)
+        db.commit()
+        return updated > 0
+    except Exception as e:
+        db.rollback()
+        raise e
+    finally:
+        db.close()
+
+def update_delivery_person_locations(locations: List[Tuple[str, float, float, datetime]]) -> int:
+    """
+    Store the latest locations of many delivery persons in one executemany UPDATE
+    Args: [(person_id, latitude, longitude, timestamp)]
+    Returns: number of rows written
+    """
+    if not locations:
+        return 0
+    
+    db = SessionLocal()
+    try:
+        statement = update(DeliveryPersonDB).where(
+            DeliveryPersonDB.id == bindparam('person_id')
+        ).values(
+            current_latitude=bindparam('latitude'),
+            current_longitude=bindparam('longitude'),
+            last_location_update=bindparam('timestamp'),
+        ).execution_options(synchronize_session=False)
+        db.connection().execute(statement, [
+            {'person_id': person_id, 'latitude': latitude, 'longitude': longitude, 'timestamp': timestamp}
+            for person_id, latitude, longitude, timestamp in locations
+        ])
+        db.commit()
+        return len(locations)
+    except Exception as e:
+        db.rollback()
+        raise e
+    finally:
+        db.close()
+
 def delivery_person_db_to_model(db_person: DeliveryPersonDB) -> DeliveryPerson:
     """Convert database model to dataclass model"""
     return DeliveryPerson(
@@ -117,5 +197,7 @@ def delivery_person_db_to_model(db_person: DeliveryPersonDB) -> DeliveryPerson:
         license_number=db_person.license_number,
         is_available=db_person.is_available,
         current_latitude=float(db_person.current_latitude) if db_person.current_latitude else None,
-        current_longitude=float(db_person.current_longitude) if db_person.current_longitude else None
+        current_longitude=float(db_person.current_longitude) if db_person.current_longitude else None,
+        last_location_update=db_person.last_location_update.isoformat() if db_person.last_location_update else None,
+        created_at=db_person.created_at.isoformat() if db_person.created_at else None
     )
@@ -1,7 +1,8 @@
 """
 Notification Repository
 """
-from typing import Optional, List
+from typing import Dict, Optional, List, Tuple
+from sqlalchemy import func, tuple_
 from database import SessionLocal
 from models_db import RestaurantNotificationDB
 from models.notification import RestaurantNotification
@@ -96,35 +97,109 @@ def update_notification_status(notification_id: str, status: str, button_clicked
     finally:
         db.close()
 
-def get_notifications_by_restaurant(restaurant_id: str, limit: int = 100) -> List[RestaurantNotification]:
-    """Get notifications for a restaurant"""
+def _notification_db_to_model(n: RestaurantNotificationDB) -> RestaurantNotification:
+    return RestaurantNotification(
+        id=n.id,
+        restaurant_id=n.restaurant_id,
+        order_id=n.order_id,
+        notification_type=n.notification_type,
+        notification_event=n.notification_event,
+        recipient=n.recipient,
+        message_body=n.message_body,
+        status=n.status,
+        button_clicked=n.button_clicked,
+        clicked_at=n.clicked_at.isoformat() if n.clicked_at else None,
+        error_message=n.error_message,
+        created_at=n.created_at.isoformat() if n.created_at else None,
+        updated_at=n.updated_at.isoformat() if n.updated_at else None
+    )
+
+def _restaurant_filters(restaurant_id: str, event: Optional[str] = None, status: Optional[str] = None,
+                        since: Optional[datetime] = None, until: Optional[datetime] = None) -> list:
+    filters = [RestaurantNotificationDB.restaurant_id == restaurant_id]
+    if event:
+        filters.append(RestaurantNotificationDB.notification_event == event)
+    if status:
+        filters.append(RestaurantNotificationDB.status == status)
+    if since:
+        filters.append(RestaurantNotificationDB.created_at >= since)
+    if until:
+        filters.append(RestaurantNotificationDB.created_at < until)
+    return filters
+
+def get_notifications_by_restaurant(
+    restaurant_id: str,
+    limit: int = 100,
+    event: Optional[str] = None,
+    status: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    before: Optional[Tuple[datetime, str]] = None
+) -> List[RestaurantNotification]:
+    """
+    Get notifications for a restaurant, newest first
+    All filters run in SQL. `before` is a keyset cursor (created_at, id) of the
+    last notification of the previous page; results continue after it.
+    """
     db = SessionLocal()
     try:
-        db_notifications = db.query(RestaurantNotificationDB).filter(
-            RestaurantNotificationDB.restaurant_id == restaurant_id
-        ).order_by(RestaurantNotificationDB.created_at.desc()).limit(limit).all()
-        
-        return [
-            RestaurantNotification(
-                id=n.id,
-                restaurant_id=n.restaurant_id,
-                order_id=n.order_id,
-                notification_type=n.notification_type,
-                notification_event=n.notification_event,
-                recipient=n.recipient,
-                message_body=n.message_body,
-                status=n.status,
-                button_clicked=n.button_clicked,
-                clicked_at=n.clicked_at.isoformat() if n.clicked_at else None,
-                error_message=n.error_message,
-                created_at=n.created_at.isoformat() if n.created_at else None,
-                updated_at=n.updated_at.isoformat() if n.updated_at else None
+        filters = _restaurant_filters(restaurant_id, event, status, since, until)
+        if before:
+            filters.append(
+                tuple_(RestaurantNotificationDB.created_at, RestaurantNotificationDB.id) < tuple_(*before)
             )
-            for n in db_notifications
-        ]
+        
+        db_notifications = db.query(RestaurantNotificationDB).filter(*filters).order_by(
+            RestaurantNotificationDB.created_at.desc(), RestaurantNotificationDB.id.desc()
+        ).limit(limit).all()
+        
+        return [_notification_db_to_model(n) for n in db_notifications]
     finally:
         db.close()
 
+def get_notification_stats(restaurant_id: str, since: Optional[datetime] = None,
+                           until: Optional[datetime] = None) -> Dict:
+    """
+    Count a restaurant's notifications by status and event with one GROUP BY,
+    plus the archived ones (archive_repo.get_archived_notification_counts)
+    Returns: {'total', 'delivered', 'failed', 'pending', 'clicked',
+              'by_status': {status: count}, 'by_event': {event: count}}
+    """
+    db = SessionLocal()
+    try:
+        rows = db.query(
+            RestaurantNotificationDB.notification_event,
+            RestaurantNotificationDB.status,
+            func.count(),
+            func.count(RestaurantNotificationDB.button_clicked)
+        ).filter(
+            *_restaurant_filters(restaurant_id, since=since, until=until)
+        ).group_by(
+            RestaurantNotificationDB.notification_event, RestaurantNotificationDB.status
+        ).all()
+    finally:
+        db.close()
+    from repositories.archive_repo import get_archived_notification_counts
+    rows = list(rows) + get_archived_notification_counts(restaurant_id, since=since, until=until)
+    
+    by_status: Dict[str, int] = {}
+    by_event: Dict[str, int] = {}
+    clicked = 0
+    for event, status, count, clicked_count in rows:
+        by_status[status] = by_status.get(status, 0) + count
+        by_event[event] = by_event.get(event, 0) + count
+        clicked += clicked_count
+    
+    return {
+        'total': sum(by_status.values()),
+        'delivered': by_status.get('delivered', 0),
+        'failed': by_status.get('failed', 0),
+        'pending': by_status.get('pending', 0) + by_status.get('sent', 0),
+        'clicked': clicked,
+        'by_status': by_status,
+        'by_event': by_event,
+    }
+
 def get_notification_by_order_id(order_id: str) -> Optional[RestaurantNotification]:
     """Get the most recent notification for an order"""
     db = SessionLocal()
@@ -134,7 +209,9 @@ def get_notification_by_order_id(order_id: str) -> Optional[RestaurantNotificati
         ).order_by(RestaurantNotificationDB.created_at.desc()).first()
         
         if not db_notification:
-            return None
+            # Old notifications may have been moved to the archive
+            from repositories.archive_repo import get_archived_notification_by_order_id
+            return get_archived_notification_by_order_id(order_id)
         
         return RestaurantNotification(
             id=db_notification.id,
@@ -2,13 +2,46 @@
 Order Repository - Data access layer for orders
 Now using SQLAlchemy with PostgreSQL database
 """
-from typing import List, Optional
-from models.order import Order
+from typing import Dict, Iterator, List, Optional, Tuple
+from models.order import Order, OrderItem
 from database import SessionLocal
-from models_db import OrderDB, OrderItemDB
-from model_converters import order_db_to_model, order_model_to_db
+from models_db import OrderDB, OrderItemDB, ProductDB, RestaurantDB, DeliveryPersonDB
+from model_converters import (
+    ORDER_COLUMNS, ORDER_ITEM_COLUMNS, order_db_to_model, order_from_row, order_item_from_row,
+    order_model_to_db
+)
 from id_generator import generate_order_id, generate_order_item_id
-from datetime import datetime
+from repositories.sales_rollup_repo import apply_order_change, order_snapshot
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, select, text, union_all
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+
+# Ready delivery orders older than this are not offered to riders any more.
+# Keeps the query on the newest orders partitions.
+READY_ORDER_MAX_AGE_DAYS = 2
+
+
+def _rollup_snapshot(db_order: OrderDB, items) -> dict:
+    """Snapshot of an order for the sales rollups (items: OrderItemDB rows or item dicts)"""
+    return order_snapshot(
+        db_order.restaurant_id, db_order.created_at, db_order.status, db_order.total_amount,
+        [
+            (item['product_id'], item['product_name'], item['quantity'], item['price'])
+            if isinstance(item, dict) else
+            (item.product_id, item.product_name, item.quantity, item.price)
+            for item in items
+        ]
+    )
+
+
+def _partition_bound(value: datetime) -> datetime:
+    """
+    orders.created_at is a naive UTC timestamp; compare it with naive UTC
+    values so the planner can prune partitions when planning the query
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
 
 
 def get_order_by_id(order_id: str) -> Optional[Order]:
@@ -17,34 +50,265 @@ def get_order_by_id(order_id: str) -> Optional[Order]:
     """
     db = SessionLocal()
     try:
-        db_order = db.query(OrderDB).filter(OrderDB.id == order_id).first()
-        if not db_order:
-            return None
+        row = db.execute(select(*ORDER_COLUMNS).where(OrderDB.id == order_id)).first()
+        if not row:
+            # Old orders may have been moved to the archive
+            from repositories.archive_repo import get_archived_order
+            return get_archived_order(order_id)
         
-        # Get order items
-        db_items = db.query(OrderItemDB).filter(OrderItemDB.order_id == order_id).all()
+        return order_from_row(row, _get_items_by_order_ids(db, [order_id])[order_id])
+    finally:
+        db.close()
+
+
+def get_orders_by_restaurant(restaurant_id: str, status: Optional[str] = None,
+                             since: Optional[datetime] = None, until: Optional[datetime] = None,
+                             limit: Optional[int] = None, offset: Optional[int] = None) -> List[Order]:
+    """
+    Get orders for a restaurant from database, newest first
+    since/until bound created_at (since inclusive, until exclusive) so only
+    the matching monthly partitions are scanned.
+    """
+    db = SessionLocal()
+    try:
+        query = select(*ORDER_COLUMNS).where(OrderDB.restaurant_id == restaurant_id)
+        if status:
+            query = query.where(OrderDB.status == status)
+        if since is not None:
+            query = query.where(OrderDB.created_at >= _partition_bound(since))
+        if until is not None:
+            query = query.where(OrderDB.created_at < _partition_bound(until))
+        query = query.order_by(OrderDB.created_at.desc(), OrderDB.id.desc())
+        if offset:
+            query = query.offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+        rows = db.execute(query).all()
         
-        return order_db_to_model(db_order, db_items)
+        items_by_order = _get_items_by_order_ids(db, [row[0] for row in rows])
+        return [order_from_row(row, items_by_order[row[0]]) for row in rows]
+    finally:
+        db.close()
+
+
+def get_order_status_counts(restaurant_id: str, since: Optional[datetime] = None,
+                            until: Optional[datetime] = None,
+                            statuses: Optional[Tuple[str, ...]] = None) -> Dict[str, Dict]:
+    """
+    Count orders and sum their totals per status in one query
+    Returns: {status: {'count': int, 'revenue': float}} (statuses without orders are omitted)
+    """
+    db = SessionLocal()
+    try:
+        query = db.query(
+            OrderDB.status, func.count(OrderDB.id), func.coalesce(func.sum(OrderDB.total_amount), 0)
+        ).filter(OrderDB.restaurant_id == restaurant_id)
+        if statuses:
+            query = query.filter(OrderDB.status.in_(statuses))
+        if since is not None:
+            query = query.filter(OrderDB.created_at >= _partition_bound(since))
+        if until is not None:
+            query = query.filter(OrderDB.created_at < _partition_bound(until))
+        rows = query.group_by(OrderDB.status).all()
+        return {status: {'count': count, 'revenue': float(revenue)} for status, count, revenue in rows}
     finally:
         db.close()
 
 
-def get_orders_by_restaurant(restaurant_id: str) -> List[Order]:
+# The changes watermark is never held back further than this behind the
+# database time: a transaction writing for longer is the exception, and a
+# frozen watermark would re-send every change since then on each poll
+CHANGES_MAX_WRITE_SECONDS = 60
+
+# Database time and start of the oldest other transaction in this database
+# that has written (read-only ones such as a streaming export or an idle
+# psql session cannot hide order changes). Sessions of other roles show no
+# xact_start without pg_read_all_stats; the application uses one role for
+# all its connections.
+_NOW_AND_OLDEST_RUNNING_TRANSACTION = text("""
+    SELECT now(), (
+        SELECT min(xact_start) FROM pg_stat_activity
+        WHERE datname = current_database() AND backend_type = 'client backend'
+          AND pid <> pg_backend_pid() AND xact_start IS NOT NULL
+          AND backend_xid IS NOT NULL
+    )
+""")
+
+
+def get_orders_changed_since(restaurant_id: str, since: Optional[datetime],
+                             limit: int) -> Tuple[List[Order], datetime, datetime, bool]:
     """
-    Get all orders for a restaurant from database
+    Orders of a restaurant created or updated after `since`, oldest change first
+    (index idx_orders_restaurant_updated). No orders are returned when since is None.
+    updated_at is the start time of the writing transaction, so a change
+    committed later can carry an older timestamp. Every change with
+    updated_at before the returned `complete_until` (the database time, or
+    the start of the oldest writing transaction still running if earlier,
+    capped at CHANGES_MAX_WRITE_SECONDS) is visible to this read; use it to
+    compute the next watermark.
+    Returns: (orders, database time, complete_until, whether more than `limit` orders changed)
     """
     db = SessionLocal()
     try:
-        db_orders = db.query(OrderDB).filter(
-            OrderDB.restaurant_id == restaurant_id
-        ).order_by(OrderDB.created_at.desc()).all()
+        # Read before the orders: a transaction not running yet will write later timestamps
+        db_now, oldest_running = db.execute(_NOW_AND_OLDEST_RUNNING_TRANSACTION).one()
+        complete_until = db_now
+        if oldest_running:
+            complete_until = max(min(db_now, oldest_running),
+                                 db_now - timedelta(seconds=CHANGES_MAX_WRITE_SECONDS))
+        if since is None:
+            return [], db_now, complete_until, False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
         
-        orders = []
-        for db_order in db_orders:
-            db_items = db.query(OrderItemDB).filter(OrderItemDB.order_id == db_order.id).all()
-            orders.append(order_db_to_model(db_order, db_items))
+        rows = db.execute(select(*ORDER_COLUMNS).where(
+            OrderDB.restaurant_id == restaurant_id,
+            OrderDB.updated_at > since
+        ).order_by(OrderDB.updated_at, OrderDB.id).limit(limit + 1)).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
         
-        return orders
+        items_by_order = _get_items_by_order_ids(db, [row[0] for row in rows])
+        orders = [order_from_row(row, items_by_order[row[0]]) for row in rows]
+        return orders, db_now, complete_until, has_more
+    finally:
+        db.close()
+
+
+def get_item_sales(restaurant_id: str, since: Optional[datetime] = None,
+                   until: Optional[datetime] = None) -> List[Dict]:
+    """
+    Aggregate the restaurant's order items by product in one query
+    Starts from the restaurant's products and reaches order_items through
+    idx_order_items_product_id; the created_at bounds prune orders partitions.
+    Cancelled orders are excluded, and so are products no longer on the menu.
+    
+    Returns: [{'product_id', 'product_name', 'quantity', 'revenue', 'orders', 'last_ordered_at'}]
+    """
+    db = SessionLocal()
+    try:
+        query = db.query(
+            OrderItemDB.product_id,
+            func.max(ProductDB.name),
+            func.sum(OrderItemDB.quantity),
+            func.sum(OrderItemDB.price * OrderItemDB.quantity),
+            func.count(func.distinct(OrderItemDB.order_id)),
+            func.max(OrderDB.created_at),
+        ).select_from(ProductDB).join(
+            OrderItemDB, OrderItemDB.product_id == ProductDB.id
+        ).join(
+            OrderDB, OrderDB.id == OrderItemDB.order_id
+        ).filter(
+            ProductDB.restaurant_id == restaurant_id,
+            OrderDB.restaurant_id == restaurant_id,
+            OrderDB.status != "cancelled"
+        )
+        if since is not None:
+            query = query.filter(OrderDB.created_at >= _partition_bound(since))
+        if until is not None:
+            query = query.filter(OrderDB.created_at < _partition_bound(until))
+        rows = query.group_by(OrderItemDB.product_id).all()
+        return [
+            {
+                'product_id': product_id,
+                'product_name': product_name,
+                'quantity': int(quantity),
+                'revenue': float(revenue),
+                'orders': orders,
+                'last_ordered_at': last_ordered_at,
+            }
+            for product_id, product_name, quantity, revenue, orders, last_ordered_at in rows
+        ]
+    finally:
+        db.close()
+
+
+# Order columns included in exports, in output order
+EXPORT_COLUMNS = (
+    'id', 'created_at', 'updated_at', 'status', 'order_type', 'customer_name', 'customer_phone',
+    'payment_method', 'payment_status', 'subtotal', 'delivery_fee', 'total_amount',
+    'customer_rating', 'delivery_address',
+)
+
+
+def iter_orders_for_export(restaurant_id: str, since: Optional[datetime] = None,
+                           until: Optional[datetime] = None, status: Optional[str] = None,
+                           batch_size: int = 1000) -> Iterator[Dict]:
+    """
+    Stream a restaurant's orders (including archived ones), oldest first
+    Uses a server-side cursor fetching batch_size rows at a time, and each
+    order's items are aggregated to JSON in the same query, so memory stays
+    constant however many orders match. The session stays open until the
+    generator is exhausted or closed.
+    
+    Yields: {column: value for EXPORT_COLUMNS} plus 'items': [{product_id, product_name, quantity, price}]
+    """
+    from repositories.archive_repo import orders_archive, order_items_archive
+    
+    def source(orders, items):
+        items_json = select(func.coalesce(func.json_agg(aggregate_order_by(
+            func.json_build_object(
+                'product_id', items.c.product_id, 'product_name', items.c.product_name,
+                'quantity', items.c.quantity, 'price', items.c.price
+            ), items.c.id
+        )), text("'[]'::json"))).where(items.c.order_id == orders.c.id).scalar_subquery()
+        conditions = [orders.c.restaurant_id == restaurant_id]
+        if since is not None:
+            conditions.append(orders.c.created_at >= _partition_bound(since))
+        if until is not None:
+            conditions.append(orders.c.created_at < _partition_bound(until))
+        if status:
+            conditions.append(orders.c.status == status)
+        return select(*[orders.c[name] for name in EXPORT_COLUMNS], items_json.label('items')).where(*conditions)
+    
+    exported = union_all(
+        source(OrderDB.__table__, OrderItemDB.__table__),
+        source(orders_archive, order_items_archive),
+    ).subquery()
+    query = select(exported).order_by(exported.c.created_at, exported.c.id)
+    
+    db = SessionLocal()
+    try:
+        result = db.execute(query.execution_options(yield_per=batch_size))
+        for row in result.mappings():
+            yield dict(row)
+    finally:
+        db.close()
+
+
+def find_order_id_by_prefix(restaurant_id: str, prefix: str,
+                            since: Optional[datetime] = None) -> Optional[str]:
+    """
+    Resolve a full or shortened order ID (as typed in WhatsApp commands) to the
+    restaurant's most recent matching order ID
+    """
+    db = SessionLocal()
+    try:
+        query = db.query(OrderDB.id).filter(
+            OrderDB.restaurant_id == restaurant_id,
+            OrderDB.id.startswith(prefix, autoescape=True)
+        )
+        if since is not None:
+            query = query.filter(OrderDB.created_at >= _partition_bound(since))
+        return query.order_by(
+            (OrderDB.id == prefix).desc(), OrderDB.created_at.desc()
+        ).limit(1).scalar()
+    finally:
+        db.close()
+
+
+def ensure_order_partitions(months_ahead: int = 3):
+    """
+    Create the monthly orders partitions for the current month and the next
+    months_ahead months if they don't exist yet (see init-db.sql)
+    """
+    db = SessionLocal()
+    try:
+        db.execute(text("SELECT ensure_orders_partitions(:months_ahead)"), {"months_ahead": months_ahead})
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
     finally:
         db.close()
 
@@ -83,15 +347,21 @@ def create_order(order: Order) -> Order:
             db_item = OrderItemDB(**item_dict)
             db.add(db_item)
         
+        # Flush first so created_at (server default) is known for the rollup bucket
+        db.flush()
+        apply_order_change(db, None, _rollup_snapshot(db_order, items_dict))
+        
         db.commit()
         db.refresh(db_order)
         
         # Get created items
         db_items = db.query(OrderItemDB).filter(OrderItemDB.order_id == order.id).all()
         
-        # Invalidate rating cache
+        # Invalidate rating and item analytics caches
         from repositories.rating_repo import invalidate_rating_cache
         invalidate_rating_cache(order.restaurant_id)
+        from services.item_analytics_service import invalidate_item_analytics
+        invalidate_item_analytics(order.restaurant_id)
         
         return order_db_to_model(db_order, db_items)
     except Exception as e:
@@ -108,10 +378,15 @@ def update_order(order: Order) -> Order:
     """
     db = SessionLocal()
     try:
-        db_order = db.query(OrderDB).filter(OrderDB.id == order.id).first()
+        # Locked until commit: a concurrent write must not build its rollup
+        # snapshot from the state this one is replacing
+        db_order = db.query(OrderDB).filter(OrderDB.id == order.id).with_for_update().first()
         if not db_order:
             raise ValueError(f"Order {order.id} not found")
         
+        old_items = db.query(OrderItemDB).filter(OrderItemDB.order_id == order.id).all()
+        old_snapshot = _rollup_snapshot(db_order, old_items)
+        
         # Update order fields
         order_dict, items_dict = order_model_to_db(order)
         for key, value in order_dict.items():
@@ -128,15 +403,19 @@ def update_order(order: Order) -> Order:
             db_item = OrderItemDB(**item_dict)
             db.add(db_item)
         
+        apply_order_change(db, old_snapshot, _rollup_snapshot(db_order, items_dict))
+        
         db.commit()
         db.refresh(db_order)
         
         # Get updated items
         db_items = db.query(OrderItemDB).filter(OrderItemDB.order_id == order.id).all()
         
-        # Invalidate rating cache
+        # Invalidate rating and item analytics caches
         from repositories.rating_repo import invalidate_rating_cache
         invalidate_rating_cache(order.restaurant_id)
+        from services.item_analytics_service import invalidate_item_analytics
+        invalidate_item_analytics(order.restaurant_id)
         
         return order_db_to_model(db_order, db_items)
     except Exception as e:
@@ -153,21 +432,28 @@ def update_order_status(order_id: str, status: str) -> Optional[Order]:
     """
     db = SessionLocal()
     try:
-        db_order = db.query(OrderDB).filter(OrderDB.id == order_id).first()
+        # Locked until commit, so the rollup snapshot is the state being replaced
+        db_order = db.query(OrderDB).filter(OrderDB.id == order_id).with_for_update().first()
         if not db_order:
             return None
         
+        db_items = db.query(OrderItemDB).filter(OrderItemDB.order_id == order_id).all()
+        old_snapshot = _rollup_snapshot(db_order, db_items)
+        
         db_order.status = status
         db_order.updated_at = datetime.now()
+        apply_order_change(db, old_snapshot, _rollup_snapshot(db_order, db_items))
         db.commit()
         db.refresh(db_order)
         
         # Get order items
         db_items = db.query(OrderItemDB).filter(OrderItemDB.order_id == order_id).all()
         
-        # Invalidate rating cache
+        # Invalidate rating and item analytics caches
         from repositories.rating_repo import invalidate_rating_cache
         invalidate_rating_cache(db_order.restaurant_id)
+        from services.item_analytics_service import invalidate_item_analytics
+        invalidate_item_analytics(db_order.restaurant_id)
         
         return order_db_to_model(db_order, db_items)
     except Exception as e:
@@ -184,15 +470,111 @@ def get_order_by_customer_id(customer_id: str) -> List[Order]:
     """
     db = SessionLocal()
     try:
-        db_orders = db.query(OrderDB).filter(
+        rows = db.execute(select(*ORDER_COLUMNS).where(
             OrderDB.customer_id == customer_id
-        ).order_by(OrderDB.created_at.desc()).all()
+        ).order_by(OrderDB.created_at.desc())).all()
+        
+        items_by_order = _get_items_by_order_ids(db, [row[0] for row in rows])
+        return [order_from_row(row, items_by_order[row[0]]) for row in rows]
+    finally:
+        db.close()
+
+
+def _get_items_by_order_ids(db, order_ids: List[str]) -> Dict[str, List[OrderItem]]:
+    """
+    Load items for many orders in one query, grouped by order ID
+    """
+    items_by_order: Dict[str, List[OrderItem]] = {order_id: [] for order_id in order_ids}
+    if not order_ids:
+        return items_by_order
+    
+    rows = db.execute(select(*ORDER_ITEM_COLUMNS).where(OrderItemDB.order_id.in_(order_ids))).all()
+    for row in rows:
+        items_by_order[row[0]].append(order_item_from_row(row))
+    return items_by_order
+
+
+def get_ready_delivery_orders(limit: int = 50, offset: int = 0,
+                              delivery_person_id: Optional[str] = None) -> List[dict]:
+    """
+    Get delivery orders that are ready for pickup across all active restaurants
+    Without delivery_person_id only unassigned orders are returned; with it,
+    the orders assigned to that delivery person.
+    Uses two queries: orders joined with their restaurant (served by the
+    idx_orders_ready_delivery partial index), then all their items at once.
+    Only orders from the last READY_ORDER_MAX_AGE_DAYS are considered, so old
+    partitions are pruned. Oldest orders come first.
+    
+    Returns: [{'order': Order, 'restaurant_name': str, 'restaurant_address': str}]
+    """
+    since = _partition_bound(datetime.now(timezone.utc) - timedelta(days=READY_ORDER_MAX_AGE_DAYS))
+    db = SessionLocal()
+    try:
+        rows = db.execute(select(
+            *ORDER_COLUMNS, RestaurantDB.name, RestaurantDB.address
+        ).join(
+            RestaurantDB, RestaurantDB.id == OrderDB.restaurant_id
+        ).filter(
+            OrderDB.order_type == "delivery",
+            OrderDB.status == "ready",
+            OrderDB.created_at >= since,
+            OrderDB.delivery_person_id == delivery_person_id if delivery_person_id else OrderDB.delivery_person_id.is_(None),
+            RestaurantDB.is_active == True
+        ).order_by(
+            OrderDB.created_at, OrderDB.id
+        ).offset(offset).limit(limit)).all()
         
-        orders = []
-        for db_order in db_orders:
-            db_items = db.query(OrderItemDB).filter(OrderItemDB.order_id == db_order.id).all()
-            orders.append(order_db_to_model(db_order, db_items))
+        items_by_order = _get_items_by_order_ids(db, [row[0] for row in rows])
         
-        return orders
+        order_width = len(ORDER_COLUMNS)
+        return [
+            {
+                'order': order_from_row(row[:order_width], items_by_order[row[0]]),
+                'restaurant_name': row[order_width],
+                'restaurant_address': row[order_width + 1] or "",
+            }
+            for row in rows
+        ]
+    finally:
+        db.close()
+
+
+def assign_delivery_order(order_id: str, delivery_person_id: str) -> str:
+    """
+    Atomically assign a ready delivery order to an available delivery person
+    Both rows are claimed with conditional UPDATEs in one transaction, so two
+    concurrent assignments can never give the same order or rider twice.
+    
+    Returns: "assigned", "rider_unavailable" or "order_unavailable"
+    """
+    db = SessionLocal()
+    try:
+        rider_claimed = db.query(DeliveryPersonDB).filter(
+            DeliveryPersonDB.id == delivery_person_id,
+            DeliveryPersonDB.is_available == True
+        ).update({DeliveryPersonDB.is_available: False}, synchronize_session=False)
+        if not rider_claimed:
+            db.rollback()
+            return "rider_unavailable"
+        
+        order_claimed = db.query(OrderDB).filter(
+            OrderDB.id == order_id,
+            OrderDB.order_type == "delivery",
+            OrderDB.status == "ready",
+            OrderDB.delivery_person_id.is_(None)
+        ).update({
+            OrderDB.delivery_person_id: delivery_person_id,
+            OrderDB.assigned_at: func.now(),
+        }, synchronize_session=False)
+        if not order_claimed:
+            db.rollback()
+            return "order_unavailable"
+        
+        db.commit()
+        return "assigned"
+    except Exception as e:
+        db.rollback()
+        print(f"Error assigning delivery order: {e}")
+        raise
     finally:
         db.close()
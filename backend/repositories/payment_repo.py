@@ -0,0 +1,127 @@
+"""
+Payment Repository - Local state of Razorpay payment links
+A payment link is stored as a row of the payments table:
+transaction_id = Razorpay payment link ID, status = the link status as
+reported by Razorpay ("created", "partially_paid", "paid", "cancelled",
+"expired"), metadata = JSON with short_url and paid_at (unix time).
+"""
+import json
+from datetime import timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import func, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from database import SessionLocal
+from models_db import PaymentDB
+from id_generator import generate_payment_id
+
+PAYMENT_LINK_TRANSACTION_TYPE = "order_payment"
+PAYMENT_LINK_GATEWAY = "razorpay"
+
+# Link statuses that never change again
+FINAL_PAYMENT_LINK_STATUSES = ("paid", "cancelled", "expired")
+
+
+def _payment_link_to_dict(db_payment: PaymentDB, checked_seconds_ago: float) -> Dict:
+    metadata = db_payment.payment_metadata or {}
+    if isinstance(metadata, str):
+        # TEXT column in databases created by create_all, JSONB in init-db.sql
+        metadata = json.loads(metadata)
+    return {
+        'payment_link_id': db_payment.transaction_id,
+        'order_id': db_payment.order_id,
+        'restaurant_id': db_payment.restaurant_id,
+        'status': db_payment.status,
+        'amount': float(db_payment.amount),
+        'short_url': metadata.get('short_url'),
+        'paid_at': metadata.get('paid_at'),
+        'checked_seconds_ago': checked_seconds_ago,  # since the last write or Razorpay check
+    }
+
+
+def get_payment_link(payment_link_id: str) -> Optional[Dict]:
+    """Local state of a payment link, or None if it was never recorded"""
+    db = SessionLocal()
+    try:
+        row = db.query(
+            PaymentDB, func.extract('epoch', func.now() - PaymentDB.updated_at)
+        ).filter(
+            PaymentDB.transaction_id == payment_link_id,
+            PaymentDB.payment_gateway == PAYMENT_LINK_GATEWAY
+        ).first()
+        return _payment_link_to_dict(row[0], float(row[1])) if row else None
+    finally:
+        db.close()
+
+
+def save_payment_link(payment_link_id: str, order_id: Optional[str], restaurant_id: Optional[str],
+                      amount: float, status: str, short_url: Optional[str] = None,
+                      paid_at: Optional[int] = None) -> Dict:
+    """
+    Insert or update the local state of a payment link
+    Links in a final status ("paid", "cancelled", "expired") are not changed
+    any more, so late or reordered webhooks cannot undo a payment.
+    Pass short_url and paid_at together (both come with the link entity).
+    """
+    table = PaymentDB.__table__
+    metadata = json.dumps({'short_url': short_url, 'paid_at': paid_at}) if short_url or paid_at else None
+    db = SessionLocal()
+    try:
+        stmt = pg_insert(table).values(
+            id=generate_payment_id(),
+            restaurant_id=restaurant_id,
+            order_id=order_id,
+            transaction_type=PAYMENT_LINK_TRANSACTION_TYPE,
+            amount=amount,
+            payment_method="online",
+            payment_gateway=PAYMENT_LINK_GATEWAY,
+            transaction_id=payment_link_id,
+            status=status,
+            metadata=metadata,
+        )
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.transaction_id],
+            set_={
+                'status': stmt.excluded.status,
+                'metadata': func.coalesce(stmt.excluded.metadata, table.c.metadata),
+                'order_id': func.coalesce(table.c.order_id, stmt.excluded.order_id),
+                'restaurant_id': func.coalesce(table.c.restaurant_id, stmt.excluded.restaurant_id),
+                'updated_at': func.now(),
+            },
+            where=table.c.status.notin_(FINAL_PAYMENT_LINK_STATUSES)
+        ))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Error saving payment link {payment_link_id}: {e}")
+        raise
+    finally:
+        db.close()
+    return get_payment_link(payment_link_id)
+
+
+def claim_payment_link_reconciliation(payment_link_id: str, min_interval_seconds: float) -> bool:
+    """
+    Mark a payment link as being checked with Razorpay, at most once per
+    min_interval_seconds across all workers (updated_at is the last check)
+    Returns: True if the caller should fetch the link from Razorpay now
+    """
+    db = SessionLocal()
+    try:
+        claimed = db.execute(
+            update(PaymentDB.__table__)
+            .where(
+                PaymentDB.transaction_id == payment_link_id,
+                PaymentDB.status.notin_(FINAL_PAYMENT_LINK_STATUSES),
+                PaymentDB.updated_at < func.now() - timedelta(seconds=min_interval_seconds)
+            )
+            .values(updated_at=func.now())
+        ).rowcount
+        db.commit()
+        return claimed > 0
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
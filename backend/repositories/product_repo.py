@@ -2,12 +2,42 @@
 Product Repository - Data access layer for products
 Now using SQLAlchemy with PostgreSQL database
 """
-from typing import List, Optional
+from typing import Dict, List, Optional
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from models.product import Product
 from database import SessionLocal
-from models_db import ProductDB
+from models_db import ProductDB, RestaurantDB
 from model_converters import product_db_to_model, product_model_to_db
-from id_generator import generate_product_id
+from id_generator import generate_product_id, generate_product_ids, lock_id_allocation
+
+# Product columns a bulk import may set
+IMPORT_COLUMNS = ('name', 'description', 'price', 'category', 'is_available', 'discounted_price', 'image_url')
+
+
+def _bump_menu_version(db, restaurant_id: str):
+    """Increment the restaurant's menu version in the caller's transaction"""
+    db.query(RestaurantDB).filter(RestaurantDB.id == restaurant_id).update(
+        {RestaurantDB.menu_version: RestaurantDB.menu_version + 1}, synchronize_session=False
+    )
+
+
+def _menu_changed(restaurant_id: str):
+    """Drop this worker's cached menu messages (call after the commit)"""
+    from services.menu_message_service import invalidate_menu_messages
+    invalidate_menu_messages(restaurant_id)
+
+
+def get_menu_version(restaurant_id: str) -> int:
+    """
+    Current menu version of a restaurant (changes whenever any of its products change)
+    """
+    db = SessionLocal()
+    try:
+        version = db.query(RestaurantDB.menu_version).filter(RestaurantDB.id == restaurant_id).scalar()
+        return version or 0
+    finally:
+        db.close()
 
 
 def get_product_by_id(product_id: str) -> Optional[Product]:
@@ -45,9 +75,10 @@ def create_product(product: Product) -> Product:
     """
     db = SessionLocal()
     try:
-        # Generate ID if not provided
+        # Generate ID if not provided (locked until the commit, see bulk_upsert_products)
         if not product.id:
-            product.id = generate_product_id()
+            lock_id_allocation(db, 'products')
+            product.id = generate_product_id(db)
         
         # Check if product already exists
         existing = db.query(ProductDB).filter(ProductDB.id == product.id).first()
@@ -55,14 +86,18 @@ def create_product(product: Product) -> Product:
             # Update instead
             for key, value in product_model_to_db(product).items():
                 setattr(existing, key, value)
+            _bump_menu_version(db, product.restaurant_id)
             db.commit()
+            _menu_changed(product.restaurant_id)
             db.refresh(existing)
             return product_db_to_model(existing)
         
         # Create new product
         db_product = ProductDB(**product_model_to_db(product))
         db.add(db_product)
+        _bump_menu_version(db, product.restaurant_id)
         db.commit()
+        _menu_changed(product.restaurant_id)
         db.refresh(db_product)
         return product_db_to_model(db_product)
     except Exception as e:
@@ -86,8 +121,10 @@ def update_product(product: Product) -> Product:
         # Update fields
         for key, value in product_model_to_db(product).items():
             setattr(db_product, key, value)
+        _bump_menu_version(db, db_product.restaurant_id)
         
         db.commit()
+        _menu_changed(db_product.restaurant_id)
         db.refresh(db_product)
         return product_db_to_model(db_product)
     except Exception as e:
@@ -106,8 +143,11 @@ def delete_product(product_id: str) -> bool:
     try:
         db_product = db.query(ProductDB).filter(ProductDB.id == product_id).first()
         if db_product:
+            restaurant_id = db_product.restaurant_id
             db.delete(db_product)
+            _bump_menu_version(db, restaurant_id)
             db.commit()
+            _menu_changed(restaurant_id)
             return True
         return False
     except Exception as e:
@@ -116,3 +156,146 @@ def delete_product(product_id: str) -> bool:
         return False
     finally:
         db.close()
+
+
+def bulk_upsert_products(restaurant_id: str, items: List[Dict]) -> Dict[str, List[str]]:
+    """
+    Create or update many products of a restaurant in one transaction
+    Each item holds IMPORT_COLUMNS and optionally 'id'. Items are matched to
+    existing products by id, otherwise by name (case-insensitive); unmatched
+    items get newly allocated IDs. New IDs are allocated under the products ID
+    lock and inserted with a plain INSERT (a conflict fails the import instead
+    of touching another row); matched products are written with one
+    INSERT ... ON CONFLICT (id) DO UPDATE. The menu version is bumped once.
+    Raises ValueError if an id does not belong to the restaurant (also when it
+    was deleted or moved while importing) or two items resolve to the same
+    product.
+    
+    Returns: {'created': [ids], 'updated': [ids]} in input order
+    """
+    db = SessionLocal()
+    try:
+        existing = db.query(ProductDB.id, ProductDB.name).filter(
+            ProductDB.restaurant_id == restaurant_id
+        ).order_by(ProductDB.id).all()
+        existing_ids = {product_id for product_id, _ in existing}
+        ids_by_name: Dict[str, str] = {}
+        for product_id, name in existing:
+            ids_by_name.setdefault(name.strip().lower(), product_id)
+        
+        resolved_ids = []
+        index_by_id: Dict[str, int] = {}
+        for index, item in enumerate(items):
+            product_id = item.get('id') or ids_by_name.get(item['name'].strip().lower())
+            if product_id and product_id not in existing_ids:
+                raise ValueError(f"Product {product_id} not found")
+            # One item by id and another by that product's name: a single
+            # upsert cannot write the same row twice
+            if product_id in index_by_id:
+                raise ValueError(
+                    f"Item {index + 1} duplicates item {index_by_id[product_id] + 1} "
+                    f"({item['name']} is product {product_id})"
+                )
+            if product_id:
+                index_by_id[product_id] = index
+            resolved_ids.append(product_id)
+        new_count = sum(1 for product_id in resolved_ids if not product_id)
+        if new_count:
+            lock_id_allocation(db, 'products')
+        new_ids = iter(generate_product_ids(new_count, db))
+        
+        new_rows, updated_rows = [], []
+        result = {'created': [], 'updated': []}
+        for item, product_id in zip(items, resolved_ids):
+            if product_id:
+                result['updated'].append(product_id)
+                rows = updated_rows
+            else:
+                product_id = next(new_ids)
+                result['created'].append(product_id)
+                rows = new_rows
+            rows.append({
+                'id': product_id,
+                'restaurant_id': restaurant_id,
+                **{column: item.get(column) for column in IMPORT_COLUMNS},
+            })
+        if not new_rows and not updated_rows:
+            return result
+        
+        table = ProductDB.__table__
+        if new_rows:
+            db.execute(pg_insert(table).values(new_rows))
+        if updated_rows:
+            stmt = pg_insert(table).values(updated_rows)
+            written = set(db.execute(stmt.on_conflict_do_update(
+                index_elements=[ProductDB.id],
+                set_={**{column: stmt.excluded[column] for column in IMPORT_COLUMNS}, 'updated_at': func.now()},
+                where=ProductDB.restaurant_id == stmt.excluded.restaurant_id
+            ).returning(table.c.id)).scalars())
+            missing = [row['id'] for row in updated_rows if row['id'] not in written]
+            if missing:
+                raise ValueError(f"Product {missing[0]} not found")
+        _bump_menu_version(db, restaurant_id)
+        db.commit()
+        _menu_changed(restaurant_id)
+        return result
+    except Exception as e:
+        db.rollback()
+        print(f"Error importing products: {e}")
+        raise
+    finally:
+        db.close()
+
+
+def bulk_update_products(restaurant_id: str, product_ids: Optional[List[str]] = None,
+                         category: Optional[str] = None, is_available: Optional[bool] = None,
+                         price: Optional[float] = None, price_change_percent: Optional[float] = None,
+                         discounted_price: Optional[float] = None,
+                         clear_discount: bool = False) -> List[str]:
+    """
+    Change availability and/or price of the restaurant's products selected by
+    ID list and/or category, as a single UPDATE; the menu version is bumped once.
+    price sets a new price, price_change_percent scales the current one
+    (e.g. 10 for +10%, rounded to 2 decimals).
+    
+    Returns: IDs of the updated products
+    """
+    table = ProductDB.__table__
+    values = {}
+    if is_available is not None:
+        values['is_available'] = is_available
+    if price is not None:
+        values['price'] = price
+    elif price_change_percent is not None:
+        values['price'] = func.round(table.c.price * (1 + price_change_percent / 100.0), 2)
+    if clear_discount:
+        values['discounted_price'] = None
+    elif discounted_price is not None:
+        values['discounted_price'] = discounted_price
+    if not values:
+        return []
+    values['updated_at'] = func.now()
+    
+    conditions = [table.c.restaurant_id == restaurant_id]
+    if product_ids:
+        conditions.append(table.c.id.in_(product_ids))
+    if category:
+        conditions.append(func.lower(table.c.category) == category.strip().lower())
+    
+    db = SessionLocal()
+    try:
+        updated = db.execute(
+            table.update().where(*conditions).values(**values).returning(table.c.id)
+        ).scalars().all()
+        if updated:
+            _bump_menu_version(db, restaurant_id)
+        db.commit()
+        if updated:
+            _menu_changed(restaurant_id)
+        return list(updated)
+    except Exception as e:
+        db.rollback()
+        print(f"Error updating products: {e}")
+        raise
+    finally:
+        db.close()
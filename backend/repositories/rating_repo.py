@@ -5,32 +5,19 @@ Calculates ratings based on:
 2. Order completion rate (delivered orders / total orders)
 3. Processing speed (time from pending to delivered)
 """
-from typing import Dict, Optional
-from repositories.order_repo import get_orders_by_restaurant
+from typing import Dict, List, Optional
+from sqlalchemy import func, case
+from sqlalchemy.dialects.postgresql import insert
+from database import SessionLocal
+from models_db import OrderDB, RestaurantRatingDB
 
 # In-memory cache for restaurant ratings (for performance)
 _rating_cache: Dict[str, Dict] = {}
 
-def calculate_restaurant_rating(restaurant_id: str) -> Dict:
-    """
-    Calculate restaurant rating based on:
-    - Customer ratings (average of all ratings) - 70% weight
-    - Order completion rate (delivered/cancelled ratio) - 20% weight  
-    - Order volume (more orders = better reliability) - 10% weight
-    
-    Returns: {
-        'overall_rating': float (1-5),
-        'customer_rating': float (average of customer ratings),
-        'completion_rate': float (0-1),
-        'total_orders': int,
-        'rated_orders': int,
-        'delivered_orders': int,
-        'cancelled_orders': int
-    }
-    """
-    orders = get_orders_by_restaurant(restaurant_id)
-    
-    if not orders:
+def _rating_from_counts(total_orders: int, rated_orders: int, rating_sum: float,
+                       delivered_orders: int, cancelled_orders: int) -> Dict:
+    """Apply the rating formula to pre-aggregated order counts"""
+    if total_orders == 0:
         return {
             'overall_rating': 4.0,  # Default rating for new restaurants
             'customer_rating': None,
@@ -42,19 +29,16 @@ def calculate_restaurant_rating(restaurant_id: str) -> Dict:
         }
     
     # Calculate customer rating (average of all ratings)
-    ratings = [order.customer_rating for order in orders if order.customer_rating is not None]
-    customer_rating = sum(ratings) / len(ratings) if ratings else None
+    customer_rating = rating_sum / rated_orders if rated_orders else None
     
     # Calculate completion rate
-    delivered_orders = len([o for o in orders if o.status == "delivered"])
-    cancelled_orders = len([o for o in orders if o.status == "cancelled"])
     total_completed = delivered_orders + cancelled_orders
     completion_rate = delivered_orders / total_completed if total_completed > 0 else 1.0
     
     # Calculate overall rating
     if customer_rating is not None:
         # Weighted formula: 70% customer rating, 20% completion rate, 10% volume bonus
-        volume_bonus = min(len(orders) / 100, 0.5)  # Up to 0.5 bonus for volume
+        volume_bonus = min(total_orders / 100, 0.5)  # Up to 0.5 bonus for volume
         overall_rating = (
             customer_rating * 0.7 +  # Customer satisfaction (70%)
             (completion_rate * 5) * 0.2 +  # Completion rate as 1-5 scale (20%)
@@ -63,23 +47,126 @@ def calculate_restaurant_rating(restaurant_id: str) -> Dict:
         overall_rating = min(5.0, max(1.0, overall_rating))  # Clamp between 1-5
     else:
         # If no customer ratings yet, use completion rate and volume
-        volume_bonus = min(len(orders) / 100, 0.5)
+        volume_bonus = min(total_orders / 100, 0.5)
         overall_rating = (completion_rate * 5) * 0.8 + volume_bonus * 0.2
         overall_rating = min(5.0, max(3.0, overall_rating))  # Clamp between 3-5 for new restaurants
     
-    result = {
+    return {
         'overall_rating': round(overall_rating, 2),
         'customer_rating': round(customer_rating, 2) if customer_rating else None,
         'completion_rate': round(completion_rate, 2),
-        'total_orders': len(orders),
-        'rated_orders': len(ratings),
+        'total_orders': total_orders,
+        'rated_orders': rated_orders,
         'delivered_orders': delivered_orders,
         'cancelled_orders': cancelled_orders
     }
+
+def calculate_restaurant_ratings(restaurant_ids: List[str]) -> Dict[str, Dict]:
+    """
+    Calculate ratings for many restaurants with a single grouped query
+    instead of loading every order of every restaurant.
+    Results are written to the rating cache and persisted to restaurant_ratings
+    so listings can read them with a join.
+    """
+    if not restaurant_ids:
+        return {}
     
-    # Cache the result
-    _rating_cache[restaurant_id] = result
-    return result
+    db = SessionLocal()
+    try:
+        rows = db.query(
+            OrderDB.restaurant_id,
+            func.count(OrderDB.id),
+            func.count(OrderDB.customer_rating),
+            func.sum(OrderDB.customer_rating),
+            func.sum(case((OrderDB.status == "delivered", 1), else_=0)),
+            func.sum(case((OrderDB.status == "cancelled", 1), else_=0)),
+        ).filter(
+            OrderDB.restaurant_id.in_(restaurant_ids)
+        ).group_by(OrderDB.restaurant_id).all()
+        
+        counts = {
+            row[0]: (int(row[1]), int(row[2]), float(row[3] or 0), int(row[4] or 0), int(row[5] or 0))
+            for row in rows
+        }
+        
+        # Archived orders keep counting towards the rating
+        from repositories.archive_repo import get_archived_order_totals
+        for restaurant_id, archived in get_archived_order_totals(restaurant_ids).items():
+            total, rated, rating_sum, delivered, cancelled = counts.get(restaurant_id, (0, 0, 0.0, 0, 0))
+            counts[restaurant_id] = (
+                total + archived['archived_orders'],
+                rated + archived['rated_orders'],
+                rating_sum + archived['rating_sum'],
+                delivered + archived['delivered_orders'],
+                cancelled + archived['cancelled_orders'],
+            )
+        
+        results = {}
+        for restaurant_id in restaurant_ids:
+            result = _rating_from_counts(*counts.get(restaurant_id, (0, 0, 0.0, 0, 0)))
+            _rating_cache[restaurant_id] = result
+            results[restaurant_id] = result
+        
+        _persist_ratings(db, results)
+        return results
+    finally:
+        db.close()
+
+def _persist_ratings(db, results: Dict[str, Dict]):
+    """Upsert calculated ratings into restaurant_ratings in one statement"""
+    rows = [
+        {
+            'restaurant_id': restaurant_id,
+            'overall_rating': result['overall_rating'],
+            'customer_rating': result['customer_rating'],
+            'completion_rate': result['completion_rate'],
+            'total_orders': result['total_orders'],
+            'rated_orders': result['rated_orders'],
+            'delivered_orders': result['delivered_orders'],
+            'cancelled_orders': result['cancelled_orders'],
+        }
+        for restaurant_id, result in results.items()
+    ]
+    stmt = insert(RestaurantRatingDB).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[RestaurantRatingDB.restaurant_id],
+        set_={
+            'overall_rating': stmt.excluded.overall_rating,
+            'customer_rating': stmt.excluded.customer_rating,
+            'completion_rate': stmt.excluded.completion_rate,
+            'total_orders': stmt.excluded.total_orders,
+            'rated_orders': stmt.excluded.rated_orders,
+            'delivered_orders': stmt.excluded.delivered_orders,
+            'cancelled_orders': stmt.excluded.cancelled_orders,
+            'calculated_at': func.now(),
+        }
+    )
+    try:
+        db.execute(stmt)
+        db.commit()
+    except Exception as e:
+        # The in-memory cache is still valid; the persisted copy is best-effort
+        db.rollback()
+        print(f"Error persisting restaurant ratings: {e}")
+
+def calculate_restaurant_rating(restaurant_id: str) -> Dict:
+    """
+    Calculate restaurant rating based on:
+    - Customer ratings (average of all ratings) - 70% weight
+    - Order completion rate (delivered/cancelled ratio) - 20% weight  
+    - Order volume (more orders = better reliability) - 10% weight
+    
+    Returns: {
+        'overall_rating': float (1-5),
+        'customer_rating': float (average of customer ratings),
+        'completion_rate': float (0-1),
+        'total_orders': int,
+        'rated_orders': int,
+        'delivered_orders': int,
+        'cancelled_orders': int
+    }
+    """
+    return calculate_restaurant_ratings([restaurant_id])[restaurant_id]
 
 def get_restaurant_rating(restaurant_id: str) -> Dict:
     """Get restaurant rating (from cache if available, else calculate)"""
@@ -87,17 +174,18 @@ def get_restaurant_rating(restaurant_id: str) -> Dict:
         return _rating_cache[restaurant_id]
     return calculate_restaurant_rating(restaurant_id)
 
+def get_restaurant_ratings(restaurant_ids: List[str]) -> Dict[str, Dict]:
+    """Get ratings for many restaurants, calculating all cache misses in one query"""
+    missing = [rid for rid in restaurant_ids if rid not in _rating_cache]
+    if missing:
+        calculate_restaurant_ratings(missing)
+    return {rid: _rating_cache[rid] for rid in restaurant_ids if rid in _rating_cache}
+
 def invalidate_rating_cache(restaurant_id: str):
     """Invalidate rating cache when orders are updated"""
     if restaurant_id in _rating_cache:
         del _rating_cache[restaurant_id]
-
-
-
-
-
-
-
-
-
-
+    
+    # Ratings are also held by the geo index used for restaurant search
+    from geo_index import restaurant_geo_index
+    restaurant_geo_index.mark_rating_stale(restaurant_id)
@@ -5,11 +5,13 @@ Now using SQLAlchemy with PostgreSQL database
 from typing import Optional, List
 from models.restaurant import Restaurant
 from database import SessionLocal, get_db
-from models_db import RestaurantDB
-from model_converters import restaurant_db_to_model, restaurant_model_to_db
+from models_db import RestaurantDB, RestaurantSettingsDB, RestaurantRatingDB
+from model_converters import (
+    RESTAURANT_COLUMNS, restaurant_db_to_model, restaurant_from_row, restaurant_model_to_db
+)
 from id_generator import generate_restaurant_id
-from sqlalchemy import and_
-import math
+from geo_index import restaurant_geo_index, cuisine_types_for_filter
+from sqlalchemy import func, select
 
 
 def get_restaurant_by_id(restaurant_id: str) -> Optional[Restaurant]:
@@ -18,9 +20,9 @@ def get_restaurant_by_id(restaurant_id: str) -> Optional[Restaurant]:
     """
     db = SessionLocal()
     try:
-        db_restaurant = db.query(RestaurantDB).filter(RestaurantDB.id == restaurant_id).first()
-        if db_restaurant:
-            return restaurant_db_to_model(db_restaurant)
+        row = db.execute(select(*RESTAURANT_COLUMNS).where(RestaurantDB.id == restaurant_id)).first()
+        if row:
+            return restaurant_from_row(row)
         return None
     finally:
         db.close()
@@ -32,8 +34,8 @@ def get_all_restaurants() -> List[Restaurant]:
     """
     db = SessionLocal()
     try:
-        db_restaurants = db.query(RestaurantDB).filter(RestaurantDB.is_active == True).all()
-        return [restaurant_db_to_model(r) for r in db_restaurants]
+        rows = db.execute(select(*RESTAURANT_COLUMNS).where(RestaurantDB.is_active == True)).all()
+        return [restaurant_from_row(row) for row in rows]
     finally:
         db.close()
 
@@ -59,6 +61,7 @@ def create_restaurant(restaurant: Restaurant) -> Optional[Restaurant]:
         db.add(db_restaurant)
         db.commit()
         db.refresh(db_restaurant)
+        restaurant_geo_index.invalidate()
         return restaurant_db_to_model(db_restaurant)
     except Exception as e:
         db.rollback()
@@ -81,9 +84,14 @@ def update_restaurant(restaurant: Restaurant) -> Optional[Restaurant]:
         # Update fields
         for key, value in restaurant_model_to_db(restaurant).items():
             setattr(db_restaurant, key, value)
+        # Name and UPI details are part of the rendered WhatsApp menu
+        db_restaurant.menu_version = RestaurantDB.menu_version + 1
         
         db.commit()
         db.refresh(db_restaurant)
+        restaurant_geo_index.invalidate()
+        from services.menu_message_service import invalidate_menu_messages
+        invalidate_menu_messages(restaurant.id)
         return restaurant_db_to_model(db_restaurant)
     except Exception as e:
         db.rollback()
@@ -93,73 +101,105 @@ def update_restaurant(restaurant: Restaurant) -> Optional[Restaurant]:
         db.close()
 
 
-def find_restaurants_by_location(latitude: float, longitude: float, radius_km: float = 50.0) -> List[dict]:
+def find_restaurants_by_location(latitude: float, longitude: float, radius_km: float = 50.0,
+                                 cuisine_type: Optional[str] = None, limit: Optional[int] = None) -> List[dict]:
     """
     Find restaurants near a location sorted by combined score (rating + distance)
     Sorting priority:
     1. Overall rating (higher is better) - 60% weight
     2. Distance (closer is better) - 40% weight
+    Optionally filter by cuisine type and return only the top `limit` results.
+    Ranking runs on the in-memory geo index (see geo_index.py).
+    """
+    return restaurant_geo_index.search(
+        latitude, longitude, radius_km=radius_km, cuisine_type=cuisine_type, limit=limit
+    )
+
+
+def get_restaurant_listing(cuisine_type: Optional[str] = None,
+                           restaurant_ids: Optional[List[str]] = None) -> List[dict]:
+    """
+    Get active restaurants joined with their settings and persisted rating
+    in a single query (used by the public restaurant listing).
+    Only the columns the listing needs are selected, so large fields such as
+    the UPI QR code image are never loaded.
     """
     db = SessionLocal()
     try:
-        from repositories.rating_repo import get_restaurant_rating
+        cuisine = func.lower(func.coalesce(RestaurantDB.cuisine_type, 'both'))
+        query = db.query(
+            RestaurantDB.id,
+            RestaurantDB.name,
+            RestaurantDB.phone,
+            RestaurantDB.address,
+            RestaurantDB.latitude,
+            RestaurantDB.longitude,
+            RestaurantDB.is_active,
+            RestaurantDB.cuisine_type,
+            RestaurantSettingsDB.delivery_available,
+            RestaurantSettingsDB.minimum_order_value,
+            RestaurantRatingDB.overall_rating,
+        ).outerjoin(
+            RestaurantSettingsDB, RestaurantSettingsDB.restaurant_id == RestaurantDB.id
+        ).outerjoin(
+            RestaurantRatingDB, RestaurantRatingDB.restaurant_id == RestaurantDB.id
+        ).filter(RestaurantDB.is_active == True)
         
-        def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-            """Calculate distance between two points in kilometers"""
-            R = 6371  # Earth radius in kilometers
-            
-            dlat = math.radians(lat2 - lat1)
-            dlon = math.radians(lon2 - lon1)
-            
-            a = (math.sin(dlat / 2) ** 2 +
-                 math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) *
-                 math.sin(dlon / 2) ** 2)
-            
-            c = 2 * math.asin(math.sqrt(a))
-            return R * c
-        
-        # Get all active restaurants
-        db_restaurants = db.query(RestaurantDB).filter(RestaurantDB.is_active == True).all()
-        
-        nearby_restaurants = []
-        for db_restaurant in db_restaurants:
-            restaurant = restaurant_db_to_model(db_restaurant)
-            
-            distance = haversine_distance(
-                latitude, longitude,
-                restaurant.latitude, restaurant.longitude
-            )
-            
-            if distance <= radius_km:
-                # Get restaurant rating
-                rating_data = get_restaurant_rating(restaurant.id)
-                overall_rating = rating_data['overall_rating']
-                
-                # Calculate combined score (higher is better)
-                # Normalize distance (inverse, max 15km = 1.0, min = 0)
-                normalized_distance = max(0, 1 - (distance / 15.0))  # 15km max normalization
-                # Combined score: 60% rating (1-5 scale normalized), 40% distance (normalized)
-                rating_score = (overall_rating / 5.0) * 0.6  # Normalize rating to 0-1
-                distance_score = normalized_distance * 0.4
-                combined_score = rating_score + distance_score
-                
-                nearby_restaurants.append({
-                    'restaurant': restaurant,
-                    'distance': round(distance, 2),
-                    'rating': overall_rating,
-                    'customer_rating': rating_data['customer_rating'],
-                    'total_orders': rating_data['total_orders'],
-                    'combined_score': combined_score  # For sorting
-                })
+        if restaurant_ids is not None:
+            if not restaurant_ids:
+                return []
+            query = query.filter(RestaurantDB.id.in_(restaurant_ids))
         
-        # Sort by combined score (higher is better), then by distance as tiebreaker
-        nearby_restaurants.sort(key=lambda x: (-x['combined_score'], x['distance']))
+        if cuisine_type and cuisine_type.lower() != "all":
+            query = query.filter(cuisine.in_(cuisine_types_for_filter(cuisine_type)))
         
-        return nearby_restaurants
+        return [
+            {
+                'id': row.id,
+                'name': row.name,
+                'phone': row.phone,
+                'address': row.address or "",
+                'latitude': float(row.latitude) if row.latitude is not None else None,
+                'longitude': float(row.longitude) if row.longitude is not None else None,
+                'is_active': row.is_active,
+                'cuisine_type': row.cuisine_type or "both",
+                'rating': float(row.overall_rating) if row.overall_rating is not None else 4.0,
+                'delivery_available': row.delivery_available if row.delivery_available is not None else True,
+                'minimum_order_value': float(row.minimum_order_value) if row.minimum_order_value else 0.0,
+            }
+            for row in query.order_by(RestaurantDB.id).all()
+        ]
     finally:
         db.close()
 
 
+def get_restaurant_by_owner_phone(phone: str) -> Optional[Restaurant]:
+    """
+    Get the active restaurant whose phone or settings WhatsApp number is `phone`
+    (owner command routing). Phones and settings numbers of all restaurants
+    are read in one query; only the match is loaded in full.
+    """
+    from services.whatsapp_service import format_phone_number
+
+    sender_phone = format_phone_number(phone)
+    db = SessionLocal()
+    try:
+        rows = db.execute(
+            select(RestaurantDB.id, RestaurantDB.phone, RestaurantSettingsDB.whatsapp_number)
+            .outerjoin(RestaurantSettingsDB, RestaurantSettingsDB.restaurant_id == RestaurantDB.id)
+            .where(RestaurantDB.is_active == True)
+        ).all()
+    finally:
+        db.close()
+
+    for restaurant_id, restaurant_phone, whatsapp_number in rows:
+        if format_phone_number(restaurant_phone) == sender_phone or (
+            whatsapp_number and format_phone_number(whatsapp_number) == sender_phone
+        ):
+            return get_restaurant_by_id(restaurant_id)
+    return None
+
+
 def get_restaurant_by_phone(phone: str) -> Optional[Restaurant]:
     """
     Get restaurant by phone number from database
@@ -0,0 +1,264 @@
+"""
+Sales Rollup Repository - Data access layer for the sales rollup tables
+restaurant_sales_hourly holds order counts per status and delivered revenue
+per restaurant and UTC hour; restaurant_item_sales_daily holds quantities and
+revenue per restaurant, UTC day and product (cancelled orders excluded).
+
+order_repo applies the effect of every order write to the rollups in the same
+transaction (apply_order_change). rebuild_sales_rollups recomputes whole days
+from orders and orders_archive, for the initial backfill or repairs.
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Integer, cast, delete, extract, func, select, text, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from database import SessionLocal
+from models_db import OrderDB, OrderItemDB, RestaurantSalesHourlyDB, RestaurantItemSalesDailyDB
+
+# Statuses with their own counter column (<status>_orders) in restaurant_sales_hourly
+ROLLUP_STATUSES = ("pending", "preparing", "ready", "delivered", "cancelled")
+
+_HOURLY_COUNTERS = ("orders_count",) + tuple(f"{status}_orders" for status in ROLLUP_STATUSES) + ("revenue",)
+_ITEM_COUNTERS = ("quantity", "revenue")
+
+
+def order_snapshot(restaurant_id: str, created_at: datetime, status: str, total_amount,
+                   items: List[Tuple[str, str, int, float]]) -> Dict:
+    """
+    The parts of an order the rollups depend on
+    items: [(product_id, product_name, quantity, price)]
+    """
+    return {
+        'restaurant_id': restaurant_id,
+        'created_at': created_at,
+        'status': status,
+        'total_amount': Decimal(str(total_amount or 0)),
+        'items': items,
+    }
+
+
+def _bucket(created_at: datetime) -> Tuple[date, int]:
+    """UTC (day, hour) of an order; naive timestamps are already UTC"""
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc)
+    return created_at.date(), created_at.hour
+
+
+def _upsert_adding(db, table, key_columns: Tuple[str, ...], counters: Tuple[str, ...], rows: List[Dict],
+                   replace_columns: Tuple[str, ...] = ()):
+    """INSERT rows; on conflict add their counters to the existing row"""
+    if not rows:
+        return
+    stmt = pg_insert(table).values(rows)
+    set_ = {name: table.c[name] + stmt.excluded[name] for name in counters}
+    set_.update({name: stmt.excluded[name] for name in replace_columns})
+    set_['updated_at'] = func.now()
+    db.execute(stmt.on_conflict_do_update(index_elements=list(key_columns), set_=set_))
+
+
+def apply_order_change(db, old: Optional[Dict], new: Optional[Dict]):
+    """
+    Apply an order write to the rollups: subtract the old snapshot (None for a
+    new order) and add the new one. Runs in the caller's transaction, so the
+    rollups commit or roll back together with the order.
+    """
+    hourly: Dict[Tuple, Dict] = defaultdict(lambda: dict.fromkeys(_HOURLY_COUNTERS, 0))
+    items: Dict[Tuple, Dict] = defaultdict(lambda: dict.fromkeys(_ITEM_COUNTERS, 0))
+    item_names: Dict[Tuple, str] = {}
+
+    for snapshot, sign in ((old, -1), (new, 1)):
+        if not snapshot:
+            continue
+        day, hour = _bucket(snapshot['created_at'])
+        row = hourly[(snapshot['restaurant_id'], day, hour)]
+        row['orders_count'] += sign
+        if snapshot['status'] in ROLLUP_STATUSES:
+            row[f"{snapshot['status']}_orders"] += sign
+        if snapshot['status'] == "delivered":
+            row['revenue'] += sign * snapshot['total_amount']
+        if snapshot['status'] == "cancelled":
+            continue
+        for product_id, product_name, quantity, price in snapshot['items']:
+            key = (snapshot['restaurant_id'], day, product_id)
+            items[key]['quantity'] += sign * quantity
+            items[key]['revenue'] += sign * Decimal(str(price)) * quantity
+            item_names[key] = product_name
+
+    hourly_rows = [
+        {'restaurant_id': restaurant_id, 'bucket_date': day, 'hour': hour, **counters}
+        for (restaurant_id, day, hour), counters in hourly.items()
+        if any(counters.values())
+    ]
+    item_rows = [
+        {'restaurant_id': restaurant_id, 'bucket_date': day, 'product_id': product_id,
+         'product_name': item_names[(restaurant_id, day, product_id)], **counters}
+        for (restaurant_id, day, product_id), counters in items.items()
+        if any(counters.values())
+    ]
+    _upsert_adding(db, RestaurantSalesHourlyDB.__table__, ('restaurant_id', 'bucket_date', 'hour'),
+                   _HOURLY_COUNTERS, hourly_rows)
+    _upsert_adding(db, RestaurantItemSalesDailyDB.__table__, ('restaurant_id', 'bucket_date', 'product_id'),
+                   _ITEM_COUNTERS, item_rows, replace_columns=('product_name',))
+
+
+def get_sales_analytics(restaurant_id: str, start_date: date, end_date: date, top_items: int = 10) -> Dict:
+    """
+    Sales analytics for a restaurant between start_date and end_date (inclusive, UTC days)
+    Reads only rollup rows: one query per section, each returning at most
+    one row per day, per weekday/hour or per requested item.
+    Returns: {'daily': [...], 'hourly': [...], 'top_items': [...]}
+    """
+    hourly = RestaurantSalesHourlyDB
+    item_sales = RestaurantItemSalesDailyDB
+    db = SessionLocal()
+    try:
+        daily_rows = db.query(
+            hourly.bucket_date,
+            func.sum(hourly.orders_count),
+            func.sum(hourly.delivered_orders),
+            func.sum(hourly.cancelled_orders),
+            func.sum(hourly.revenue),
+        ).filter(
+            hourly.restaurant_id == restaurant_id,
+            hourly.bucket_date.between(start_date, end_date)
+        ).group_by(hourly.bucket_date).order_by(hourly.bucket_date).all()
+
+        # ISO day of week: Monday = 1
+        weekday = cast(extract('isodow', hourly.bucket_date), Integer) - 1
+        heatmap_rows = db.query(
+            weekday, hourly.hour, func.sum(hourly.orders_count), func.sum(hourly.revenue)
+        ).filter(
+            hourly.restaurant_id == restaurant_id,
+            hourly.bucket_date.between(start_date, end_date)
+        ).group_by(weekday, hourly.hour).order_by(weekday, hourly.hour).all()
+
+        quantity = func.sum(item_sales.quantity)
+        item_rows = db.query(
+            item_sales.product_id, func.max(item_sales.product_name), quantity, func.sum(item_sales.revenue)
+        ).filter(
+            item_sales.restaurant_id == restaurant_id,
+            item_sales.bucket_date.between(start_date, end_date)
+        ).group_by(item_sales.product_id).having(quantity > 0).order_by(
+            quantity.desc(), item_sales.product_id
+        ).limit(top_items).all()
+
+        return {
+            'daily': [
+                {'date': day, 'orders': int(orders), 'delivered_orders': int(delivered),
+                 'cancelled_orders': int(cancelled), 'revenue': float(revenue)}
+                for day, orders, delivered, cancelled, revenue in daily_rows
+            ],
+            'hourly': [
+                {'weekday': day_of_week, 'hour': hour, 'orders': int(orders), 'revenue': float(revenue)}
+                for day_of_week, hour, orders, revenue in heatmap_rows
+            ],
+            'top_items': [
+                {'product_id': product_id, 'product_name': product_name,
+                 'quantity': int(sold), 'revenue': float(revenue)}
+                for product_id, product_name, sold, revenue in item_rows
+            ],
+        }
+    finally:
+        db.close()
+
+
+def _order_sources():
+    """(orders, order_items) table pairs to aggregate: hot tables and archive"""
+    from repositories.archive_repo import orders_archive, order_items_archive
+    return [(OrderDB.__table__, OrderItemDB.__table__), (orders_archive, order_items_archive)]
+
+
+def get_order_date_range() -> Optional[Tuple[date, date]]:
+    """UTC days of the oldest and newest order, including archived orders"""
+    db = SessionLocal()
+    try:
+        bounds = union_all(*[
+            select(func.min(orders.c.created_at).label('first'), func.max(orders.c.created_at).label('last'))
+            for orders, _ in _order_sources()
+        ]).subquery()
+        first, last = db.execute(select(func.min(bounds.c.first), func.max(bounds.c.last))).one()
+        if first is None:
+            return None
+        return first.date(), last.date()
+    finally:
+        db.close()
+
+
+def rebuild_sales_rollups_for_day(day: date) -> Tuple[int, int]:
+    """
+    Recompute one UTC day of both rollup tables from orders and orders_archive
+    The rollup tables are locked against concurrent order writes for the
+    duration of the transaction, so no change is lost or counted twice.
+    Returns: (hourly rows, item rows) written
+    """
+    start = datetime(day.year, day.month, day.day)
+    end = start + timedelta(days=1)
+    hourly_table = RestaurantSalesHourlyDB.__table__
+    items_table = RestaurantItemSalesDailyDB.__table__
+    db = SessionLocal()
+    try:
+        db.execute(text(
+            "LOCK TABLE restaurant_sales_hourly, restaurant_item_sales_daily IN SHARE ROW EXCLUSIVE MODE"
+        ))
+        db.execute(delete(hourly_table).where(hourly_table.c.bucket_date == day))
+        db.execute(delete(items_table).where(items_table.c.bucket_date == day))
+
+        day_orders = union_all(*[
+            select(orders.c.restaurant_id, orders.c.created_at, orders.c.status, orders.c.total_amount)
+            .where(orders.c.created_at >= start, orders.c.created_at < end)
+            for orders, _ in _order_sources()
+        ]).subquery()
+        hour = cast(extract('hour', day_orders.c.created_at), Integer)
+        hourly_rows = db.execute(pg_insert(hourly_table).from_select(
+            ['restaurant_id', 'bucket_date', 'hour'] + list(_HOURLY_COUNTERS),
+            select(
+                day_orders.c.restaurant_id, cast(day, hourly_table.c.bucket_date.type), hour,
+                func.count(),
+                *[func.count().filter(day_orders.c.status == status) for status in ROLLUP_STATUSES],
+                func.coalesce(func.sum(day_orders.c.total_amount).filter(day_orders.c.status == "delivered"), 0),
+            ).group_by(day_orders.c.restaurant_id, hour)
+        )).rowcount
+
+        day_items = union_all(*[
+            select(orders.c.restaurant_id, items.c.product_id, items.c.product_name, items.c.quantity, items.c.price)
+            .join(items, items.c.order_id == orders.c.id)
+            .where(orders.c.created_at >= start, orders.c.created_at < end, orders.c.status != "cancelled")
+            for orders, items in _order_sources()
+        ]).subquery()
+        item_rows = db.execute(pg_insert(items_table).from_select(
+            ['restaurant_id', 'bucket_date', 'product_id', 'product_name', 'quantity', 'revenue'],
+            select(
+                day_items.c.restaurant_id, cast(day, items_table.c.bucket_date.type), day_items.c.product_id,
+                func.max(day_items.c.product_name), func.sum(day_items.c.quantity),
+                func.sum(day_items.c.price * day_items.c.quantity),
+            ).group_by(day_items.c.restaurant_id, day_items.c.product_id)
+        )).rowcount
+
+        db.commit()
+        return hourly_rows, item_rows
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def rebuild_sales_rollups(start_date: date, end_date: date) -> Dict:
+    """
+    Recompute the rollups for every UTC day from start_date to end_date (inclusive),
+    one transaction per day
+    Returns: {'days': n, 'hourly_rows': n, 'item_rows': n}
+    """
+    result = {'days': 0, 'hourly_rows': 0, 'item_rows': 0}
+    day = start_date
+    while day <= end_date:
+        hourly_rows, item_rows = rebuild_sales_rollups_for_day(day)
+        result['days'] += 1
+        result['hourly_rows'] += hourly_rows
+        result['item_rows'] += item_rows
+        day += timedelta(days=1)
+    return result
@@ -2,12 +2,21 @@
 User Repository - Data access layer for users
 Now using SQLAlchemy with PostgreSQL database
 """
-from typing import Optional
+import time
+from typing import Dict, Optional, Tuple
 from models.user import User
 from database import SessionLocal
 from models_db import UserDB
 from model_converters import user_db_to_model, user_model_to_db
 
+# How long a verified principal is trusted before it is re-read from the database.
+# Changes made through this module invalidate immediately; the TTL bounds how
+# long other worker processes can serve a stale entry.
+PRINCIPAL_CACHE_TTL_SECONDS = 30.0
+
+# Cache for JWT principals: user_id -> (cached_at, principal or None)
+_principal_cache: Dict[str, Tuple[float, Optional[Dict]]] = {}
+
 
 def get_user_by_email(email: str) -> Optional[User]:
     """
@@ -55,6 +64,7 @@ def create_user(user: User) -> Optional[User]:
         db.add(db_user)
         db.commit()
         db.refresh(db_user)
+        invalidate_user_principal(user.id)
         return user_db_to_model(db_user)
     except Exception as e:
         db.rollback()
@@ -92,6 +102,10 @@ def update_user(user: User) -> Optional[User]:
         if not db_user:
             return None
         
+        # A new password revokes every token issued with the old one
+        if db_user.password != user.password:
+            db_user.token_version = (db_user.token_version or 0) + 1
+        
         # Update fields
         db_user.email = user.email
         db_user.password = user.password  # Should be hashed before calling this
@@ -108,4 +122,79 @@ def update_user(user: User) -> Optional[User]:
         print(f"Error updating user: {e}")
         return None
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+        invalidate_user_principal(user.id)
+
+
+def update_user_password(user_id: str, password_hash: str):
+    """
+    Replace the stored password with a new hash of the same password
+    (plain-text upgrade or work factor change) - issued tokens stay valid
+    """
+    db = SessionLocal()
+    try:
+        db.query(UserDB).filter(UserDB.id == user_id).update(
+            {UserDB.password: password_hash}, synchronize_session=False
+        )
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Error updating user password: {e}")
+    finally:
+        db.close()
+
+
+def set_user_active(user_id: str, is_active: bool) -> bool:
+    """
+    Activate or deactivate a user
+    Deactivation also revokes all tokens issued to the user.
+    """
+    db = SessionLocal()
+    try:
+        values = {UserDB.is_active: is_active}
+        if not is_active:
+            values[UserDB.token_version] = UserDB.token_version + 1
+        updated = db.query(UserDB).filter(UserDB.id == user_id).update(values, synchronize_session=False)
+        db.commit()
+        return updated > 0
+    except Exception as e:
+        db.rollback()
+        print(f"Error updating user status: {e}")
+        return False
+    finally:
+        db.close()
+        invalidate_user_principal(user_id)
+
+
+def get_user_principal(user_id: str) -> Optional[Dict]:
+    """
+    Get what JWT verification needs to know about a user, cached for
+    PRINCIPAL_CACHE_TTL_SECONDS
+    Returns: {'restaurant_id': str, 'is_active': bool, 'token_version': int} or None
+    """
+    cached = _principal_cache.get(user_id)
+    if cached is not None and time.monotonic() - cached[0] < PRINCIPAL_CACHE_TTL_SECONDS:
+        return cached[1]
+    
+    db = SessionLocal()
+    try:
+        row = db.query(
+            UserDB.restaurant_id, UserDB.is_active, UserDB.token_version
+        ).filter(UserDB.id == user_id).first()
+    finally:
+        db.close()
+    
+    principal = None
+    if row:
+        principal = {
+            'restaurant_id': row.restaurant_id,
+            'is_active': row.is_active,
+            'token_version': row.token_version or 0,
+        }
+    _principal_cache[user_id] = (time.monotonic(), principal)
+    return principal
+
+
+def invalidate_user_principal(user_id: str):
+    """Drop a cached principal (call after any change to the user's account)"""
+    _principal_cache.pop(user_id, None)
\ No newline at end of file
@@ -0,0 +1,239 @@
+"""
+Webhook Event Repository - Idempotency ledger for incoming webhooks
+A delivery is claimed by inserting its key (source, event_id) before any
+processing. Providers retry deliveries and may send one event more than once;
+a key that is already present means the delivery was processed (or is being
+processed) and must be acknowledged without doing anything.
+
+In the queued ingestion mode the same row is the work item: it is inserted
+with status 'queued' and the delivery payload, and marked 'done' (or
+'failed' after too many attempts) by the worker that processed it. A queued
+event is leased by the process that holds it (lease_owner, lease_expires_at);
+the process renews the leases of its events while it is alive, and other
+processes only take over events whose lease has expired.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import case, delete, func, or_, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from database import SessionLocal
+from models_db import WebhookEventDB
+
+WEBHOOK_SOURCE_RAZORPAY = "razorpay"
+WEBHOOK_SOURCE_TWILIO = "twilio"
+
+
+def claim_webhook_event(source: str, event_id: str) -> bool:
+    """
+    Record a webhook delivery (one INSERT on the primary key)
+    Returns: True if this is the first delivery of the event, False for a duplicate
+    """
+    table = WebhookEventDB.__table__
+    db = SessionLocal()
+    try:
+        inserted = db.execute(
+            pg_insert(table).values(source=source, event_id=event_id)
+            .on_conflict_do_nothing(index_elements=[table.c.source, table.c.event_id])
+            .returning(table.c.event_id)
+        ).first()
+        db.commit()
+        return inserted is not None
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _lease_expiry(lease_seconds: float):
+    return func.now() + timedelta(seconds=lease_seconds)
+
+
+def enqueue_webhook_event(source: str, event_id: str, ordering_key: Optional[str], payload: str,
+                          owner: str, lease_seconds: float) -> bool:
+    """
+    Store a delivery as a queued work item leased to `owner` (one INSERT on the primary key)
+    Returns: True if queued, False for a duplicate delivery
+    """
+    table = WebhookEventDB.__table__
+    db = SessionLocal()
+    try:
+        inserted = db.execute(
+            pg_insert(table).values(
+                source=source, event_id=event_id, status="queued",
+                ordering_key=ordering_key, payload=payload, claimed_at=func.now(),
+                lease_owner=owner, lease_expires_at=_lease_expiry(lease_seconds)
+            )
+            .on_conflict_do_nothing(index_elements=[table.c.source, table.c.event_id])
+            .returning(table.c.event_id)
+        ).first()
+        db.commit()
+        return inserted is not None
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def complete_webhook_event(source: str, event_id: str):
+    """Mark a queued delivery as processed"""
+    db = SessionLocal()
+    try:
+        db.execute(update(WebhookEventDB.__table__).where(
+            WebhookEventDB.source == source, WebhookEventDB.event_id == event_id
+        ).values(status="done", attempts=WebhookEventDB.attempts + 1, payload=None,
+                 lease_owner=None, lease_expires_at=None))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def fail_webhook_event(source: str, event_id: str, error: str, max_attempts: int,
+                       retry_seconds: float) -> bool:
+    """
+    Record a failed processing attempt; the event stays queued until
+    max_attempts is reached, with its lease released and expiring after
+    retry_seconds (then claim_expired_webhook_events takes it again)
+    Returns: True if the event will be retried
+    """
+    table = WebhookEventDB.__table__
+    db = SessionLocal()
+    try:
+        status = db.execute(update(table).where(
+            table.c.source == source, table.c.event_id == event_id
+        ).values(
+            attempts=table.c.attempts + 1,
+            status=case((table.c.attempts + 1 >= max_attempts, "failed"), else_="queued"),
+            claimed_at=func.now(),
+            lease_owner=None,
+            lease_expires_at=_lease_expiry(retry_seconds),
+            last_error=error[:2000],
+        ).returning(table.c.status)).scalar()
+        db.commit()
+        return status == "queued"
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def renew_webhook_leases(owner: str, lease_seconds: float) -> int:
+    """
+    Extend the leases of all queued events held by `owner` (its heartbeat)
+    Returns: number of leases renewed
+    """
+    table = WebhookEventDB.__table__
+    db = SessionLocal()
+    try:
+        renewed = db.execute(update(table).where(
+            table.c.status == "queued", table.c.lease_owner == owner
+        ).values(lease_expires_at=_lease_expiry(lease_seconds))).rowcount
+        db.commit()
+        return renewed
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def release_webhook_leases(owner: str) -> int:
+    """
+    Give up the leases of the queued events held by `owner` (on shutdown), so
+    another process takes them over right away
+    Returns: number of leases released
+    """
+    table = WebhookEventDB.__table__
+    db = SessionLocal()
+    try:
+        released = db.execute(update(table).where(
+            table.c.status == "queued", table.c.lease_owner == owner
+        ).values(lease_owner=None, lease_expires_at=func.now())).rowcount
+        db.commit()
+        return released
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def claim_expired_webhook_events(owner: str, lease_seconds: float, limit: int = 100) -> List[Dict]:
+    """
+    Lease queued deliveries whose lease expired to `owner`, oldest first: held
+    by a process that stopped, or released after a failure and due for a retry.
+    Events held by a live process (renewed leases) are never taken.
+    Returns: [{'source', 'event_id', 'ordering_key', 'payload'}]
+    """
+    table = WebhookEventDB.__table__
+    db = SessionLocal()
+    try:
+        expired = select(table.c.source, table.c.event_id).where(
+            table.c.status == "queued",
+            # No lease: queued before leases existed
+            or_(table.c.lease_expires_at < func.now(), table.c.lease_expires_at.is_(None))
+        ).order_by(table.c.received_at).limit(limit).with_for_update(skip_locked=True)
+        rows = db.execute(
+            update(table).where(tuple_(table.c.source, table.c.event_id).in_(expired))
+            .values(claimed_at=func.now(), lease_owner=owner, lease_expires_at=_lease_expiry(lease_seconds))
+            .returning(table.c.source, table.c.event_id, table.c.ordering_key,
+                       table.c.payload, table.c.received_at)
+        ).all()
+        db.commit()
+        return [
+            {'source': row.source, 'event_id': row.event_id,
+             'ordering_key': row.ordering_key, 'payload': row.payload}
+            for row in sorted(rows, key=lambda row: row.received_at)
+        ]
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def release_webhook_event(source: str, event_id: str):
+    """Forget a claimed delivery whose processing failed, so the provider's retry is processed"""
+    db = SessionLocal()
+    try:
+        db.execute(delete(WebhookEventDB.__table__).where(
+            WebhookEventDB.source == source, WebhookEventDB.event_id == event_id
+        ))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Error releasing webhook event {source}/{event_id}: {e}")
+    finally:
+        db.close()
+
+
+def purge_webhook_events_batch(cutoff: datetime, batch_size: int = 1000) -> int:
+    """
+    Delete up to batch_size ledger rows received before cutoff (queued
+    deliveries are kept until they are processed)
+    Returns: number of rows deleted
+    """
+    table = WebhookEventDB.__table__
+    db = SessionLocal()
+    try:
+        keys = select(table.c.source, table.c.event_id).where(
+            table.c.received_at < cutoff,
+            table.c.status != "queued"
+        ).order_by(table.c.received_at).limit(batch_size).with_for_update(skip_locked=True)
+        deleted = db.execute(
+            delete(table).where(tuple_(table.c.source, table.c.event_id).in_(keys))
+        ).rowcount
+        db.commit()
+        return deleted
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
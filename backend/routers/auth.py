@@ -5,6 +5,7 @@ from fastapi import APIRouter, HTTPException, Depends, status
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 from services.auth_service import authenticate_user, get_user_restaurant
+from services.password_service import hash_password, verify_password
 from repositories.restaurant_repo import get_restaurant_by_id, create_restaurant
 from repositories.user_repo import get_user_by_email, create_user, get_user_by_id
 from models.restaurant import Restaurant
@@ -80,7 +81,7 @@ async def get_current_user_info(
 @router.post("/login", response_model=LoginResponse)
 async def login(login_data: LoginRequest):
     """Restaurant admin login"""
-    user = authenticate_user(login_data.email, login_data.password)
+    user = await authenticate_user(login_data.email, login_data.password)
     
     if not user:
         raise HTTPException(status_code=401, detail="Invalid email or password")
@@ -89,7 +90,7 @@ async def login(login_data: LoginRequest):
     if not restaurant:
         raise HTTPException(status_code=500, detail="Restaurant not found")
     
-    access_token = auth.create_access_token(user.id, user.restaurant_id)
+    access_token = auth.create_access_token(user.id, user.restaurant_id, user.token_version)
     
     return LoginResponse(
         token=access_token,
@@ -111,6 +112,10 @@ async def signup(signup_data: SignUpRequest):
     if existing_user:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email already exists")
     
+    # Hash first: if the hashing pool is saturated the request is shed before
+    # anything is written
+    password_hash = await hash_password(signup_data.password)
+    
     # Generate IDs using ID generator (9-digit format)
     restaurant_id = generate_restaurant_id()
     user_id = generate_user_id()
@@ -137,7 +142,7 @@ async def signup(signup_data: SignUpRequest):
     user = User(
         id=user_id,
         email=signup_data.email,
-        password=signup_data.password,  # In production, hash this
+        password=password_hash,
         restaurant_id=restaurant_id,
         name=signup_data.owner_name
     )
@@ -173,6 +178,7 @@ class UpdateAccountRequest(BaseModel):
 
 class UpdateAccountResponse(BaseModel):
     message: str
+    token: Optional[str] = None  # New JWT when the password changed (older tokens are revoked)
 
 
 @router.put("/account", response_model=UpdateAccountResponse)
@@ -184,7 +190,6 @@ async def update_account(
     """Update account details (name, email, phone, password)"""
     from repositories.user_repo import update_user
     from repositories.restaurant_repo import get_restaurant_by_id, update_restaurant
-    from services.auth_service import authenticate_user
     
     # Get current user
     user = get_user_by_id(user_id)
@@ -219,13 +224,11 @@ async def update_account(
         if not account_data.current_password:
             raise HTTPException(status_code=400, detail="Current password is required to change password")
         
-        # Verify current password
-        authenticated_user = authenticate_user(user.email, account_data.current_password)
-        if not authenticated_user:
+        # Verify current password (against the loaded user - the email may have just changed)
+        if not await verify_password(account_data.current_password, user.password):
             raise HTTPException(status_code=401, detail="Current password is incorrect")
         
-        # Update password (in production, hash this)
-        user.password = account_data.new_password
+        user.password = await hash_password(account_data.new_password)
     
     # Update two-factor if provided
     if account_data.two_factor_enabled is not None:
@@ -250,6 +253,12 @@ async def update_account(
     if not updated_user:
         raise HTTPException(status_code=500, detail="Failed to update account")
     
+    # Changing the password revoked the current token, so hand out a new one
+    token = None
+    if updated_user.token_version != user.token_version:
+        token = auth.create_access_token(user_id, restaurant_id, updated_user.token_version)
+    
     return UpdateAccountResponse(
-        message="Account updated successfully"
+        message="Account updated successfully",
+        token=token
     )
\ No newline at end of file
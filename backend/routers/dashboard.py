@@ -3,10 +3,12 @@ Dashboard Router - API endpoints for dashboard statistics
 """
 from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
-from typing import Optional, Dict
-from datetime import datetime, timedelta
+from typing import Optional, Dict, List
+from datetime import date, datetime, timedelta, timezone
 import uuid
-from repositories.order_repo import get_orders_by_restaurant
+from repositories.order_repo import get_order_status_counts
+from repositories.archive_repo import get_archived_order_totals
+from repositories.sales_rollup_repo import get_sales_analytics
 from repositories.restaurant_repo import get_restaurant_by_id, update_restaurant
 import auth
 import re
@@ -28,6 +30,49 @@ class DashboardStats(BaseModel):
     today_orders: int
     average_order_value: float
 
+class DailySales(BaseModel):
+    date: date
+    orders: int
+    delivered_orders: int
+    cancelled_orders: int
+    revenue: float
+
+class HourlySales(BaseModel):
+    weekday: int  # 0 = Monday
+    hour: int  # UTC hour
+    orders: int
+    revenue: float
+
+class ItemSales(BaseModel):
+    product_id: str
+    product_name: str
+    quantity: int
+    revenue: float
+
+class SalesAnalytics(BaseModel):
+    start_date: date
+    end_date: date
+    total_orders: int
+    delivered_orders: int
+    cancelled_orders: int
+    total_revenue: float
+    average_order_value: float
+    daily: List[DailySales]
+    hourly: List[HourlySales]
+    top_items: List[ItemSales]
+
+class ItemAnalytics(BaseModel):
+    product_id: str
+    product_name: str
+    quantity: int
+    revenue: float
+    orders: int
+    quantity_share: float
+    last_ordered_at: Optional[datetime] = None
+
+# Longest range the analytics endpoint answers in one request
+MAX_ANALYTICS_DAYS = 366
+
 class RestaurantInfo(BaseModel):
     id: str
     name: str
@@ -71,63 +116,35 @@ class ConfirmUPIVerificationRequest(BaseModel):
 @router.get("/stats", response_model=DashboardStats)
 async def get_dashboard_stats(restaurant_id: str = Depends(auth.get_current_restaurant_id)):
     """Get dashboard statistics for current restaurant"""
-    orders = get_orders_by_restaurant(restaurant_id)
-    
-    today = datetime.now().date()
-    
-    total_orders = len(orders)
-    pending_orders = len([o for o in orders if o.status == "pending"])
-    preparing_orders = len([o for o in orders if o.status == "preparing"])
-    ready_orders = len([o for o in orders if o.status == "ready"])
-    delivered_orders = len([o for o in orders if o.status == "delivered"])
-    cancelled_orders = len([o for o in orders if o.status == "cancelled"])
-    total_revenue = sum([o.total for o in orders if o.status == "delivered"])
-    
-    # Calculate today's orders and revenue - handle timezone properly
-    # Use UTC for consistency with database
-    from datetime import timezone
-    today_utc = datetime.now(timezone.utc).date()
-    
-    today_orders = 0
-    today_revenue = 0.0
-    for o in orders:
-        try:
-            # Parse created_at - handle both string and datetime
-            if isinstance(o.created_at, str):
-                # Try parsing ISO format
-                if 'T' in o.created_at:
-                    order_date = datetime.fromisoformat(o.created_at.replace('Z', '+00:00'))
-                else:
-                    # Just date string
-                    order_date = datetime.strptime(o.created_at.split('T')[0], '%Y-%m-%d')
-            elif hasattr(o.created_at, 'date'):
-                order_date = o.created_at
-            else:
-                continue
-            
-            # Convert to date - handle timezone aware datetimes
-            if hasattr(order_date, 'date'):
-                if order_date.tzinfo is not None:
-                    # Convert to UTC then get date
-                    order_date_utc = order_date.astimezone(timezone.utc)
-                    order_date_only = order_date_utc.date()
-                else:
-                    # Naive datetime, assume UTC
-                    order_date_only = order_date.date()
-            else:
-                order_date_only = order_date
-            
-            # Compare dates
-            if order_date_only == today_utc:
-                today_orders += 1
-                if o.status == "delivered":
-                    today_revenue += o.total
-        except Exception as e:
-            # Log error but continue processing
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.warning(f"Error parsing order date for order {getattr(o, 'id', 'unknown')}: {e}")
-            continue
+    counts = get_order_status_counts(restaurant_id)
+    
+    def count(status: str) -> int:
+        return counts.get(status, {}).get('count', 0)
+    
+    total_orders = sum(c['count'] for c in counts.values())
+    pending_orders = count("pending")
+    preparing_orders = count("preparing")
+    ready_orders = count("ready")
+    delivered_orders = count("delivered")
+    cancelled_orders = count("cancelled")
+    total_revenue = counts.get("delivered", {}).get('revenue', 0.0)
+    
+    # Orders moved to the archive still count towards the totals
+    archived = get_archived_order_totals([restaurant_id]).get(restaurant_id)
+    if archived:
+        total_orders += archived['archived_orders']
+        delivered_orders += archived['delivered_orders']
+        cancelled_orders += archived['cancelled_orders']
+        total_revenue += archived['delivered_revenue']
+    
+    # Today's orders and revenue (UTC day, consistent with the database).
+    # Bounded by created_at so only the current month's partition is scanned.
+    today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    today_counts = get_order_status_counts(
+        restaurant_id, since=today_start, until=today_start + timedelta(days=1)
+    )
+    today_orders = sum(c['count'] for c in today_counts.values())
+    today_revenue = today_counts.get("delivered", {}).get('revenue', 0.0)
     
     # Calculate average order value
     average_order_value = 0.0
@@ -147,6 +164,54 @@ async def get_dashboard_stats(restaurant_id: str = Depends(auth.get_current_rest
         average_order_value=round(average_order_value, 2)
     )
 
+@router.get("/analytics", response_model=SalesAnalytics)
+async def get_dashboard_analytics(
+    restaurant_id: str = Depends(auth.get_current_restaurant_id),
+    days: int = Query(30, ge=1, le=MAX_ANALYTICS_DAYS, description="Number of days up to end_date"),
+    start_date: Optional[date] = Query(None, description="First UTC day (overrides days)"),
+    end_date: Optional[date] = Query(None, description="Last UTC day (default: today)"),
+    top_items: int = Query(10, ge=1, le=50, description="Number of top-selling items")
+):
+    """
+    Revenue trend, hour-of-day heatmap and top items for current restaurant
+    Served from the sales rollup tables (repositories/sales_rollup_repo.py).
+    """
+    end_date = end_date or datetime.now(timezone.utc).date()
+    start_date = start_date or end_date - timedelta(days=days - 1)
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    if (end_date - start_date).days >= MAX_ANALYTICS_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range is limited to {MAX_ANALYTICS_DAYS} days")
+    
+    analytics = get_sales_analytics(restaurant_id, start_date, end_date, top_items=top_items)
+    
+    total_orders = sum(d['orders'] for d in analytics['daily'])
+    delivered_orders = sum(d['delivered_orders'] for d in analytics['daily'])
+    total_revenue = sum(d['revenue'] for d in analytics['daily'])
+    
+    return SalesAnalytics(
+        start_date=start_date,
+        end_date=end_date,
+        total_orders=total_orders,
+        delivered_orders=delivered_orders,
+        cancelled_orders=sum(d['cancelled_orders'] for d in analytics['daily']),
+        total_revenue=total_revenue,
+        average_order_value=round(total_revenue / delivered_orders, 2) if delivered_orders else 0.0,
+        daily=[DailySales(**d) for d in analytics['daily']],
+        hourly=[HourlySales(**h) for h in analytics['hourly']],
+        top_items=[ItemSales(**i) for i in analytics['top_items']]
+    )
+
+@router.get("/items", response_model=List[ItemAnalytics])
+async def get_item_analytics(
+    restaurant_id: str = Depends(auth.get_current_restaurant_id),
+    days: int = Query(30, ge=1, le=MAX_ANALYTICS_DAYS, description="Trailing window in days"),
+    limit: int = Query(20, ge=1, le=200, description="Number of products")
+):
+    """Best-selling products of current restaurant over the last `days` days"""
+    from services.item_analytics_service import get_item_analytics as get_items
+    return [ItemAnalytics(**item) for item in get_items(restaurant_id, days)[:limit]]
+
 @router.get("/restaurant", response_model=RestaurantInfo)
 async def get_restaurant_info(restaurant_id: str = Depends(auth.get_current_restaurant_id)):
     """Get restaurant information for current restaurant"""
@@ -0,0 +1,38 @@
+"""
+Debug Router - Operator endpoints for diagnosing a live worker
+Guarded by the ADMIN_TOKEN (X-Admin-Token header); disabled when it is unset.
+"""
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from services.profiler_service import (
+    MAX_PROFILE_SECONDS, ProfilerBusyError, format_collapsed, sample_stacks
+)
+import auth
+
+router = APIRouter(
+    prefix="/api/v1/debug",
+    tags=["debug"],
+    dependencies=[Depends(auth.verify_admin_token)],
+    include_in_schema=False,
+)
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def profile_worker(
+    seconds: float = Query(10, gt=0, le=MAX_PROFILE_SECONDS, description="How long to sample"),
+    interval_ms: float = Query(10, ge=1, le=1000, description="Time between samples"),
+    include_idle: bool = Query(False, description="Keep samples of threads waiting for work"),
+):
+    """
+    Sample the stacks of the worker that receives this request and return them
+    as a collapsed stack file (input for flamegraph.pl or speedscope)
+    Example: curl -H "X-Admin-Token: ..." ".../api/v1/debug/profile?seconds=30" > profile.folded
+    """
+    try:
+        stacks = await asyncio.to_thread(sample_stacks, seconds, interval_ms, include_idle)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(
+        format_collapsed(stacks),
+        headers={"Content-Disposition": 'attachment; filename="profile.folded"'}
+    )
@@ -1,18 +1,23 @@
 """
 Delivery Router - API endpoints for delivery persons
 """
-from fastapi import APIRouter, Depends, HTTPException, status
-from pydantic import BaseModel, EmailStr
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List
 from datetime import datetime
-from repositories.order_repo import get_orders_by_restaurant, get_order_by_id
+from repositories.order_repo import get_order_by_id, get_ready_delivery_orders
 from repositories.restaurant_repo import get_restaurant_by_id
 from repositories.delivery_person_repo import (
     get_delivery_person_by_email, 
     get_delivery_person_by_phone,
-    create_delivery_person
+    get_delivery_person_by_id,
+    create_delivery_person,
+    set_delivery_person_availability
 )
 from services.order_service import update_order_status_safe
+from services.dispatch_service import dispatcher
+from services.location_service import rider_locations, MAX_PINGS_PER_BATCH
+from services.password_service import PasswordHasherBusyError, hash_password, verify_password
 from models.delivery_person import DeliveryPerson
 from id_generator import generate_delivery_person_id
 import auth
@@ -20,27 +25,6 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-# Try to import passlib, fallback to bcrypt directly if not available
-try:
-    from passlib.context import CryptContext
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-    HAS_PASSLIB = True
-except ImportError:
-    # Fallback to bcrypt directly if passlib is not available
-    try:
-        import bcrypt
-        pwd_context = None  # Will use bcrypt directly
-        HAS_PASSLIB = False
-        logger.warning("passlib not available, using bcrypt directly")
-    except ImportError:
-        pwd_context = None
-        HAS_PASSLIB = False
-        logger.error(
-            "Neither passlib nor bcrypt is available. "
-            "Password hashing will fail. Please install with: pip install passlib[bcrypt]"
-        )
-        # Don't raise here - let the server start, but password hashing will fail at runtime
-
 router = APIRouter(prefix="/api/v1/delivery", tags=["delivery"])
 
 class DeliveryPersonCreate(BaseModel):
@@ -70,8 +54,22 @@ class UpdateAvailabilityRequest(BaseModel):
     is_available: bool
 
 class UpdateLocationRequest(BaseModel):
-    latitude: float
-    longitude: float
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+    recorded_at: Optional[datetime] = None  # When the device took the fix (defaults to now)
+
+class LocationBatchRequest(BaseModel):
+    pings: List[UpdateLocationRequest] = Field(..., min_length=1, max_length=MAX_PINGS_PER_BATCH)
+
+class DeliveryLoginRequest(BaseModel):
+    email: EmailStr
+    password: str
+
+class DeliveryLoginResponse(BaseModel):
+    token: str  # JWT token
+    delivery_person_id: str
+    name: str
+    is_available: bool
 
 class DeliveryOrderResponse(BaseModel):
     order_id: str
@@ -131,20 +129,8 @@ async def signup_delivery_person(person_data: DeliveryPersonCreate):
                 detail="Phone number already registered"
             )
         
-        # Hash password
-        if HAS_PASSLIB and pwd_context:
-            password_hash = pwd_context.hash(person_data.password)
-        else:
-            # Fallback to bcrypt directly
-            try:
-                import bcrypt
-                salt = bcrypt.gensalt()
-                password_hash = bcrypt.hashpw(person_data.password.encode('utf-8'), salt).decode('utf-8')
-            except ImportError:
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail="Password hashing library not available. Please install passlib[bcrypt] or bcrypt."
-                )
+        # Hash password (in the hashing pool, off the event loop)
+        password_hash = await hash_password(person_data.password)
         
         # Generate unique ID
         delivery_person_id = generate_delivery_person_id()
@@ -176,7 +162,7 @@ async def signup_delivery_person(person_data: DeliveryPersonCreate):
             delivery_person_id=delivery_person_id
         )
         
-    except HTTPException:
+    except (HTTPException, PasswordHasherBusyError):
         raise
     except Exception as e:
         logger.error(f"Error creating delivery person: {str(e)}", exc_info=True)
@@ -185,73 +171,130 @@ async def signup_delivery_person(person_data: DeliveryPersonCreate):
             detail=f"Internal server error: {str(e)}"
         )
 
-@router.post("/login")
-async def login_delivery_person(email: str, password: str):
+@router.post("/login", response_model=DeliveryLoginResponse)
+async def login_delivery_person(login_data: DeliveryLoginRequest):
     """Login for delivery person"""
-    # TODO: Implement delivery person login
-    raise HTTPException(status_code=501, detail="Delivery person login not yet implemented")
+    person = get_delivery_person_by_email(login_data.email.lower().strip())
+    if not person or not await verify_password(login_data.password, person.password_hash):
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+    
+    return DeliveryLoginResponse(
+        token=auth.create_delivery_access_token(person.id),
+        delivery_person_id=person.id,
+        name=person.name,
+        is_available=person.is_available
+    )
 
 @router.get("/me", response_model=DeliveryPersonResponse)
-async def get_delivery_person_info():
+async def get_delivery_person_info(delivery_person_id: str = Depends(auth.get_current_delivery_person_id)):
     """Get current delivery person info"""
-    # TODO: Implement get delivery person info
-    raise HTTPException(status_code=501, detail="Not yet implemented")
+    person = get_delivery_person_by_id(delivery_person_id)
+    if not person:
+        raise HTTPException(status_code=404, detail="Delivery person not found")
+    
+    return DeliveryPersonResponse(
+        id=person.id,
+        name=person.name,
+        phone=person.phone,
+        email=person.email,
+        vehicle_type=person.vehicle_type,
+        is_available=person.is_available,
+        current_latitude=person.current_latitude,
+        current_longitude=person.current_longitude,
+        created_at=person.created_at or ""
+    )
 
 @router.patch("/availability")
-async def update_availability(request: UpdateAvailabilityRequest):
+async def update_availability(
+    request: UpdateAvailabilityRequest,
+    delivery_person_id: str = Depends(auth.get_current_delivery_person_id)
+):
     """Update delivery person availability status"""
-    # TODO: Implement availability update
-    raise HTTPException(status_code=501, detail="Not yet implemented")
+    person = get_delivery_person_by_id(delivery_person_id)
+    if not person:
+        raise HTTPException(status_code=404, detail="Delivery person not found")
+    
+    set_delivery_person_availability(delivery_person_id, request.is_available)
+    latitude, longitude = rider_locations.position(delivery_person_id) or (
+        person.current_latitude, person.current_longitude
+    )
+    dispatcher.set_rider_available(delivery_person_id, request.is_available, latitude, longitude)
+    
+    return {"message": "Availability updated", "is_available": request.is_available}
 
 @router.post("/location")
-async def update_location(request: UpdateLocationRequest):
-    """Update delivery person's current location"""
-    # TODO: Implement location update
-    raise HTTPException(status_code=501, detail="Not yet implemented")
-
-@router.get("/orders", response_model=List[DeliveryOrderResponse])
-async def get_delivery_orders():
-    """Get available delivery orders (orders with delivery type and ready status)"""
-    # Get all restaurants
-    from repositories.restaurant_repo import get_all_restaurants
-    restaurants = get_all_restaurants()
+async def update_location(
+    request: UpdateLocationRequest,
+    delivery_person_id: str = Depends(auth.get_current_delivery_person_id)
+):
+    """Update delivery person's current location (written to the database in batches)"""
+    rider_locations.record(
+        delivery_person_id, request.latitude, request.longitude,
+        request.recorded_at.timestamp() if request.recorded_at else None
+    )
     
-    delivery_orders = []
-    for restaurant in restaurants:
-        # Get orders for this restaurant
-        orders = get_orders_by_restaurant(restaurant.id)
-        
-        # Filter for delivery orders that are ready
-        for order in orders:
-            if order.order_type == "delivery" and order.status == "ready":
-                delivery_orders.append({
-                    "order_id": order.id,
-                    "restaurant_id": restaurant.id,
-                    "restaurant_name": restaurant.name,
-                    "restaurant_address": restaurant.address or "",
-                    "customer_name": order.customer_name,
-                    "customer_phone": order.customer_phone,
-                    "delivery_address": order.delivery_address or "",
-                    "customer_latitude": None,  # TODO: Get from order if stored
-                    "customer_longitude": None,  # TODO: Get from order if stored
-                    "total_amount": order.total_amount,
-                    "order_items": [
-                        {
-                            "product_name": item.product_name,
-                            "quantity": item.quantity,
-                            "price": item.price
-                        }
-                        for item in order.items
-                    ],
-                    "created_at": order.created_at.isoformat() if hasattr(order.created_at, 'isoformat') else str(order.created_at),
-                    "status": order.status
-                })
+    return {"message": "Location updated"}
+
+@router.post("/location/batch")
+async def update_location_batch(
+    request: LocationBatchRequest,
+    delivery_person_id: str = Depends(auth.get_current_delivery_person_id)
+):
+    """Upload several location pings at once (e.g. buffered while offline)"""
+    accepted = rider_locations.record_batch(delivery_person_id, [
+        (ping.latitude, ping.longitude, ping.recorded_at.timestamp() if ping.recorded_at else None)
+        for ping in request.pings
+    ])
     
-    return delivery_orders
+    return {"message": "Locations updated", "accepted": accepted}
+
+def delivery_order_to_response(entry: dict) -> dict:
+    """Convert a get_ready_delivery_orders entry to DeliveryOrderResponse fields"""
+    order = entry['order']
+    return {
+        "order_id": order.id,
+        "restaurant_id": order.restaurant_id,
+        "restaurant_name": entry['restaurant_name'],
+        "restaurant_address": entry['restaurant_address'],
+        "customer_name": order.customer_name,
+        "customer_phone": order.customer_phone,
+        "delivery_address": order.delivery_address or "",
+        "customer_latitude": None,  # TODO: Get from order if stored
+        "customer_longitude": None,  # TODO: Get from order if stored
+        "total_amount": order.total_amount,
+        "order_items": [
+            {
+                "product_name": item.product_name,
+                "quantity": item.quantity,
+                "price": item.price
+            }
+            for item in order.items
+        ],
+        "created_at": order.created_at.isoformat() if hasattr(order.created_at, 'isoformat') else str(order.created_at),
+        "status": order.status
+    }
+
+@router.get("/orders", response_model=List[DeliveryOrderResponse])
+async def get_delivery_orders(
+    limit: int = Query(50, ge=1, le=200, description="Number of results"),
+    offset: int = Query(0, ge=0, description="Pagination offset")
+):
+    """Get available delivery orders (unassigned, delivery type and ready status), oldest first"""
+    ready_orders = get_ready_delivery_orders(limit=limit, offset=offset)
+    return [delivery_order_to_response(entry) for entry in ready_orders]
+
+@router.get("/assignments", response_model=List[DeliveryOrderResponse])
+async def get_assigned_orders(delivery_person_id: str = Depends(auth.get_current_delivery_person_id)):
+    """Get ready orders assigned to the current delivery person (by dispatch or accepted)"""
+    assigned_orders = get_ready_delivery_orders(limit=200, delivery_person_id=delivery_person_id)
+    return [delivery_order_to_response(entry) for entry in assigned_orders]
 
 @router.post("/orders/{order_id}/accept")
-async def accept_delivery_order(order_id: str):
-    """Accept a delivery order"""
+async def accept_delivery_order(
+    order_id: str,
+    delivery_person_id: str = Depends(auth.get_current_delivery_person_id)
+):
+    """Accept a delivery order (assigns it to the current delivery person)"""
     order = get_order_by_id(order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
@@ -259,27 +302,34 @@ async def accept_delivery_order(order_id: str):
     if order.order_type != "delivery":
         raise HTTPException(status_code=400, detail="Order is not a delivery order")
     
+    if order.delivery_person_id == delivery_person_id:
+        return {"message": "Order accepted for delivery", "order_id": order_id}
+    
     if order.status != "ready":
         raise HTTPException(status_code=400, detail="Order is not ready for delivery")
     
-    # TODO: Assign order to delivery person
-    # For now, just update status to "out_for_delivery" or similar
-    # This would require adding a new status or delivery_person_id field
+    result = dispatcher.assign(order_id, delivery_person_id)
+    if result == "rider_unavailable":
+        raise HTTPException(status_code=409, detail="Set yourself available before accepting orders")
+    if result == "order_unavailable":
+        raise HTTPException(status_code=409, detail="Order has already been taken")
     
     return {"message": "Order accepted for delivery", "order_id": order_id}
 
 @router.post("/orders/{order_id}/complete")
-async def complete_delivery_order(order_id: str):
+async def complete_delivery_order(
+    order_id: str,
+    delivery_person_id: str = Depends(auth.get_current_delivery_person_id)
+):
     """Mark delivery order as completed"""
     order = get_order_by_id(order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     
-    # Update order status to delivered
-    restaurant = get_restaurant_by_id(order.restaurant_id)
-    if not restaurant:
-        raise HTTPException(status_code=404, detail="Restaurant not found")
+    if order.delivery_person_id != delivery_person_id:
+        raise HTTPException(status_code=403, detail="Order is not assigned to you")
     
-    updated_order, old_status = update_order_status_safe(order_id, "delivered", restaurant.id)
+    # Update order status to delivered (releases the rider for new orders)
+    updated_order, old_status = update_order_status_safe(order_id, "delivered", order.restaurant_id)
     
     return {"message": "Order delivered successfully", "order_id": order_id}
@@ -1,16 +1,20 @@
 """
 Menu Router - API endpoints for menu/products
 """
-from fastapi import APIRouter, HTTPException, Depends, status
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Depends, status, Query, UploadFile, File
+from pydantic import BaseModel, Field, ValidationError, model_validator
 from typing import List, Optional
+import csv
+import io
 from services.auth_service import get_user_restaurant
 from repositories.product_repo import (
     get_products_by_restaurant,
     get_product_by_id,
     create_product as repo_create_product,
     update_product as repo_update_product,
-    delete_product as repo_delete_product
+    delete_product as repo_delete_product,
+    bulk_upsert_products,
+    bulk_update_products
 )
 from models.product import Product
 import auth
@@ -52,6 +56,53 @@ class ProductUpdate(BaseModel):
     preparation_time: Optional[int] = None
     discounted_price: Optional[float] = None
 
+# Largest menu accepted by one import request
+MAX_IMPORT_ITEMS = 2000
+
+class MenuImportItem(BaseModel):
+    id: Optional[str] = None  # Update this product; otherwise matched by name or created
+    name: str = Field(..., min_length=1, max_length=255)
+    description: Optional[str] = None
+    price: float = Field(..., ge=0)
+    category: str = Field(..., min_length=1, max_length=100)
+    is_available: bool = True
+    discounted_price: Optional[float] = Field(None, ge=0)
+    image_url: Optional[str] = Field(None, max_length=500)
+
+class MenuImportRequest(BaseModel):
+    items: List[MenuImportItem] = Field(..., min_length=1, max_length=MAX_IMPORT_ITEMS)
+
+class MenuImportResponse(BaseModel):
+    created: int
+    updated: int
+    created_ids: List[str]
+    updated_ids: List[str]
+
+class MenuBulkUpdateRequest(BaseModel):
+    # Which products: IDs and/or a category (both given = both must match)
+    product_ids: Optional[List[str]] = Field(None, min_length=1, max_length=MAX_IMPORT_ITEMS)
+    category: Optional[str] = None
+    # What to change
+    is_available: Optional[bool] = None
+    price: Optional[float] = Field(None, ge=0)
+    price_change_percent: Optional[float] = Field(None, gt=-100)
+    discounted_price: Optional[float] = Field(None, ge=0)  # 0 removes the discount
+
+    @model_validator(mode="after")
+    def check_selection_and_changes(self):
+        if not self.product_ids and not self.category:
+            raise ValueError("Provide product_ids and/or category")
+        if self.price is not None and self.price_change_percent is not None:
+            raise ValueError("Provide either price or price_change_percent, not both")
+        if self.is_available is None and self.price is None and self.price_change_percent is None \
+                and self.discounted_price is None:
+            raise ValueError("Nothing to update")
+        return self
+
+class MenuBulkUpdateResponse(BaseModel):
+    updated: int
+    product_ids: List[str]
+
 def product_to_response(product: Product) -> ProductResponse:
     """Convert Product model to ProductResponse"""
     # Calculate discount percentage if discounted_price is set
@@ -74,9 +125,17 @@ def product_to_response(product: Product) -> ProductResponse:
     )
 
 @router.get("", response_model=List[ProductResponse])
-async def get_menu(restaurant_id: str = Depends(auth.get_current_restaurant_id)):
+async def get_menu(
+    restaurant_id: str = Depends(auth.get_current_restaurant_id),
+    sort: Optional[str] = Query(None, pattern="^popular$", description="'popular': best sellers of the last 30 days first")
+):
     """Get all menu items for current restaurant"""
     products = get_products_by_restaurant(restaurant_id)
+    if sort == "popular":
+        from services.item_analytics_service import get_product_popularity
+        popularity = get_product_popularity(restaurant_id)
+        # Stable sort keeps the usual order among equally popular items
+        products = sorted(products, key=lambda p: -popularity.get(p.id, 0))
     return [product_to_response(p) for p in products]
 
 @router.post("", response_model=ProductResponse, status_code=status.HTTP_201_CREATED)
@@ -161,3 +220,103 @@ async def delete_product(
     return {"message": "Product deleted successfully"}
 
 
+
+def _import_menu(restaurant_id: str, items: List[MenuImportItem]) -> MenuImportResponse:
+    """Validate names are unique and write the whole menu in one batch"""
+    seen = {}
+    for index, item in enumerate(items):
+        key = item.id or item.name.strip().lower()
+        if key in seen:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Item {index + 1} duplicates item {seen[key] + 1} ({item.name})"
+            )
+        seen[key] = index
+    
+    try:
+        result = bulk_upsert_products(restaurant_id, [item.model_dump() for item in items])
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return MenuImportResponse(
+        created=len(result['created']),
+        updated=len(result['updated']),
+        created_ids=result['created'],
+        updated_ids=result['updated']
+    )
+
+def _parse_csv_bool(value: Optional[str]) -> Optional[bool]:
+    if value is None or value.strip() == "":
+        return None
+    normalized = value.strip().lower()
+    if normalized in ("true", "yes", "y", "1"):
+        return True
+    if normalized in ("false", "no", "n", "0"):
+        return False
+    raise ValueError(f"invalid boolean '{value}'")
+
+@router.post("/import", response_model=MenuImportResponse)
+async def import_menu(
+    menu: MenuImportRequest,
+    restaurant_id: str = Depends(auth.get_current_restaurant_id)
+):
+    """
+    Create or update many menu items at once (JSON)
+    Items with an id update that product; otherwise they update the product
+    with the same name or are created. All-or-nothing.
+    """
+    return _import_menu(restaurant_id, menu.items)
+
+@router.post("/import/csv", response_model=MenuImportResponse)
+async def import_menu_csv(
+    file: UploadFile = File(..., description="CSV with a header row: name,price,category[,description,is_available,discounted_price,image_url,id]"),
+    restaurant_id: str = Depends(auth.get_current_restaurant_id)
+):
+    """Create or update many menu items at once from a CSV file (same rules as /import)"""
+    try:
+        text = (await file.read()).decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="CSV must be UTF-8 encoded")
+    
+    items = []
+    errors = []
+    for line_number, row in enumerate(csv.DictReader(io.StringIO(text)), start=2):
+        # Blank cells mean "not set"
+        values = {key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()}
+        try:
+            if 'is_available' in values:
+                values['is_available'] = _parse_csv_bool(values['is_available'])
+            items.append(MenuImportItem(**values))
+        except (ValidationError, ValueError) as e:
+            message = "; ".join(
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+            ) if isinstance(e, ValidationError) else str(e)
+            errors.append(f"line {line_number}: {message}")
+        if len(items) > MAX_IMPORT_ITEMS:
+            raise HTTPException(status_code=422, detail=f"At most {MAX_IMPORT_ITEMS} items per import")
+    
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
+    if not items:
+        raise HTTPException(status_code=422, detail="CSV contains no items")
+    return _import_menu(restaurant_id, items)
+
+@router.patch("/bulk", response_model=MenuBulkUpdateResponse)
+async def bulk_update_menu(
+    update: MenuBulkUpdateRequest,
+    restaurant_id: str = Depends(auth.get_current_restaurant_id)
+):
+    """
+    Change availability and/or price of many menu items in one statement,
+    selected by ID list and/or category (e.g. mark a category sold out)
+    """
+    updated_ids = bulk_update_products(
+        restaurant_id,
+        product_ids=update.product_ids,
+        category=update.category,
+        is_available=update.is_available,
+        price=update.price,
+        price_change_percent=update.price_change_percent,
+        discounted_price=update.discounted_price or None,
+        clear_discount=update.discounted_price == 0
+    )
+    return MenuBulkUpdateResponse(updated=len(updated_ids), product_ids=updated_ids)
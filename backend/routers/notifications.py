@@ -1,12 +1,15 @@
 """
 Notifications Router - API endpoints for restaurant notifications
 """
-from fastapi import APIRouter, HTTPException, Depends, Query
+import base64
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from repositories.notification_repo import (
     get_notifications_by_restaurant,
-    get_notification_by_order_id
+    get_notification_by_order_id,
+    get_notification_stats as count_notifications
 )
 import auth
 
@@ -27,43 +30,65 @@ class NotificationResponse(BaseModel):
     created_at: Optional[str] = None
     updated_at: Optional[str] = None
 
+def encode_cursor(notification) -> str:
+    """Opaque pagination cursor pointing after a notification"""
+    raw = f"{notification.created_at}|{notification.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Decode a cursor from encode_cursor into (created_at, id)"""
+    try:
+        created_at, notification_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|", 1)
+        return datetime.fromisoformat(created_at), notification_id
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def notification_to_response(n) -> NotificationResponse:
+    return NotificationResponse(
+        id=n.id,
+        restaurant_id=n.restaurant_id,
+        order_id=n.order_id,
+        notification_type=n.notification_type,
+        notification_event=n.notification_event,
+        recipient=n.recipient,
+        message_body=n.message_body,
+        status=n.status,
+        button_clicked=n.button_clicked,
+        clicked_at=n.clicked_at,
+        error_message=n.error_message,
+        created_at=n.created_at,
+        updated_at=n.updated_at
+    )
+
 @router.get("", response_model=List[NotificationResponse])
 async def get_notifications(
+    response: Response,
     restaurant_id: str = Depends(auth.get_current_restaurant_id),
     limit: int = Query(100, ge=1, le=1000),
     event: Optional[str] = Query(None, description="Filter by event type"),
-    status: Optional[str] = Query(None, description="Filter by status")
+    status: Optional[str] = Query(None, description="Filter by status"),
+    since: Optional[datetime] = Query(None, description="Only notifications created at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only notifications created before this time"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page")
 ):
-    """Get all notifications for current restaurant"""
+    """
+    Get notifications for current restaurant, newest first
+    When more results exist, the X-Next-Cursor response header holds the
+    cursor for the next page.
+    """
+    before = decode_cursor(cursor) if cursor else None
     try:
-        notifications = get_notifications_by_restaurant(restaurant_id, limit=limit)
-        
-        # Apply filters
-        if event:
-            notifications = [n for n in notifications if n.notification_event == event]
-        if status:
-            notifications = [n for n in notifications if n.status == status]
-        
-        return [
-            NotificationResponse(
-                id=n.id,
-                restaurant_id=n.restaurant_id,
-                order_id=n.order_id,
-                notification_type=n.notification_type,
-                notification_event=n.notification_event,
-                recipient=n.recipient,
-                message_body=n.message_body,
-                status=n.status,
-                button_clicked=n.button_clicked,
-                clicked_at=n.clicked_at,
-                error_message=n.error_message,
-                created_at=n.created_at,
-                updated_at=n.updated_at
-            )
-            for n in notifications
-        ]
+        notifications = get_notifications_by_restaurant(
+            restaurant_id, limit=limit, event=event, status=status,
+            since=since, until=until, before=before
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    if len(notifications) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(notifications[-1])
+    
+    return [notification_to_response(n) for n in notifications]
 
 @router.get("/order/{order_id}", response_model=NotificationResponse)
 async def get_notification_by_order(
@@ -80,21 +105,7 @@ async def get_notification_by_order(
         if notification.restaurant_id != restaurant_id:
             raise HTTPException(status_code=403, detail="Not authorized to view this notification")
         
-        return NotificationResponse(
-            id=notification.id,
-            restaurant_id=notification.restaurant_id,
-            order_id=notification.order_id,
-            notification_type=notification.notification_type,
-            notification_event=notification.notification_event,
-            recipient=notification.recipient,
-            message_body=notification.message_body,
-            status=notification.status,
-            button_clicked=notification.button_clicked,
-            clicked_at=notification.clicked_at,
-            error_message=notification.error_message,
-            created_at=notification.created_at,
-            updated_at=notification.updated_at
-        )
+        return notification_to_response(notification)
     except HTTPException:
         raise
     except Exception as e:
@@ -102,24 +113,12 @@ async def get_notification_by_order(
 
 @router.get("/stats", response_model=dict)
 async def get_notification_stats(
-    restaurant_id: str = Depends(auth.get_current_restaurant_id)
+    restaurant_id: str = Depends(auth.get_current_restaurant_id),
+    since: Optional[datetime] = Query(None, description="Only notifications created at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only notifications created before this time")
 ):
-    """Get notification statistics for current restaurant"""
+    """Get notification statistics for current restaurant (all history unless a window is given)"""
     try:
-        notifications = get_notifications_by_restaurant(restaurant_id, limit=1000)
-        
-        total = len(notifications)
-        delivered = len([n for n in notifications if n.status == "delivered"])
-        failed = len([n for n in notifications if n.status == "failed"])
-        pending = len([n for n in notifications if n.status in ["pending", "sent"]])
-        clicked = len([n for n in notifications if n.button_clicked is not None])
-        
-        return {
-            "total": total,
-            "delivered": delivered,
-            "failed": failed,
-            "pending": pending,
-            "clicked": clicked
-        }
+        return count_notifications(restaurant_id, since=since, until=until)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -2,14 +2,23 @@
 Orders Router - API endpoints for orders
 """
 from fastapi import APIRouter, HTTPException, Depends, status, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+import csv
+import io
+import json
 from services.order_service import (
     create_new_order,
     get_restaurant_orders,
     update_order_status_safe
 )
-from repositories.order_repo import get_order_by_id
+from repositories.order_repo import (
+    get_order_by_id, get_order_status_counts, get_orders_changed_since,
+    iter_orders_for_export, EXPORT_COLUMNS
+)
 import auth
 import logging
 
@@ -45,6 +54,7 @@ class OrderResponse(BaseModel):
     customer_rating: Optional[float] = None  # Rating given by customer (1-5)
     payment_link: Optional[str] = None  # UPI payment link or Razorpay payment link
     razorpay_payment_link_id: Optional[str] = None  # Razorpay payment link ID for status polling
+    delivery_person_id: Optional[str] = None  # Rider assigned by dispatch (delivery orders)
 
 class OrderStatusUpdate(BaseModel):
     status: str
@@ -102,7 +112,11 @@ def generate_upi_payment_link(restaurant, order) -> Optional[str]:
     return upi_link
 
 def order_to_response(order, restaurant=None, payment_link_override=None, razorpay_payment_link_id_override=None) -> OrderResponse:
-    """Convert Order model to OrderResponse"""
+    """
+    Convert Order model to OrderResponse
+    Items are passed as dicts: OrderResponse validation builds the nested
+    OrderItemResponse objects itself, faster than constructing them one by one.
+    """
     payment_link = payment_link_override
     if not payment_link and restaurant:
         payment_link = generate_upi_payment_link(restaurant, order)
@@ -114,12 +128,12 @@ def order_to_response(order, restaurant=None, payment_link_override=None, razorp
         customer_id=getattr(order, 'customer_id', None),
         customer_phone=order.customer_phone,
         customer_name=order.customer_name,
-        items=[OrderItemResponse(**{
+        items=[{
             "product_id": item.product_id,
             "product_name": item.product_name,
             "quantity": item.quantity,
             "price": item.price
-        }) for item in order.items],
+        } for item in order.items],
         order_type=getattr(order, 'order_type', None),
         subtotal=getattr(order, 'subtotal', None),
         delivery_fee=getattr(order, 'delivery_fee', None),
@@ -133,6 +147,7 @@ def order_to_response(order, restaurant=None, payment_link_override=None, razorp
         payment_method=getattr(order, 'payment_method', 'cod'),
         customer_upi_name=getattr(order, 'customer_upi_name', None),
         customer_rating=getattr(order, 'customer_rating', None),
+        delivery_person_id=getattr(order, 'delivery_person_id', None),
         payment_link=payment_link,
         razorpay_payment_link_id=razorpay_payment_link_id_override  # Will be set by caller if needed
     )
@@ -142,25 +157,153 @@ async def get_orders(
     restaurant_id: str = Depends(auth.get_current_restaurant_id),
     status: Optional[str] = Query(None, description="Filter by status"),
     limit: Optional[int] = Query(None, ge=1, description="Number of results"),
-    offset: Optional[int] = Query(None, ge=0, description="Pagination offset")
+    offset: Optional[int] = Query(None, ge=0, description="Pagination offset"),
+    since: Optional[datetime] = Query(None, description="Only orders created at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only orders created before this time")
 ):
-    """Get all orders for current restaurant"""
+    """Get orders for current restaurant, newest first"""
     from repositories.restaurant_repo import get_restaurant_by_id
-    orders = get_restaurant_orders(restaurant_id)
-    
-    # Filter by status if provided
-    if status:
-        orders = [o for o in orders if o.status == status]
-    
-    # Apply pagination if provided
-    if offset is not None:
-        orders = orders[offset:]
-    if limit is not None:
-        orders = orders[:limit]
+    orders = get_restaurant_orders(
+        restaurant_id, status=status, since=since, until=until, limit=limit, offset=offset
+    )
     
     restaurant = get_restaurant_by_id(restaurant_id)
     return [order_to_response(o, restaurant) for o in orders]
 
+# Rows buffered per chunk written to the export response
+EXPORT_CHUNK_ROWS = 500
+
+def _export_value(value):
+    """JSON/CSV friendly value of an exported column"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+def _export_csv(rows):
+    """CSV chunks: one line per order, items summarised in one column"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(list(EXPORT_COLUMNS) + ["item_count", "items"])
+    for i, row in enumerate(rows, start=1):
+        items = row['items']
+        writer.writerow(
+            [_export_value(row[name]) for name in EXPORT_COLUMNS] +
+            [sum(item['quantity'] for item in items),
+             "; ".join(f"{item['quantity']} x {item['product_name']} @ {item['price']}" for item in items)]
+        )
+        if i % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def _export_ndjson(rows):
+    """NDJSON chunks: one JSON object per order, with its items"""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({name: _export_value(value) for name, value in row.items()}))
+        if len(lines) == EXPORT_CHUNK_ROWS:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+@router.get("/export")
+async def export_orders(
+    restaurant_id: str = Depends(auth.get_current_restaurant_id),
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="csv or ndjson"),
+    status: Optional[str] = Query(None, description="Filter by status"),
+    since: Optional[datetime] = Query(None, description="Only orders created at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only orders created before this time")
+):
+    """
+    Export orders of current restaurant (including archived ones), oldest first
+    Rows are streamed from a server-side cursor, so memory use does not grow
+    with the size of the export.
+    """
+    rows = iter_orders_for_export(restaurant_id, since=since, until=until, status=status)
+    if format == "ndjson":
+        body, media_type = _export_ndjson(rows), "application/x-ndjson"
+    else:
+        body, media_type = _export_csv(rows), "text/csv"
+    filename = f"orders-{restaurant_id}-{datetime.now().strftime('%Y%m%d%H%M%S')}.{format}"
+    return StreamingResponse(
+        body, media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+# Most orders returned by one /changes call; beyond that the client reloads /orders
+MAX_CHANGED_ORDERS = 500
+
+# updated_at is set when a write transaction starts, so a write committed after
+# a poll can carry an earlier timestamp. The watermark is therefore placed
+# before the start of the oldest writing transaction still running (up to
+# CHANGES_MAX_WRITE_SECONDS back, see get_orders_changed_since) and trails that
+# point by this margin; orders re-sent by the next poll are merged by id by the
+# clients.
+CHANGES_WATERMARK_LAG_SECONDS = 5
+
+# Statuses counted in the change stats (orders the kitchen still works on)
+ACTIVE_ORDER_STATUSES = ("pending", "preparing", "ready")
+
+class OrderChangesStats(BaseModel):
+    pending_orders: int
+    preparing_orders: int
+    ready_orders: int
+    today_orders: int
+    today_revenue: float
+
+class OrderChangesResponse(BaseModel):
+    orders: List[OrderResponse]
+    watermark: datetime  # Pass as `since` on the next poll
+    full_reload: bool  # More orders changed than returned: reload GET /api/v1/orders
+    stats: Optional[OrderChangesStats] = None  # Only when orders changed
+
+@router.get("/changes", response_model=OrderChangesResponse)
+async def get_order_changes(
+    restaurant_id: str = Depends(auth.get_current_restaurant_id),
+    since: Optional[datetime] = Query(None, description="Watermark from the previous call (omit on the first call)")
+):
+    """
+    Orders of current restaurant created or updated since the last poll
+    The first call (without since) only returns a watermark; load the order
+    list with GET /api/v1/orders, then poll this endpoint with the watermark.
+    An order can be returned by two consecutive polls, merge by id.
+    """
+    from repositories.restaurant_repo import get_restaurant_by_id
+    orders, db_now, complete_until, has_more = get_orders_changed_since(
+        restaurant_id, since, limit=MAX_CHANGED_ORDERS
+    )
+    
+    watermark = complete_until - timedelta(seconds=CHANGES_WATERMARK_LAG_SECONDS)
+    if since is not None:
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        watermark = max(watermark, since)
+    
+    stats = None
+    if orders:
+        active = get_order_status_counts(restaurant_id, statuses=ACTIVE_ORDER_STATUSES)
+        today_start = db_now.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        today = get_order_status_counts(restaurant_id, since=today_start, until=today_start + timedelta(days=1))
+        stats = OrderChangesStats(
+            pending_orders=active.get("pending", {}).get('count', 0),
+            preparing_orders=active.get("preparing", {}).get('count', 0),
+            ready_orders=active.get("ready", {}).get('count', 0),
+            today_orders=sum(c['count'] for c in today.values()),
+            today_revenue=today.get("delivered", {}).get('revenue', 0.0)
+        )
+    
+    restaurant = get_restaurant_by_id(restaurant_id) if orders else None
+    return OrderChangesResponse(
+        orders=[order_to_response(o, restaurant) for o in orders],
+        watermark=watermark,
+        full_reload=has_more,
+        stats=stats
+    )
+
 @router.get("/{order_id}", response_model=OrderResponse)
 async def get_order(
     order_id: str,
@@ -319,6 +462,9 @@ async def create_order(order_data: OrderCreate):
                     if razorpay_link:
                         payment_link = razorpay_link.get("short_url")
                         razorpay_payment_link_id = razorpay_link.get("id")
+                        # Status polls are answered from this local state
+                        from services.payment_link_service import apply_payment_link_entity
+                        apply_payment_link_entity(razorpay_link, restaurant_id=restaurant.id)
                         logger.info(f"✅ Razorpay payment link created: {payment_link}")
             except Exception as e:
                 logger.warning(f"⚠️ Razorpay not available, falling back to UPI link: {e}")
@@ -1,31 +1,126 @@
 """
 Payment Router - Razorpay webhook and payment endpoints
 """
-from fastapi import APIRouter, HTTPException, Request, Header
+from fastapi import APIRouter, HTTPException, Request, Header, Query
 from pydantic import BaseModel
 from typing import Optional
 import logging
 import json
 
-from services.payment_service import verify_razorpay_webhook_signature, get_payment_status
+from services.payment_service import verify_razorpay_webhook_signature
+from services.payment_link_service import (
+    apply_payment_link_entity, wait_for_payment_link_status, PAYMENT_STATUS_MAX_WAIT_SECONDS
+)
 from repositories.order_repo import get_order_by_id, update_order
 from services.whatsapp_service import send_whatsapp_message, format_phone_number
 from repositories.restaurant_repo import get_restaurant_by_id
+from repositories.webhook_event_repo import (
+    claim_webhook_event, release_webhook_event, WEBHOOK_SOURCE_RAZORPAY
+)
+from services.webhook_queue_service import enqueue_webhook, queue_mode_enabled, register_webhook_handler
 from datetime import datetime
 
 router = APIRouter(prefix="/api/v1/payments", tags=["payments"])
 logger = logging.getLogger(__name__)
 
 
+async def process_razorpay_event(webhook_data: dict) -> dict:
+    """
+    Process a (verified) Razorpay webhook event
+    Called by the webhook endpoint, or by a webhook worker in queued ingestion mode
+    """
+    # Keep the local payment link state current (read by the status endpoint)
+    if webhook_data.get("event", "").startswith("payment_link."):
+        link_entity = webhook_data.get("payload", {}).get("payment_link", {}).get("entity", {})
+        apply_payment_link_entity(link_entity)
+
+    # Handle payment.paid event
+    if webhook_data.get("event") == "payment_link.paid":
+        payment_link_data = webhook_data.get("payload", {}).get("payment_link", {}).get("entity", {})
+        payment_link_id = payment_link_data.get("id")
+        order_id = payment_link_data.get("notes", {}).get("order_id")
+
+        if not order_id:
+            logger.error("❌ Order ID not found in webhook payload")
+            raise HTTPException(status_code=400, detail="Order ID not found")
+
+        logger.info(f"✅ Payment received for order {order_id}, payment link: {payment_link_id}")
+
+        # Get order
+        order = get_order_by_id(order_id)
+        if not order:
+            logger.error(f"Order {order_id} not found")
+            raise HTTPException(status_code=404, detail="Order not found")
+
+        # Update order payment status
+        order.payment_status = "verified"
+        order.updated_at = datetime.now().isoformat()
+
+        # Save updated order
+        updated_order = update_order(order)
+
+        if not updated_order:
+            logger.error(f"Failed to update order {order_id}")
+            raise HTTPException(status_code=500, detail="Failed to update order")
+
+        # Send WhatsApp confirmation to customer
+        try:
+            customer_phone = format_phone_number(order.customer_phone)
+            confirmation_message = (
+                f"✅ *Payment Confirmed!*\n\n"
+                f"Hi {order.customer_name}!\n\n"
+                f"Payment of ₹{order.total_amount:.0f} for order *#{order.id[:8]}* has been confirmed.\n\n"
+                f"Your order is now being processed! 🍽️\n\n"
+                f"We'll notify you when we start preparing your order."
+            )
+            await send_whatsapp_message(customer_phone, confirmation_message)
+            logger.info(f"✅ Payment confirmation sent to {customer_phone} for order {order.id}")
+        except Exception as e:
+            logger.error(f"❌ Failed to send payment confirmation: {e}")
+
+        # Send notification to restaurant owner
+        try:
+            from services.whatsapp_service import send_restaurant_order_notification
+            await send_restaurant_order_notification(updated_order, "payment_received")
+        except Exception as e:
+            logger.error(f"❌ Failed to send restaurant notification: {e}")
+
+        return {"status": "success", "message": "Payment verified and order updated"}
+
+    # Handle other events (payment failed, etc.)
+    elif webhook_data.get("event") == "payment_link.cancelled":
+        payment_link_data = webhook_data.get("payload", {}).get("payment_link", {}).get("entity", {})
+        order_id = payment_link_data.get("notes", {}).get("order_id")
+
+        if order_id:
+            order = get_order_by_id(order_id)
+            if order:
+                order.payment_status = "failed"
+                order.updated_at = datetime.now().isoformat()
+                update_order(order)
+                logger.info(f"Payment cancelled for order {order_id}")
+
+    return {"status": "received"}
+
+
+register_webhook_handler("razorpay_event", process_razorpay_event)
+
+
 @router.post("/razorpay/webhook")
 async def razorpay_webhook(
     request: Request,
-    x_razorpay_signature: Optional[str] = Header(None, alias="X-Razorpay-Signature")
+    x_razorpay_signature: Optional[str] = Header(None, alias="X-Razorpay-Signature"),
+    x_razorpay_event_id: Optional[str] = Header(None, alias="X-Razorpay-Event-Id")
 ):
     """
     Razorpay webhook endpoint for automatic payment verification
     This is called automatically by Razorpay when payment is made
+    Deliveries are deduplicated by event ID (retries are acknowledged without
+    processing); a failed delivery is released again so Razorpay's retry runs.
+    With WEBHOOK_INGESTION_MODE=queue the verified event is stored and
+    processed by a webhook worker after responding.
     """
+    claimed_event_id = None
     try:
         # Get raw request body
         body = await request.body()
@@ -40,101 +135,56 @@ async def razorpay_webhook(
                 logger.error("❌ Invalid webhook signature")
                 raise HTTPException(status_code=400, detail="Invalid webhook signature")
         
-        # Handle payment.paid event
-        if webhook_data.get("event") == "payment_link.paid":
-            payment_link_data = webhook_data.get("payload", {}).get("payment_link", {}).get("entity", {})
-            payment_link_id = payment_link_data.get("id")
-            order_id = payment_link_data.get("notes", {}).get("order_id")
-            
-            if not order_id:
-                logger.error("❌ Order ID not found in webhook payload")
-                raise HTTPException(status_code=400, detail="Order ID not found")
-            
-            logger.info(f"✅ Payment received for order {order_id}, payment link: {payment_link_id}")
-            
-            # Get order
-            order = get_order_by_id(order_id)
-            if not order:
-                logger.error(f"Order {order_id} not found")
-                raise HTTPException(status_code=404, detail="Order not found")
-            
-            # Update order payment status
-            order.payment_status = "verified"
-            order.updated_at = datetime.now().isoformat()
-            
-            # Save updated order
-            updated_order = update_order(order)
-            
-            if not updated_order:
-                logger.error(f"Failed to update order {order_id}")
-                raise HTTPException(status_code=500, detail="Failed to update order")
-            
-            # Send WhatsApp confirmation to customer
-            try:
-                customer_phone = format_phone_number(order.customer_phone)
-                confirmation_message = (
-                    f"✅ *Payment Confirmed!*\n\n"
-                    f"Hi {order.customer_name}!\n\n"
-                    f"Payment of ₹{order.total_amount:.0f} for order *#{order.id[:8]}* has been confirmed.\n\n"
-                    f"Your order is now being processed! 🍽️\n\n"
-                    f"We'll notify you when we start preparing your order."
-                )
-                await send_whatsapp_message(customer_phone, confirmation_message)
-                logger.info(f"✅ Payment confirmation sent to {customer_phone} for order {order.id}")
-            except Exception as e:
-                logger.error(f"❌ Failed to send payment confirmation: {e}")
-            
-            # Send notification to restaurant owner
-            try:
-                from services.whatsapp_service import send_restaurant_order_notification
-                await send_restaurant_order_notification(updated_order, "payment_received")
-            except Exception as e:
-                logger.error(f"❌ Failed to send restaurant notification: {e}")
-            
-            return {"status": "success", "message": "Payment verified and order updated"}
+        if queue_mode_enabled():
+            link_entity = webhook_data.get("payload", {}).get("payment_link", {}).get("entity", {})
+            ordering_key = (link_entity.get("notes") or {}).get("order_id") or link_entity.get("id")
+            if not enqueue_webhook(WEBHOOK_SOURCE_RAZORPAY, x_razorpay_event_id, "razorpay_event",
+                                   webhook_data, ordering_key=ordering_key):
+                logger.info(f"⏭️ Duplicate Razorpay webhook {x_razorpay_event_id}, already received")
+                return {"status": "duplicate"}
+            return {"status": "queued"}
         
-        # Handle other events (payment failed, etc.)
-        elif webhook_data.get("event") == "payment_link.cancelled":
-            payment_link_data = webhook_data.get("payload", {}).get("payment_link", {}).get("entity", {})
-            order_id = payment_link_data.get("notes", {}).get("order_id")
-            
-            if order_id:
-                order = get_order_by_id(order_id)
-                if order:
-                    order.payment_status = "failed"
-                    order.updated_at = datetime.now().isoformat()
-                    update_order(order)
-                    logger.info(f"Payment cancelled for order {order_id}")
+        if x_razorpay_event_id:
+            if not claim_webhook_event(WEBHOOK_SOURCE_RAZORPAY, x_razorpay_event_id):
+                logger.info(f"⏭️ Duplicate Razorpay webhook {x_razorpay_event_id}, already processed")
+                return {"status": "duplicate"}
+            claimed_event_id = x_razorpay_event_id
         
-        return {"status": "received"}
+        return await process_razorpay_event(webhook_data)
         
     except Exception as e:
         logger.error(f"❌ Error processing Razorpay webhook: {e}", exc_info=True)
+        if claimed_event_id:
+            release_webhook_event(WEBHOOK_SOURCE_RAZORPAY, claimed_event_id)
         raise HTTPException(status_code=500, detail=f"Webhook processing failed: {str(e)}")
 
 
 @router.get("/status/{payment_link_id}")
-async def get_payment_link_status(payment_link_id: str):
+async def get_payment_link_status(
+    payment_link_id: str,
+    wait: int = Query(0, ge=0, le=PAYMENT_STATUS_MAX_WAIT_SECONDS,
+                      description="Long-poll: seconds to wait for a status change"),
+    status: Optional[str] = Query(None, description="Status the client already has (with wait)")
+):
     """
     Get payment status for a Razorpay payment link
-    Used by frontend to poll payment status
+    Used by frontend to poll payment status. Served from the local payment link
+    state (services/payment_link_service.py); with wait the request is held
+    until the status changes.
     """
     try:
-        payment_status = get_payment_status(payment_link_id)
-        
-        if not payment_status:
-            raise HTTPException(status_code=404, detail="Payment link not found")
-        
-        # Extract order ID from notes
-        order_id = payment_status.get("notes", {}).get("order_id")
-        
-        return {
-            "payment_link_id": payment_link_id,
-            "status": payment_status.get("status"),  # "created", "paid", "cancelled", etc.
-            "amount": payment_status.get("amount") / 100 if payment_status.get("amount") else 0,  # Convert from paise
-            "order_id": order_id,
-            "paid_at": payment_status.get("paid_at")
-        }
+        payment_status = await wait_for_payment_link_status(payment_link_id, wait, current_status=status)
     except Exception as e:
         logger.error(f"❌ Error fetching payment status: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    
+    if not payment_status:
+        raise HTTPException(status_code=404, detail="Payment link not found")
+    
+    return {
+        "payment_link_id": payment_link_id,
+        "status": payment_status['status'],  # "created", "paid", "cancelled", etc.
+        "amount": payment_status['amount'],
+        "order_id": payment_status['order_id'],
+        "paid_at": payment_status['paid_at']
+    }
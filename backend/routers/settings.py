@@ -402,6 +402,10 @@ async def update_profile_settings(
     finally:
         db.close()
 
+    # Location may have changed - rebuild the search index
+    from geo_index import restaurant_geo_index
+    restaurant_geo_index.invalidate()
+
     # Update settings (business details)
     existing_settings = get_settings_by_restaurant_id(restaurant_id)
     if existing_settings:
@@ -5,8 +5,10 @@ Backend identifies restaurant based on first WhatsApp message
 """
 from fastapi import APIRouter, HTTPException, Form
 from pydantic import BaseModel
-from typing import Optional
-from repositories.restaurant_repo import get_restaurant_by_id, get_all_restaurants
+from typing import List, Optional
+from repositories.restaurant_repo import get_restaurant_by_id
+from repositories.webhook_event_repo import claim_webhook_event, WEBHOOK_SOURCE_TWILIO
+from services.webhook_queue_service import enqueue_webhook, queue_mode_enabled, register_webhook_handler
 import logging
 
 # Import actual WhatsApp service function
@@ -54,52 +56,21 @@ def normalize_phone_number(phone: str) -> str:
         phone = "91" + phone
     return phone
 
-def format_menu_message(restaurant) -> str:
+def format_menu_messages(restaurant) -> List[str]:
     """
-    Format restaurant menu as WhatsApp message
+    Format restaurant menu as one or more WhatsApp messages
     restaurant can be either a Restaurant model object or dict
+    Served from the per-restaurant cache (services/menu_message_service.py).
     """
-    from repositories.product_repo import get_products_by_restaurant
-    
-    # Get menu items for the restaurant
-    menu_items = get_products_by_restaurant(restaurant.id)
-    
-    # Get restaurant name and UPI ID
-    restaurant_name = restaurant.name if hasattr(restaurant, 'name') else restaurant.get('name', 'Restaurant')
-    upi_id = restaurant.upi_id if hasattr(restaurant, 'upi_id') else restaurant.get('upi_id', '')
-    
-    if not menu_items:
-        return f"*{restaurant_name}*\n\nSorry, no menu items available at the moment."
-    
-    message = f"🍽️ *{restaurant_name} - Menu*\n\n"
-    message += "━━━━━━━━━━━━━━━━\n\n"
-    
-    for idx, item in enumerate(menu_items, 1):
-        if item.is_available:
-            message += f"{idx}. *{item.name}*\n"
-            message += f"   {item.description}\n"
-            message += f"   💰 ₹{item.price:.0f}\n\n"
-    
-    message += "━━━━━━━━━━━━━━━━\n"
-    message += "💬 *How to Order:*\n"
-    message += "Reply with the item number or name\n"
-    message += "Example: '1' or 'Margherita Pizza'\n\n"
-    
-    # Add UPI info if available
-    if upi_id:
-        message += f"💳 *Payment:* Send amount to {upi_id}\n\n"
-    
-    message += "Thank you for choosing us! 🙏"
-    
-    return message
+    from services.menu_message_service import get_menu_messages
+    return get_menu_messages(restaurant)
 
 async def process_restaurant_owner_command(from_number: str, body: str) -> Optional[dict]:
     """
     Process command from restaurant owner (e.g., "ACCEPT order_123", "PREPARE order_123")
     Returns dict with status if processed, None if not a restaurant command
     """
-    from repositories.restaurant_repo import get_all_restaurants
-    from repositories.settings_repo import get_settings_by_restaurant_id
+    from repositories.restaurant_repo import get_restaurant_by_owner_phone
     from repositories.order_repo import get_order_by_id
     from services.order_service import update_order_status_safe
     from services.whatsapp_service import format_phone_number
@@ -108,22 +79,8 @@ async def process_restaurant_owner_command(from_number: str, body: str) -> Optio
     # Normalize sender phone
     sender_phone = format_phone_number(from_number)
     
-    # Check if sender is a restaurant owner
-    restaurants = get_all_restaurants()
-    restaurant = None
-    
-    for r in restaurants:
-        # Check restaurant phone
-        if format_phone_number(r.phone) == sender_phone:
-            restaurant = r
-            break
-        
-        # Check settings WhatsApp number
-        settings = get_settings_by_restaurant_id(r.id)
-        if settings and settings.whatsapp_number:
-            if format_phone_number(settings.whatsapp_number) == sender_phone:
-                restaurant = r
-                break
+    # Check if sender is a restaurant owner (restaurant phone or settings WhatsApp number)
+    restaurant = get_restaurant_by_owner_phone(from_number)
     
     if not restaurant:
         return None  # Not a restaurant owner
@@ -147,12 +104,8 @@ async def process_restaurant_owner_command(from_number: str, body: str) -> Optio
                 potential_id = parts[1]
                 
                 # Try to find order by short ID (first 8 chars)
-                from repositories.order_repo import get_orders_by_restaurant
-                orders = get_orders_by_restaurant(restaurant.id)
-                for order in orders:
-                    if order.id.startswith(potential_id) or order.id == potential_id:
-                        order_id = order.id
-                        break
+                from repositories.order_repo import find_order_id_by_prefix
+                order_id = find_order_id_by_prefix(restaurant.id, potential_id)
             break
     
     if not command or not order_id:
@@ -371,8 +324,8 @@ async def process_whatsapp_message(from_number: str, to_number: str, body: str):
             logger.info(f"✅ Restaurant identified: {restaurant.name} (ID: {restaurant_id})")
             
             # Format and send welcome message with menu
-            menu_message = format_menu_message(restaurant)
-            await send_whatsapp_message(from_number, menu_message)
+            for menu_message in format_menu_messages(restaurant):
+                await send_whatsapp_message(from_number, menu_message)
             
             logger.info(f"✅ Menu sent to {customer_phone} for restaurant {restaurant.name}")
             
@@ -408,8 +361,8 @@ async def process_whatsapp_message(from_number: str, to_number: str, body: str):
             
             # Check if it's a greeting or menu request
             if body_lower in ["hi", "hello", "hey", "menu", "show menu"]:
-                menu_message = format_menu_message(restaurant)
-                await send_whatsapp_message(from_number, menu_message)
+                for menu_message in format_menu_messages(restaurant):
+                    await send_whatsapp_message(from_number, menu_message)
                 logger.info(f"✅ Menu resent to {customer_phone}")
             else:
                 # Acknowledge the message (order processing will be implemented later)
@@ -437,6 +390,30 @@ async def process_whatsapp_message(from_number: str, to_number: str, body: str):
             "message": f"Error processing message: {str(e)}"
         }
 
+async def process_queued_whatsapp_message(message: dict):
+    """Queued webhook message (WEBHOOK_INGESTION_MODE=queue)"""
+    await process_whatsapp_message(message["From"], message["To"], message["Body"])
+
+register_webhook_handler("whatsapp_message", process_queued_whatsapp_message)
+
+def accept_whatsapp_message(from_number: str, to_number: str, body: str,
+                            message_sid: Optional[str]) -> Optional[dict]:
+    """
+    Deduplicate (and in queued ingestion mode, enqueue) an incoming message
+    Returns: the response for Twilio if the message must not be processed now
+    """
+    if queue_mode_enabled():
+        message = {"From": from_number, "To": to_number, "Body": body}
+        if not enqueue_webhook(WEBHOOK_SOURCE_TWILIO, message_sid, "whatsapp_message", message,
+                               ordering_key=normalize_phone_number(from_number)):
+            logger.info(f"⏭️ Duplicate WhatsApp message {message_sid}, already received")
+            return {"status": "duplicate"}
+        return {"status": "queued"}
+    if message_sid and not claim_webhook_event(WEBHOOK_SOURCE_TWILIO, message_sid):
+        logger.info(f"⏭️ Duplicate WhatsApp message {message_sid}, already processed")
+        return {"status": "duplicate"}
+    return None
+
 @router.post("/whatsapp")
 async def whatsapp_webhook_form(
     From: str = Form(...),
@@ -447,6 +424,7 @@ async def whatsapp_webhook_form(
     """
     WhatsApp webhook handler (Twilio form-encoded format)
     Always returns 200 status to prevent Twilio retries
+    Retried deliveries (same MessageSid) are acknowledged without processing.
     """
     try:
         # Extract phone numbers
@@ -456,6 +434,10 @@ async def whatsapp_webhook_form(
         
         logger.info(f"📥 Webhook received: From={from_number}, To={to_number}, Body='{body}'")
         
+        accepted = accept_whatsapp_message(from_number, to_number, body, MessageSid)
+        if accepted:
+            return accepted
+        
         result = await process_whatsapp_message(from_number, to_number, body)
         
         # Always return 200 status
@@ -474,6 +456,7 @@ async def whatsapp_webhook_json(webhook_data: WhatsAppWebhook):
     """
     WhatsApp webhook handler (JSON format)
     Always returns 200 status to prevent Twilio retries
+    Retried deliveries (same MessageSid) are acknowledged without processing.
     """
     try:
         # Extract phone numbers
@@ -483,6 +466,10 @@ async def whatsapp_webhook_json(webhook_data: WhatsAppWebhook):
         
         logger.info(f"📥 Webhook received (JSON): From={from_number}, To={to_number}, Body='{body}'")
         
+        accepted = accept_whatsapp_message(from_number, to_number, body, webhook_data.MessageSid)
+        if accepted:
+            return accepted
+        
         result = await process_whatsapp_message(from_number, to_number, body)
         
         # Always return 200 status
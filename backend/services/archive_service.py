@@ -0,0 +1,106 @@
+"""
+Archive Service - Retention and archival of old notifications and orders
+Notifications older than NOTIFICATION_RETENTION_DAYS and finished orders
+older than ORDER_RETENTION_DAYS are moved to the *_archive tables in batches,
+keeping the hot tables (and their indexes) bounded. Webhook idempotency
+ledger rows older than WEBHOOK_EVENT_RETENTION_DAYS are deleted (providers
+stop retrying long before that). Archived orders still count
+towards ratings and dashboard totals through restaurant_archived_order_totals,
+archived notifications towards the notification stats through
+restaurant_archived_notification_totals, and single-order lookups read
+through to the archive.
+
+Configuration (environment):
+    NOTIFICATION_RETENTION_DAYS  default 90
+    ORDER_RETENTION_DAYS         default 365
+    WEBHOOK_EVENT_RETENTION_DAYS default 7
+    ARCHIVE_BATCH_SIZE           rows moved per transaction (default 1000)
+    ARCHIVE_INTERVAL_HOURS       how often the in-process job runs (default 24, 0 disables)
+
+Run once from cron instead with: python archive_old_data.py
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_RETENTION_DAYS = int(os.getenv("NOTIFICATION_RETENTION_DAYS", "90"))
+ORDER_RETENTION_DAYS = int(os.getenv("ORDER_RETENTION_DAYS", "365"))
+WEBHOOK_EVENT_RETENTION_DAYS = int(os.getenv("WEBHOOK_EVENT_RETENTION_DAYS", "7"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+ARCHIVE_INTERVAL_HOURS = float(os.getenv("ARCHIVE_INTERVAL_HOURS", "24"))
+
+# Wait after startup before the first run so deploys are not slowed down
+ARCHIVE_STARTUP_DELAY_SECONDS = 600
+
+# pg advisory lock key so only one worker/process archives at a time
+ARCHIVE_LOCK_KEY = 72034001
+
+
+def run_archival(now: Optional[datetime] = None,
+                 notification_retention_days: int = NOTIFICATION_RETENTION_DAYS,
+                 order_retention_days: int = ORDER_RETENTION_DAYS,
+                 batch_size: int = ARCHIVE_BATCH_SIZE,
+                 webhook_event_retention_days: int = WEBHOOK_EVENT_RETENTION_DAYS) -> Dict:
+    """
+    Archive everything past the retention horizons
+    Returns: {'notifications': moved, 'orders': moved, 'webhook_events': deleted, 'skipped': bool}
+    skipped is True when another process holds the archive lock.
+    """
+    from database import engine
+    from repositories.archive_repo import archive_notifications_batch, archive_orders_batch
+    from repositories.webhook_event_repo import purge_webhook_events_batch
+
+    now = now or datetime.now()
+    result = {'notifications': 0, 'orders': 0, 'webhook_events': 0, 'skipped': False}
+
+    with engine.connect() as lock_conn:
+        if not lock_conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": ARCHIVE_LOCK_KEY}).scalar():
+            result['skipped'] = True
+            return result
+        try:
+            notification_cutoff = now - timedelta(days=notification_retention_days)
+            while True:
+                moved = archive_notifications_batch(notification_cutoff, batch_size)
+                result['notifications'] += moved
+                if moved < batch_size:
+                    break
+
+            order_cutoff = now - timedelta(days=order_retention_days)
+            while True:
+                moved = archive_orders_batch(order_cutoff, batch_size)
+                result['orders'] += moved
+                if moved < batch_size:
+                    break
+
+            webhook_event_cutoff = now - timedelta(days=webhook_event_retention_days)
+            while True:
+                deleted = purge_webhook_events_batch(webhook_event_cutoff, batch_size)
+                result['webhook_events'] += deleted
+                if deleted < batch_size:
+                    break
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ARCHIVE_LOCK_KEY})
+
+    if result['notifications'] or result['orders'] or result['webhook_events']:
+        logger.info(
+            f"🗄️ Archived {result['notifications']} notifications and {result['orders']} orders, "
+            f"deleted {result['webhook_events']} webhook events"
+        )
+    return result
+
+
+async def run_periodically(interval_hours: float = ARCHIVE_INTERVAL_HOURS):
+    """Run the archival job every interval_hours until cancelled"""
+    await asyncio.sleep(ARCHIVE_STARTUP_DELAY_SECONDS)
+    while True:
+        try:
+            await asyncio.to_thread(run_archival)
+        except Exception as e:
+            logger.error(f"Archival run failed: {e}", exc_info=True)
+        await asyncio.sleep(interval_hours * 3600)
@@ -4,22 +4,29 @@ Authentication Service - Business logic for authentication
 from typing import Optional
 from models.user import User
 from models.restaurant import Restaurant
-from repositories.user_repo import get_user_by_email, get_user_by_id
+from repositories.user_repo import get_user_by_email, get_user_by_id, update_user_password
 from repositories.restaurant_repo import get_restaurant_by_id
+from services.password_service import password_hasher
 
-def authenticate_user(email: str, password: str) -> Optional[User]:
+async def authenticate_user(email: str, password: str) -> Optional[User]:
     """
     Authenticate user with email and password
     Business logic: Validate credentials
+    Password checks run in the hashing pool. Plain-text passwords from older
+    accounts (or hashes at an old work factor) are rehashed on successful login.
     """
     user = get_user_by_email(email)
     
-    if not user:
+    if not user or not user.is_active:
         return None
     
-    if user.password != password:
+    if not await password_hasher.verify(password, user.password):
         return None
     
+    if password_hasher.needs_rehash(user.password):
+        user.password = await password_hasher.hash(password)
+        update_user_password(user.id, user.password)
+    
     # Verify restaurant is active
     restaurant = get_restaurant_by_id(user.restaurant_id)
     if not restaurant or not restaurant.is_active:
@@ -0,0 +1,284 @@
+"""
+Dispatch Service - Matches available delivery persons (riders) to ready orders
+Riders are kept in an in-memory grid index updated from location pings, so
+finding the nearest riders to a restaurant never touches the database.
+Assignment itself is a conditional UPDATE (order_repo.assign_delivery_order).
+
+Availability changes and pings only reach the worker that served them, so every
+worker re-reads the available riders from the database every
+RIDER_RELOAD_SECONDS; a rider made available elsewhere is proposed here at
+most that much later.
+"""
+import logging
+import math
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from geo_index import haversine_distance
+
+logger = logging.getLogger(__name__)
+
+# Number of nearest riders proposed for a ready order
+DISPATCH_CANDIDATES = 5
+
+# Riders further than this from the restaurant are never proposed
+DISPATCH_RADIUS_KM = 10.0
+
+# Re-read the available riders from the database at least this often so
+# changes made through other worker processes are picked up
+RIDER_RELOAD_SECONDS = 30.0
+
+# Grid cell size in degrees (~1.1km of latitude)
+CELL_SIZE_DEG = 0.01
+KM_PER_DEG_LAT = 111.195
+
+
+class RiderIndex:
+    """Uniform grid spatial index of rider positions"""
+
+    def __init__(self, cell_size_deg: float = CELL_SIZE_DEG):
+        self._cell_size = cell_size_deg
+        self._cells: Dict[Tuple[int, int], Set[str]] = defaultdict(set)
+        self._positions: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return (math.floor(latitude / self._cell_size), math.floor(longitude / self._cell_size))
+
+    def upsert(self, rider_id: str, latitude: float, longitude: float):
+        """Add a rider or move it to a new position"""
+        cell = self._cell(latitude, longitude)
+        with self._lock:
+            previous = self._positions.get(rider_id)
+            if previous is not None:
+                previous_cell = self._cell(*previous)
+                if previous_cell != cell:
+                    self._discard(previous_cell, rider_id)
+            self._positions[rider_id] = (latitude, longitude)
+            self._cells[cell].add(rider_id)
+
+    def remove(self, rider_id: str):
+        """Remove a rider from the index"""
+        with self._lock:
+            previous = self._positions.pop(rider_id, None)
+            if previous is not None:
+                self._discard(self._cell(*previous), rider_id)
+
+    def _discard(self, cell: Tuple[int, int], rider_id: str):
+        riders = self._cells.get(cell)
+        if riders is not None:
+            riders.discard(rider_id)
+            if not riders:
+                del self._cells[cell]
+
+    def position(self, rider_id: str) -> Optional[Tuple[float, float]]:
+        """Get the indexed position of a rider"""
+        return self._positions.get(rider_id)
+
+    def __contains__(self, rider_id: str) -> bool:
+        return rider_id in self._positions
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def _ring(self, center: Tuple[int, int], radius: int) -> Iterator[Tuple[int, int]]:
+        """Cells at exactly `radius` cells (Chebyshev distance) from center"""
+        ci, cj = center
+        if radius == 0:
+            yield center
+            return
+        for dj in range(-radius, radius + 1):
+            yield (ci - radius, cj + dj)
+            yield (ci + radius, cj + dj)
+        for di in range(-radius + 1, radius):
+            yield (ci + di, cj - radius)
+            yield (ci + di, cj + radius)
+
+    def nearest(self, latitude: float, longitude: float, k: int = DISPATCH_CANDIDATES,
+                max_radius_km: float = DISPATCH_RADIUS_KM) -> List[Tuple[str, float]]:
+        """
+        Find the k nearest riders within max_radius_km
+        Scans rings of cells outwards and stops once no unscanned cell can hold
+        a rider closer than the current k-th best.
+        Returns: [(rider_id, distance_km)] closest first
+        """
+        cell_height_km = self._cell_size * KM_PER_DEG_LAT
+        cell_width_km = cell_height_km * max(math.cos(math.radians(abs(latitude) + max_radius_km / KM_PER_DEG_LAT)), 0.01)
+        min_cell_km = min(cell_height_km, cell_width_km)
+        max_ring = math.ceil(max_radius_km / min_cell_km) + 1
+        center = self._cell(latitude, longitude)
+
+        found: List[Tuple[float, str]] = []
+        with self._lock:
+            for radius in range(max_ring + 1):
+                for cell in self._ring(center, radius):
+                    for rider_id in self._cells.get(cell, ()):
+                        rider_lat, rider_lon = self._positions[rider_id]
+                        distance = haversine_distance(latitude, longitude, rider_lat, rider_lon)
+                        if distance <= max_radius_km:
+                            found.append((distance, rider_id))
+                # Everything outside this ring is at least radius * min_cell_km away
+                if len(found) >= k:
+                    found.sort()
+                    if found[k - 1][0] <= radius * min_cell_km:
+                        break
+
+        found.sort()
+        return [(rider_id, round(distance, 3)) for distance, rider_id in found[:k]]
+
+
+class DeliveryDispatcher:
+    """Keeps the rider index in sync and assigns ready delivery orders"""
+
+    def __init__(self, rider_index: RiderIndex, reload_seconds: float = RIDER_RELOAD_SECONDS):
+        self.riders = rider_index
+        self.reload_seconds = reload_seconds
+        self._available: Set[str] = set()
+        self._loaded_at: Optional[float] = None
+        # rider_id -> monotonic time of the last availability change made on this worker
+        # (one entry per rider, never pruned)
+        self._changed_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self):
+        """Seed the index with available riders from the database, again every reload_seconds"""
+        loaded_at = self._loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at < self.reload_seconds:
+            return
+        # One thread reloads; the others keep matching on the current index
+        if not self._lock.acquire(blocking=loaded_at is None):
+            return
+        try:
+            if self._loaded_at != loaded_at:
+                return
+            if loaded_at is None:
+                self._reload()
+                return
+            try:
+                self._reload()
+            except Exception as e:
+                # Keep matching on the current index; retry after another interval
+                logger.warning(f"🛵 Reloading available riders failed: {e}")
+                self._loaded_at = time.monotonic()
+        finally:
+            self._lock.release()
+
+    def _reload(self):
+        from repositories.delivery_person_repo import get_available_delivery_persons
+        from services.location_service import rider_locations
+
+        started = time.monotonic()
+        persons = {person.id: person for person in get_available_delivery_persons()}
+
+        def changed_here(rider_id: str) -> bool:
+            # A change made on this worker while the query ran is newer than its result
+            return self._changed_at.get(rider_id, 0.0) >= started
+
+        for rider_id in list(self._available - persons.keys()):
+            if not changed_here(rider_id):
+                self._available.discard(rider_id)
+                self.riders.remove(rider_id)
+        for rider_id, person in persons.items():
+            if changed_here(rider_id):
+                continue
+            self._available.add(rider_id)
+            # This worker's live pings are newer than the persisted position
+            latitude, longitude = rider_locations.position(rider_id) or (
+                person.current_latitude, person.current_longitude
+            )
+            self.riders.upsert(rider_id, latitude, longitude)
+
+        first_load = self._loaded_at is None
+        self._loaded_at = time.monotonic()
+        if first_load:
+            logger.info(f"🛵 Dispatcher loaded {len(self.riders)} available riders")
+
+    def update_rider_location(self, rider_id: str, latitude: float, longitude: float):
+        """Record a rider's position; only available riders are indexed for matching"""
+        self._ensure_loaded()
+        if rider_id in self._available:
+            self.riders.upsert(rider_id, latitude, longitude)
+
+    def set_rider_available(self, rider_id: str, is_available: bool,
+                            latitude: Optional[float] = None, longitude: Optional[float] = None):
+        """Add a rider to or remove it from the pool of matchable riders"""
+        self._ensure_loaded()
+        self._changed_at[rider_id] = time.monotonic()
+        if is_available:
+            self._available.add(rider_id)
+            if latitude is not None and longitude is not None:
+                self.riders.upsert(rider_id, latitude, longitude)
+        else:
+            self._available.discard(rider_id)
+            self.riders.remove(rider_id)
+
+    def propose_riders(self, latitude: float, longitude: float,
+                       k: int = DISPATCH_CANDIDATES) -> List[Tuple[str, float]]:
+        """Nearest k available riders to a pickup point"""
+        self._ensure_loaded()
+        return self.riders.nearest(latitude, longitude, k=k)
+
+    def assign(self, order_id: str, rider_id: str) -> str:
+        """
+        Assign an order to a rider with a conditional update
+        Returns the order_repo.assign_delivery_order result
+        """
+        from repositories.order_repo import assign_delivery_order
+        result = assign_delivery_order(order_id, rider_id)
+        if result in ("assigned", "rider_unavailable"):
+            # Either way the rider can no longer take orders
+            self.set_rider_available(rider_id, False)
+        return result
+
+    def dispatch_ready_order(self, order) -> Optional[str]:
+        """
+        Assign a ready delivery order to the nearest available rider
+        Tries the proposed riders closest first; returns the assigned rider ID
+        or None if nobody could take it (riders can still accept it manually).
+        """
+        from repositories.restaurant_repo import get_restaurant_by_id
+        restaurant = get_restaurant_by_id(order.restaurant_id)
+        if not restaurant:
+            return None
+
+        for rider_id, distance in self.propose_riders(restaurant.latitude, restaurant.longitude):
+            result = self.assign(order.id, rider_id)
+            if result == "assigned":
+                logger.info(f"🛵 Order {order.id} assigned to rider {rider_id} ({distance}km away)")
+                return rider_id
+            if result == "order_unavailable":
+                return None
+        logger.info(f"🛵 No rider available for order {order.id}")
+        return None
+
+    def release_rider(self, rider_id: str):
+        """Make a rider available again after finishing a delivery"""
+        from repositories.delivery_person_repo import set_delivery_person_availability
+        set_delivery_person_availability(rider_id, True)
+        from services.location_service import rider_locations
+        position = rider_locations.position(rider_id) or self.riders.position(rider_id)
+        if position is None:
+            from repositories.delivery_person_repo import get_delivery_person_by_id
+            person = get_delivery_person_by_id(rider_id)
+            if person and person.current_latitude is not None:
+                position = (person.current_latitude, person.current_longitude)
+        self.set_rider_available(rider_id, True, *(position or (None, None)))
+
+    def on_order_status_changed(self, order, old_status: str):
+        """Hook called after every order status change"""
+        if order.order_type != "delivery":
+            return
+        try:
+            if order.status == "ready" and old_status != "ready" and not order.delivery_person_id:
+                self.dispatch_ready_order(order)
+            elif order.status in ("delivered", "cancelled") and order.delivery_person_id:
+                self.release_rider(order.delivery_person_id)
+        except Exception as e:
+            # Dispatch must never fail the status update itself
+            logger.error(f"Dispatch failed for order {order.id}: {e}", exc_info=True)
+
+
+# Shared dispatcher for this worker
+dispatcher = DeliveryDispatcher(RiderIndex())
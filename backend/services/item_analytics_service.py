@@ -0,0 +1,52 @@
+"""
+Item Analytics Service - Top-selling items per restaurant
+Aggregates order_items by product over a trailing window of days (see
+order_repo.get_item_sales). Results are cached per restaurant and window and
+dropped whenever one of the restaurant's orders is written, so the menu can
+be sorted by popularity on every page load without touching order_items.
+"""
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+# Cached results also expire so the trailing window keeps moving
+ITEM_ANALYTICS_CACHE_TTL_SECONDS = 300
+
+# Window used to rank menu items by popularity
+POPULARITY_WINDOW_DAYS = 30
+
+# restaurant_id -> {days: (cached_at, items)}
+_item_analytics_cache: Dict[str, Dict[int, Tuple[float, List[Dict]]]] = {}
+
+
+def get_item_analytics(restaurant_id: str, days: int = POPULARITY_WINDOW_DAYS) -> List[Dict]:
+    """
+    Sales per product over the last `days` days, best sellers first
+    Each entry: product_id, product_name, quantity, revenue, orders,
+    last_ordered_at and quantity_share (fraction of all items sold).
+    """
+    cached = _item_analytics_cache.get(restaurant_id, {}).get(days)
+    if cached and time.monotonic() - cached[0] < ITEM_ANALYTICS_CACHE_TTL_SECONDS:
+        return cached[1]
+
+    from repositories.order_repo import get_item_sales
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    items = get_item_sales(restaurant_id, since=since)
+    items.sort(key=lambda item: (-item['quantity'], -item['revenue'], item['product_id']))
+
+    total_quantity = sum(item['quantity'] for item in items)
+    for item in items:
+        item['quantity_share'] = round(item['quantity'] / total_quantity, 4) if total_quantity else 0.0
+
+    _item_analytics_cache.setdefault(restaurant_id, {})[days] = (time.monotonic(), items)
+    return items
+
+
+def get_product_popularity(restaurant_id: str, days: int = POPULARITY_WINDOW_DAYS) -> Dict[str, int]:
+    """product_id -> quantity sold over the last `days` days (unsold products are omitted)"""
+    return {item['product_id']: item['quantity'] for item in get_item_analytics(restaurant_id, days)}
+
+
+def invalidate_item_analytics(restaurant_id: str):
+    """Drop cached item analytics of a restaurant (call when its orders change)"""
+    _item_analytics_cache.pop(restaurant_id, None)
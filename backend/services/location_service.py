@@ -0,0 +1,143 @@
+"""
+Location Service - High-frequency rider location ingestion
+Every ping updates the in-memory position of the rider (and the dispatcher's
+rider index) immediately. Writes to delivery_persons are coalesced: a rider's
+position is only queued for the database once it has moved far enough or has
+not been persisted for a while, and queued positions are flushed together on
+an interval.
+
+Positions are held per worker process; each worker persists what it receives.
+"""
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+from geo_index import haversine_distance
+
+logger = logging.getLogger(__name__)
+
+# How often queued positions are written to the database
+LOCATION_FLUSH_INTERVAL_SECONDS = 10.0
+
+# Queue a write once the rider has moved this far from the persisted position...
+LOCATION_WRITE_DISTANCE_KM = 0.05
+
+# ...or the persisted position is this old (keeps last_location_update fresh)
+LOCATION_WRITE_MAX_AGE_SECONDS = 60.0
+
+# Maximum number of pings accepted in one batch request
+MAX_PINGS_PER_BATCH = 500
+
+
+class RiderLocationTracker:
+    """Latest rider positions in memory with coalesced database writes"""
+
+    def __init__(self, writer=None):
+        # rider_id -> (latitude, longitude, recorded_at epoch seconds)
+        self._latest: Dict[str, Tuple[float, float, float]] = {}
+        # rider_id -> (latitude, longitude, recorded_at) last written to the database
+        self._persisted: Dict[str, Tuple[float, float, float]] = {}
+        self._pending: Dict[str, Tuple[float, float, float]] = {}
+        self._writer = writer
+        self._lock = threading.Lock()
+        self.pings_received = 0
+        self.rows_written = 0
+
+    def record(self, rider_id: str, latitude: float, longitude: float,
+               recorded_at: Optional[float] = None) -> bool:
+        """
+        Record a location ping
+        recorded_at is epoch seconds (defaults to now, future times are clamped).
+        Pings older than the latest known position are ignored.
+        Returns: True if the ping became the rider's current position
+        """
+        now = time.time()
+        recorded_at = now if recorded_at is None else min(recorded_at, now)
+        with self._lock:
+            self.pings_received += 1
+            latest = self._latest.get(rider_id)
+            if latest is not None and recorded_at < latest[2]:
+                return False
+            position = (latitude, longitude, recorded_at)
+            self._latest[rider_id] = position
+            # A queued write always carries the newest position
+            if rider_id in self._pending or self._write_due(rider_id, position):
+                self._pending[rider_id] = position
+
+        from services.dispatch_service import dispatcher
+        dispatcher.update_rider_location(rider_id, latitude, longitude)
+        return True
+
+    def record_batch(self, rider_id: str, pings: Iterable[Tuple[float, float, Optional[float]]]) -> int:
+        """
+        Record several pings of one rider (e.g. buffered while offline)
+        Pings are applied oldest first; returns how many were accepted.
+        """
+        ordered = sorted(pings, key=lambda ping: ping[2] if ping[2] is not None else float('inf'))
+        return sum(1 for latitude, longitude, recorded_at in ordered
+                   if self.record(rider_id, latitude, longitude, recorded_at))
+
+    def _write_due(self, rider_id: str, position: Tuple[float, float, float]) -> bool:
+        persisted = self._persisted.get(rider_id)
+        if persisted is None:
+            return True
+        if position[2] - persisted[2] >= LOCATION_WRITE_MAX_AGE_SECONDS:
+            return True
+        return haversine_distance(persisted[0], persisted[1], position[0], position[1]) >= LOCATION_WRITE_DISTANCE_KM
+
+    def position(self, rider_id: str) -> Optional[Tuple[float, float]]:
+        """Current (latitude, longitude) of a rider seen by this worker, without a DB read"""
+        latest = self._latest.get(rider_id)
+        return (latest[0], latest[1]) if latest else None
+
+    def positions(self) -> Dict[str, Tuple[float, float]]:
+        """Current positions of all riders seen by this worker"""
+        with self._lock:
+            return {rider_id: (lat, lon) for rider_id, (lat, lon, _) in self._latest.items()}
+
+    def flush(self) -> int:
+        """Write all queued positions in one batch; returns rows written"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        writer = self._writer
+        if writer is None:
+            from repositories.delivery_person_repo import update_delivery_person_locations
+            writer = update_delivery_person_locations
+        try:
+            written = writer([
+                (rider_id, latitude, longitude, datetime.fromtimestamp(recorded_at))
+                for rider_id, (latitude, longitude, recorded_at) in pending.items()
+            ])
+        except Exception as e:
+            # Put positions back unless a newer ping was queued meanwhile
+            with self._lock:
+                for rider_id, position in pending.items():
+                    self._pending.setdefault(rider_id, position)
+            logger.error(f"Failed to write rider locations: {e}", exc_info=True)
+            return 0
+
+        with self._lock:
+            self._persisted.update(pending)
+            self.rows_written += written
+        return written
+
+    async def run(self, interval: float = LOCATION_FLUSH_INTERVAL_SECONDS):
+        """Flush queued positions every `interval` seconds until cancelled"""
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                await asyncio.to_thread(self.flush)
+        except asyncio.CancelledError:
+            # Don't lose the last positions on shutdown
+            await asyncio.to_thread(self.flush)
+            raise
+
+
+# Shared tracker for this worker
+rider_locations = RiderLocationTracker()
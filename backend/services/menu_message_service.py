@@ -0,0 +1,112 @@
+"""
+Menu Message Service - Rendered WhatsApp menu messages with a per-restaurant cache
+Rendering a menu means loading every product of the restaurant and building a
+long string; customers ask for the menu far more often than it changes. The
+rendered messages are cached per restaurant together with the menu version
+they were built from (restaurants.menu_version, bumped on every product or
+restaurant update).
+
+Within a worker, product and restaurant writes drop the cached entry
+directly. Entries also expire after MENU_CACHE_CHECK_SECONDS, after which one
+small version query decides whether the cached messages are still current -
+this is how writes made by other workers are picked up.
+
+Menus longer than WhatsApp's body limit are split into several messages at
+item boundaries.
+"""
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Twilio rejects WhatsApp message bodies longer than this
+WHATSAPP_MAX_BODY_LENGTH = 1600
+
+# How long a cached menu is served before its menu version is re-checked
+MENU_CACHE_CHECK_SECONDS = 60
+
+SEPARATOR = "━━━━━━━━━━━━━━━━\n"
+
+# restaurant_id -> (menu_version, checked_at monotonic, messages)
+_menu_message_cache: Dict[str, Tuple[int, float, Tuple[str, ...]]] = {}
+_lock = threading.Lock()
+
+
+def _item_block(number: int, item) -> str:
+    return (
+        f"{number}. *{item.name}*\n"
+        f"   {item.description}\n"
+        f"   💰 ₹{item.price:.0f}\n\n"
+    )
+
+
+def render_menu_messages(restaurant_name: str, upi_id: str, menu_items: list,
+                         max_length: int = WHATSAPP_MAX_BODY_LENGTH) -> List[str]:
+    """
+    Render a menu as one or more WhatsApp message bodies of at most max_length
+    characters. Items keep their position in menu_items as their number (the
+    number customers reply with); unavailable items are left out.
+    """
+    if not menu_items:
+        return [f"*{restaurant_name}*\n\nSorry, no menu items available at the moment."]
+
+    header = f"🍽️ *{restaurant_name} - Menu*\n\n" + SEPARATOR + "\n"
+    continued_header = f"🍽️ *{restaurant_name} - Menu (continued)*\n\n"
+    footer = SEPARATOR
+    footer += "💬 *How to Order:*\n"
+    footer += "Reply with the item number or name\n"
+    footer += "Example: '1' or 'Margherita Pizza'\n\n"
+    if upi_id:
+        footer += f"💳 *Payment:* Send amount to {upi_id}\n\n"
+    footer += "Thank you for choosing us! 🙏"
+
+    blocks = [
+        _item_block(number, item)
+        for number, item in enumerate(menu_items, 1)
+        if item.is_available
+    ] + [footer]
+
+    messages = []
+    current = header
+    for block in blocks:
+        if len(current) + len(block) > max_length and current not in (header, continued_header):
+            messages.append(current.rstrip("\n"))
+            current = continued_header
+        if len(current) + len(block) > max_length:
+            # A single oversized block (e.g. a very long description) is cut
+            block = block[:max_length - len(current) - 1] + "…"
+        current += block
+    messages.append(current)
+    return messages
+
+
+def get_menu_messages(restaurant) -> List[str]:
+    """
+    Rendered menu messages for a restaurant, from the cache when current
+    restaurant can be a Restaurant model object or dict
+    """
+    from repositories.product_repo import get_menu_version, get_products_by_restaurant
+
+    restaurant_id = restaurant.id if hasattr(restaurant, 'id') else restaurant.get('id')
+    now = time.monotonic()
+    cached = _menu_message_cache.get(restaurant_id)
+    if cached and now - cached[1] < MENU_CACHE_CHECK_SECONDS:
+        return list(cached[2])
+
+    version = get_menu_version(restaurant_id)
+    if cached and cached[0] == version:
+        with _lock:
+            _menu_message_cache[restaurant_id] = (version, now, cached[2])
+        return list(cached[2])
+
+    restaurant_name = restaurant.name if hasattr(restaurant, 'name') else restaurant.get('name', 'Restaurant')
+    upi_id = restaurant.upi_id if hasattr(restaurant, 'upi_id') else restaurant.get('upi_id', '')
+    messages = tuple(render_menu_messages(restaurant_name, upi_id, get_products_by_restaurant(restaurant_id)))
+    with _lock:
+        _menu_message_cache[restaurant_id] = (version, now, messages)
+    return list(messages)
+
+
+def invalidate_menu_messages(restaurant_id: Optional[str]):
+    """Drop the cached menu of a restaurant (call after product or restaurant writes)"""
+    with _lock:
+        _menu_message_cache.pop(restaurant_id, None)
@@ -0,0 +1,298 @@
+"""
+Metrics Service - Request latency, database usage and external call timings
+Collected in-process and exposed in the Prometheus text format on /metrics
+(no client library needed; every worker process reports its own numbers).
+
+Per request (MetricsMiddleware):
+    http_request_duration_seconds      histogram by method and route template
+    http_requests_total                counter by method, route and status
+    db_queries_per_request             histogram by route (SQL statements executed)
+    db_connection_checkouts_total      counter by route (engine connection checkouts;
+                                       with NullPool every checkout is a new connection)
+    db_query_duration_seconds_total    counter by route (time spent executing SQL)
+
+External calls (time_external_call):
+    external_call_duration_seconds     histogram by service, operation and outcome
+
+The query and checkout counts come from events on database.engine and are
+attributed to the request through a context variable, which is copied into
+asyncio.to_thread() and threadpool calls made while handling the request. With
+METRICS_QUERY_HEADER enabled the counts are also returned in X-DB-Queries and
+X-DB-Checkouts response headers (counted until the response started). They
+describe how the backend works internally, so they are off by default; turn
+them on in development only.
+
+/metrics is guarded by the operator token like the debug endpoints (X-Admin-Token
+header, disabled while ADMIN_TOKEN is unset); point the scraper at it with
+that header.
+
+Configuration (environment):
+    METRICS_QUERY_HEADER  send X-DB-Queries / X-DB-Checkouts headers (default false)
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+METRICS_QUERY_HEADER = os.getenv("METRICS_QUERY_HEADER", "false").lower() in ("1", "true", "yes")
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+# Requests that matched no route share one label (keeps the series count bounded)
+UNMATCHED_ROUTE = "unmatched"
+
+_lock = threading.Lock()
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+# (method, route) -> histogram
+_request_latency: Dict[Tuple[str, str], _Histogram] = {}
+# (method, route, status) -> count
+_request_count: Dict[Tuple[str, str, str], int] = {}
+# route -> histogram / totals
+_route_queries: Dict[str, _Histogram] = {}
+_route_checkouts: Dict[str, int] = {}
+_route_query_seconds: Dict[str, float] = {}
+# (service, operation, outcome) -> histogram
+_external_calls: Dict[Tuple[str, str, str], _Histogram] = {}
+
+
+class RequestStats:
+    """Database usage of the request being handled"""
+    __slots__ = ("queries", "checkouts", "query_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.checkouts = 0
+        self.query_seconds = 0.0
+
+
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("metrics_request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    """Database usage so far of the request being handled (None outside a request)"""
+    return _current_request.get()
+
+
+# -------------------------------
+# Engine events
+# -------------------------------
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("metrics_query_start")
+    elapsed = time.perf_counter() - starts.pop() if starts else 0.0
+    stats = _current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_seconds += elapsed
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    stats = _current_request.get()
+    if stats is not None:
+        stats.checkouts += 1
+
+
+def instrument_engine(engine):
+    """Count queries and connection checkouts of an engine (idempotent)"""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine.pool, "checkout", _on_checkout)
+
+
+# -------------------------------
+# Recording
+# -------------------------------
+
+def observe_request(method: str, route: str, status: int, seconds: float, stats: RequestStats):
+    with _lock:
+        key = (method, route)
+        histogram = _request_latency.get(key)
+        if histogram is None:
+            histogram = _request_latency[key] = _Histogram(LATENCY_BUCKETS)
+        histogram.observe(seconds)
+
+        count_key = (method, route, str(status))
+        _request_count[count_key] = _request_count.get(count_key, 0) + 1
+
+        histogram = _route_queries.get(route)
+        if histogram is None:
+            histogram = _route_queries[route] = _Histogram(QUERY_COUNT_BUCKETS)
+        histogram.observe(stats.queries)
+        _route_checkouts[route] = _route_checkouts.get(route, 0) + stats.checkouts
+        _route_query_seconds[route] = _route_query_seconds.get(route, 0.0) + stats.query_seconds
+
+
+def observe_external_call(service: str, operation: str, outcome: str, seconds: float):
+    with _lock:
+        key = (service, operation, outcome)
+        histogram = _external_calls.get(key)
+        if histogram is None:
+            histogram = _external_calls[key] = _Histogram(LATENCY_BUCKETS)
+        histogram.observe(seconds)
+
+
+@contextmanager
+def time_external_call(service: str, operation: str) -> Iterator[None]:
+    """
+    Time a call to an external service (Twilio, Razorpay) or an expensive
+    library call (QR decoding); an exception is recorded as outcome="error"
+    Usage: with time_external_call("twilio", "send_message"): ...
+    """
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        observe_external_call(service, operation, outcome, time.perf_counter() - start)
+
+
+def reset_metrics():
+    """Forget everything recorded so far (benchmarks and tests)"""
+    with _lock:
+        for metric in (_request_latency, _request_count, _route_queries,
+                       _route_checkouts, _route_query_seconds, _external_calls):
+            metric.clear()
+
+
+# -------------------------------
+# Middleware
+# -------------------------------
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency and database usage per route template
+    (e.g. /api/orders/{order_id}, so IDs in paths do not create new series)
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current_request.set(stats)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_headers(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if METRICS_QUERY_HEADER:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-db-queries", str(stats.queries).encode()),
+                        (b"x-db-checkouts", str(stats.checkouts).encode()),
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _current_request.reset(token)
+            route = scope.get("route")
+            observe_request(
+                scope["method"], getattr(route, "path", None) or UNMATCHED_ROUTE,
+                status, time.perf_counter() - start, stats
+            )
+
+
+# -------------------------------
+# Exposition
+# -------------------------------
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_bound(bound: float) -> str:
+    return repr(float(bound))
+
+
+_INF_BUCKET = 'le="+Inf"'
+
+
+def _histogram_lines(name: str, help_text: str, label_names: Sequence[str],
+                     series: Dict[tuple, _Histogram]) -> List[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for key, histogram in sorted(series.items()):
+        key = key if isinstance(key, tuple) else (key,)
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            le = f'le="{_format_bound(bound)}"'
+            lines.append(f"{name}_bucket{_labels(label_names, key, le)} {cumulative}")
+        lines.append(f"{name}_bucket{_labels(label_names, key, _INF_BUCKET)} {histogram.count}")
+        lines.append(f"{name}_sum{_labels(label_names, key)} {histogram.sum}")
+        lines.append(f"{name}_count{_labels(label_names, key)} {histogram.count}")
+    return lines
+
+
+def _counter_lines(name: str, help_text: str, label_names: Sequence[str], series: Dict) -> List[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+    for key, value in sorted(series.items()):
+        key = key if isinstance(key, tuple) else (key,)
+        lines.append(f"{name}{_labels(label_names, key)} {value}")
+    return lines
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    with _lock:
+        lines = []
+        lines += _histogram_lines("http_request_duration_seconds", "HTTP request latency by route template.",
+                                  ("method", "route"), _request_latency)
+        lines += _counter_lines("http_requests_total", "HTTP requests by route template and status.",
+                                ("method", "route", "status"), _request_count)
+        lines += _histogram_lines("db_queries_per_request", "SQL statements executed per request.",
+                                  ("route",), _route_queries)
+        lines += _counter_lines("db_connection_checkouts_total", "Database connection checkouts by route.",
+                                ("route",), _route_checkouts)
+        lines += _counter_lines("db_query_duration_seconds_total", "Time spent executing SQL by route.",
+                                ("route",), _route_query_seconds)
+        lines += _histogram_lines("external_call_duration_seconds",
+                                  "Latency of Twilio, Razorpay and QR decoding calls.",
+                                  ("service", "operation", "outcome"), _external_calls)
+    return "\n".join(lines) + "\n"
@@ -91,11 +91,16 @@ def create_new_order(
     
     return create_order(new_order)
 
-def get_restaurant_orders(restaurant_id: str) -> List[Order]:
+def get_restaurant_orders(restaurant_id: str, status: Optional[str] = None,
+                          since: Optional[datetime] = None, until: Optional[datetime] = None,
+                          limit: Optional[int] = None, offset: Optional[int] = None) -> List[Order]:
     """
-    Get all orders for a restaurant
+    Get orders for a restaurant, newest first
+    Filters and pagination are applied in the database.
     """
-    return get_orders_by_restaurant(restaurant_id)
+    return get_orders_by_restaurant(
+        restaurant_id, status=status, since=since, until=until, limit=limit, offset=offset
+    )
 
 def update_order_status_safe(order_id: str, new_status: str, restaurant_id: str) -> tuple[Order, str]:
     """
@@ -112,10 +117,7 @@ def update_order_status_safe(order_id: str, new_status: str, restaurant_id: str)
         raise ValueError("Order not found")
     
     # Verify order belongs to restaurant
-    orders = get_orders_by_restaurant(restaurant_id)
-    order = next((o for o in orders if o.id == order_id), None)
-    
-    if not order:
+    if current_order.restaurant_id != restaurant_id:
         raise ValueError("Order not found or access denied")
     
     old_status = current_order.status
@@ -123,5 +125,12 @@ def update_order_status_safe(order_id: str, new_status: str, restaurant_id: str)
     # Update order status
     updated_order = update_order_status(order_id, new_status)
     
+    # Assign a rider when a delivery order becomes ready / free the rider when it's done
+    if updated_order:
+        from services.dispatch_service import dispatcher
+        dispatcher.on_order_status_changed(updated_order, old_status)
+        if updated_order.status == "ready" and updated_order.order_type == "delivery":
+            updated_order = get_order_by_id(order_id) or updated_order
+    
     return updated_order, old_status
 
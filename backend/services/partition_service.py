@@ -0,0 +1,32 @@
+"""
+Partition Service - Creates upcoming monthly orders partitions
+orders is range-partitioned by month on created_at (see init-db.sql). Orders
+whose month has no partition land in orders_default, which is slower to query
+and to maintain, so partitions are created ahead of time: on startup and then
+daily. ensure_orders_partitions() is idempotent and serialized by an advisory
+lock in the database, so several workers may run it at the same time.
+
+Configuration (environment):
+    ORDER_PARTITION_MONTHS_AHEAD  months created ahead of the current one (default 3)
+"""
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+ORDER_PARTITION_MONTHS_AHEAD = int(os.getenv("ORDER_PARTITION_MONTHS_AHEAD", "3"))
+
+PARTITION_CHECK_INTERVAL_HOURS = 24
+
+
+async def run_periodically(interval_hours: float = PARTITION_CHECK_INTERVAL_HOURS):
+    """Ensure future orders partitions exist now and every interval_hours until cancelled"""
+    from repositories.order_repo import ensure_order_partitions
+
+    while True:
+        try:
+            await asyncio.to_thread(ensure_order_partitions, ORDER_PARTITION_MONTHS_AHEAD)
+        except Exception as e:
+            logger.error(f"Failed to create orders partitions: {e}", exc_info=True)
+        await asyncio.sleep(interval_hours * 3600)
@@ -0,0 +1,141 @@
+"""
+Password Service - bcrypt hashing and verification off the event loop
+bcrypt costs ~100-250ms of CPU per hash at the default work factor. Running it
+inside an async endpoint would block every other request on the worker, so all
+hashing goes through a dedicated, bounded thread pool (bcrypt releases the GIL,
+so the pool scales with cores).
+
+The pool's queue is capped: at most workers x PASSWORD_HASH_QUEUE_PER_WORKER
+hashes may be running or waiting. Past that a login burst would only pile up
+requests that time out anyway, so new work is refused with
+PasswordHasherBusyError (served as 503 with Retry-After).
+
+Configuration (environment):
+    BCRYPT_ROUNDS                   work factor for new hashes (default 12)
+    PASSWORD_HASH_WORKERS           threads in the hashing pool (default: CPU count)
+    PASSWORD_HASH_QUEUE_PER_WORKER  in-flight hashes allowed per thread (default 8)
+"""
+import asyncio
+import hmac
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import bcrypt
+
+logger = logging.getLogger(__name__)
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+PASSWORD_HASH_QUEUE_PER_WORKER = int(os.getenv("PASSWORD_HASH_QUEUE_PER_WORKER", "8"))
+
+# Seconds clients are told to wait when the hashing pool is saturated
+PASSWORD_HASH_RETRY_AFTER = 1
+
+# bcrypt only uses the first 72 bytes of a password
+BCRYPT_MAX_PASSWORD_BYTES = 72
+
+BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
+
+
+def _encode(password: str) -> bytes:
+    return password.encode("utf-8")[:BCRYPT_MAX_PASSWORD_BYTES]
+
+
+def is_password_hash(stored: Optional[str]) -> bool:
+    """Whether a stored password is a bcrypt hash (older accounts stored plain text)"""
+    return bool(stored) and stored.startswith(BCRYPT_PREFIXES)
+
+
+class PasswordHasherBusyError(Exception):
+    """Raised when the hashing pool already has its maximum in-flight work"""
+
+
+class PasswordHasher:
+    """bcrypt hashing with a bounded executor and an async API"""
+
+    def __init__(
+        self,
+        rounds: int = BCRYPT_ROUNDS,
+        max_workers: int = PASSWORD_HASH_WORKERS,
+        queue_per_worker: int = PASSWORD_HASH_QUEUE_PER_WORKER,
+    ):
+        self.rounds = rounds
+        self.max_workers = max_workers
+        self.max_in_flight = max_workers * max(1, queue_per_worker)
+        self._in_flight = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hash")
+
+    def hash_sync(self, password: str) -> str:
+        """Hash a password on the calling thread"""
+        return bcrypt.hashpw(_encode(password), bcrypt.gensalt(rounds=self.rounds)).decode("utf-8")
+
+    def verify_sync(self, password: str, stored: str) -> bool:
+        """
+        Check a password on the calling thread
+        Plain-text stored passwords (accounts created before hashing) are compared
+        in constant time so they keep working until they are rehashed.
+        """
+        if not stored:
+            return False
+        if not is_password_hash(stored):
+            return hmac.compare_digest(_encode(password), stored.encode("utf-8")[:BCRYPT_MAX_PASSWORD_BYTES])
+        try:
+            return bcrypt.checkpw(_encode(password), stored.encode("utf-8"))
+        except ValueError:
+            logger.warning("Malformed password hash encountered")
+            return False
+
+    def needs_rehash(self, stored: str) -> bool:
+        """Whether a stored password should be replaced by a hash at the current work factor"""
+        if not is_password_hash(stored):
+            return True
+        try:
+            return int(stored.split("$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    @property
+    def in_flight(self) -> int:
+        """Hashes currently running or queued in the pool"""
+        return self._in_flight
+
+    async def _run(self, func, *args):
+        # Only touched from the event loop thread, so a plain counter is enough;
+        # refusing instead of waiting keeps the backlog bounded
+        if self._in_flight >= self.max_in_flight:
+            raise PasswordHasherBusyError(
+                f"Password hashing pool is saturated ({self._in_flight} in flight)"
+            )
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self._in_flight -= 1
+
+    async def hash(self, password: str) -> str:
+        """Hash a password in the hashing pool"""
+        return await self._run(self.hash_sync, password)
+
+    async def verify(self, password: str, stored: str) -> bool:
+        """Check a password in the hashing pool"""
+        return await self._run(self.verify_sync, password, stored)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+# Shared hasher for this worker
+password_hasher = PasswordHasher()
+
+
+async def hash_password(password: str) -> str:
+    """Hash a password without blocking the event loop"""
+    return await password_hasher.hash(password)
+
+
+async def verify_password(password: str, stored: str) -> bool:
+    """Check a password without blocking the event loop"""
+    return await password_hasher.verify(password, stored)
@@ -0,0 +1,138 @@
+"""
+Payment Link Service - Local payment link state for status polling
+The payment page polls the status of its Razorpay payment link. The state is
+recorded when the link is created and updated by the payment_link.* webhooks,
+so a poll is a local lookup instead of a Razorpay API call.
+
+Razorpay is only asked directly (reconciliation) when a link is still open and
+was not checked for PAYMENT_RECONCILE_INTERVAL_SECONDS - in case a webhook was
+lost - or when a link is unknown locally (links created before this table was
+used). The interval is enforced across workers through payments.updated_at.
+
+Long-poll: wait_for_payment_link_status() holds a request until the status
+changes. Webhooks handled by this worker wake waiters immediately; changes
+made by other workers are seen on the next re-read of the local state.
+
+Configuration (environment):
+    PAYMENT_RECONCILE_INTERVAL_SECONDS  default 30
+"""
+import asyncio
+import logging
+import os
+import time
+import weakref
+from typing import Dict, Optional
+
+from repositories.payment_repo import (
+    FINAL_PAYMENT_LINK_STATUSES, claim_payment_link_reconciliation, get_payment_link, save_payment_link
+)
+
+logger = logging.getLogger(__name__)
+
+PAYMENT_RECONCILE_INTERVAL_SECONDS = float(os.getenv("PAYMENT_RECONCILE_INTERVAL_SECONDS", "30"))
+
+# Longest a status request may wait for a change
+PAYMENT_STATUS_MAX_WAIT_SECONDS = 25
+
+# How often a waiting request re-reads the local state
+PAYMENT_STATUS_RECHECK_SECONDS = 2
+
+# Unknown link IDs are looked up at Razorpay at most this often (per worker)
+UNKNOWN_LINK_CHECK_SECONDS = 60
+MAX_UNKNOWN_LINK_CHECKS = 10000
+
+# payment_link_id -> Event set when this worker records a new status
+_status_events: "weakref.WeakValueDictionary[str, asyncio.Event]" = weakref.WeakValueDictionary()
+
+# payment_link_id -> monotonic time of the last Razorpay lookup of an unknown link
+_unknown_link_checks: Dict[str, float] = {}
+
+
+def apply_payment_link_entity(entity: Dict, restaurant_id: Optional[str] = None) -> Optional[Dict]:
+    """
+    Record a Razorpay payment_link entity (from link creation, a webhook or a
+    fetch) as the local state of the link and wake up waiting requests
+    Returns: the local state
+    """
+    payment_link_id = entity.get("id")
+    if not payment_link_id:
+        return None
+    status = entity.get("status") or "created"
+    paid_at = entity.get("paid_at")
+    if status == "paid" and not paid_at:
+        paid_at = int(time.time())
+    state = save_payment_link(
+        payment_link_id,
+        order_id=(entity.get("notes") or {}).get("order_id"),
+        restaurant_id=restaurant_id,
+        amount=(entity.get("amount") or 0) / 100,  # paise
+        status=status,
+        short_url=entity.get("short_url"),
+        paid_at=paid_at,
+    )
+    event = _status_events.pop(payment_link_id, None)
+    if event:
+        event.set()
+    return state
+
+
+async def _fetch_from_razorpay(payment_link_id: str) -> Optional[Dict]:
+    """Fetch a payment link from Razorpay (off the event loop) and record it"""
+    from services.payment_service import get_payment_status
+    entity = await asyncio.to_thread(get_payment_status, payment_link_id)
+    if not entity:
+        return None
+    logger.info(f"🔄 Reconciled payment link {payment_link_id} with Razorpay: {entity.get('status')}")
+    return apply_payment_link_entity(entity)
+
+
+async def get_payment_link_status(payment_link_id: str) -> Optional[Dict]:
+    """
+    Local state of a payment link, reconciled with Razorpay when it is due
+    Returns: None if the link is unknown locally and at Razorpay
+    """
+    state = get_payment_link(payment_link_id)
+    if state is None:
+        if not payment_link_id.startswith("plink_"):
+            return None
+        now = time.monotonic()
+        if now - _unknown_link_checks.get(payment_link_id, float("-inf")) < UNKNOWN_LINK_CHECK_SECONDS:
+            return None
+        if len(_unknown_link_checks) >= MAX_UNKNOWN_LINK_CHECKS:
+            _unknown_link_checks.clear()
+        _unknown_link_checks[payment_link_id] = now
+        return await _fetch_from_razorpay(payment_link_id)
+
+    if state['status'] not in FINAL_PAYMENT_LINK_STATUSES and \
+            state['checked_seconds_ago'] >= PAYMENT_RECONCILE_INTERVAL_SECONDS and \
+            claim_payment_link_reconciliation(payment_link_id, PAYMENT_RECONCILE_INTERVAL_SECONDS):
+        return await _fetch_from_razorpay(payment_link_id) or state
+    return state
+
+
+async def wait_for_payment_link_status(payment_link_id: str, wait_seconds: float,
+                                       current_status: Optional[str] = None) -> Optional[Dict]:
+    """
+    Long-poll: return once the link status differs from current_status (the
+    status the client already has; default: the status at the time of the
+    call) or is final, or after wait_seconds
+    """
+    deadline = time.monotonic() + min(wait_seconds, PAYMENT_STATUS_MAX_WAIT_SECONDS)
+    state = await get_payment_link_status(payment_link_id)
+    if state is None:
+        return None
+    current_status = current_status or state['status']
+
+    while state['status'] == current_status and state['status'] not in FINAL_PAYMENT_LINK_STATUSES:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        event = _status_events.get(payment_link_id)
+        if event is None:
+            event = _status_events[payment_link_id] = asyncio.Event()
+        try:
+            await asyncio.wait_for(event.wait(), timeout=min(remaining, PAYMENT_STATUS_RECHECK_SECONDS))
+        except asyncio.TimeoutError:
+            pass
+        state = await get_payment_link_status(payment_link_id) or state
+    return state
@@ -5,6 +5,8 @@ import logging
 import os
 from typing import Optional, Dict
 
+from services.metrics_service import time_external_call
+
 logger = logging.getLogger(__name__)
 
 # Try to import razorpay - make it optional
@@ -94,7 +96,8 @@ def create_razorpay_payment_link(
             payment_link_data["customer"]["email"] = customer_email
         
         logger.info(f"Creating Razorpay payment link for order {order_id}, amount: ₹{amount}")
-        payment_link = razorpay_client.payment_link.create(data=payment_link_data)
+        with time_external_call("razorpay", "payment_link_create"):
+            payment_link = razorpay_client.payment_link.create(data=payment_link_data)
         
         logger.info(f"✅ Razorpay payment link created: {payment_link.get('short_url')}")
         return payment_link
@@ -146,7 +149,8 @@ def get_payment_status(payment_link_id: str) -> Optional[Dict]:
         return None
     
     try:
-        payment_link = razorpay_client.payment_link.fetch(payment_link_id)
+        with time_external_call("razorpay", "payment_link_fetch"):
+            payment_link = razorpay_client.payment_link.fetch(payment_link_id)
         return payment_link
     except Exception as e:
         logger.error(f"❌ Failed to fetch payment status: {e}")
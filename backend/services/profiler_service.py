@@ -0,0 +1,94 @@
+"""
+Profiler Service - On-demand sampling profiler for a live worker
+A background thread takes a snapshot of every thread's Python stack
+(sys._current_frames) at a fixed interval for the requested duration and
+counts identical stacks. The result is in the collapsed stack format used by
+flamegraph.pl, speedscope and inferno ("thread;outer;...;inner count" per
+line), so a profile shows where the event loop and the threadpool spend their
+time: Python code (geo search, model conversion, response building) as well as
+waits inside the database driver or HTTP clients.
+
+Nothing runs between profiles: the sampler thread exists only while a profile
+is being taken, and only one profile runs at a time per worker.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List
+
+# Longest profile and fastest sampling allowed
+MAX_PROFILE_SECONDS = 60
+MIN_INTERVAL_MS = 1
+
+# Leaf frames of a thread that is waiting for work (not for a result)
+_IDLE_LEAF_FUNCTIONS = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+_profile_lock = threading.Lock()
+
+
+class ProfilerBusyError(Exception):
+    """Another profile is already running in this worker"""
+
+
+def _frame_label(code) -> str:
+    filename = code.co_filename
+    for prefix in sys.path:
+        if prefix and filename.startswith(prefix + os.sep):
+            filename = filename[len(prefix) + 1:]
+            break
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def _is_idle(frame) -> bool:
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAF_FUNCTIONS
+
+
+def sample_stacks(seconds: float, interval_ms: float = 10, include_idle: bool = False) -> Dict[str, int]:
+    """
+    Sample the stacks of all other threads for `seconds` (blocking; run it in a
+    thread from async code)
+    Returns: collapsed stack -> number of samples
+    Raises: ProfilerBusyError if a profile is already running
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusyError("A profile is already running")
+    try:
+        seconds = min(max(seconds, 0.0), MAX_PROFILE_SECONDS)
+        interval = max(interval_ms, MIN_INTERVAL_MS) / 1000
+        own_ident = threading.get_ident()
+        stacks: Counter = Counter()
+        labels: Dict[object, str] = {}  # code object -> label
+
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident or (not include_idle and _is_idle(frame)):
+                    continue
+                frames: List[str] = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = labels.get(code)
+                    if label is None:
+                        label = labels[code] = _frame_label(code)
+                    frames.append(label)
+                    frame = frame.f_back
+                frames.append(names.get(ident, f"thread-{ident}"))
+                stacks[";".join(reversed(frames))] += 1
+            time.sleep(interval)
+        return dict(stacks)
+    finally:
+        _profile_lock.release()
+
+
+def format_collapsed(stacks: Dict[str, int]) -> str:
+    """Collapsed stack file contents, most sampled stacks first"""
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(stacks.items(), key=lambda item: -item[1]))
@@ -9,6 +9,8 @@ import urllib.parse
 from io import BytesIO
 from typing import Optional, Tuple
 
+from services.metrics_service import time_external_call
+
 logger = logging.getLogger(__name__)
 
 # Try OpenCV first (works on Windows without DLL dependencies)
@@ -75,7 +77,8 @@ def decode_qr_code_from_base64(base64_data: str) -> Optional[str]:
                 else:
                     # Use OpenCV QRCodeDetector
                     detector = cv2.QRCodeDetector()
-                    retval, decoded_info, points, straight_qrcode = detector.detectAndDecodeMulti(img)
+                    with time_external_call("qr_decode", "opencv"):
+                        retval, decoded_info, points, straight_qrcode = detector.detectAndDecodeMulti(img)
                     
                     if retval and decoded_info:
                         qr_data = decoded_info[0]
@@ -102,7 +105,8 @@ def decode_qr_code_from_base64(base64_data: str) -> Optional[str]:
                     image = image.convert('RGB')
                 
                 # Decode QR code
-                decoded_objects = pyzbar.decode(image)
+                with time_external_call("qr_decode", "pyzbar"):
+                    decoded_objects = pyzbar.decode(image)
                 
                 if decoded_objects:
                     qr_data = decoded_objects[0].data.decode('utf-8')
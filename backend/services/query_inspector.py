@@ -0,0 +1,243 @@
+"""
+Query Inspector - N+1 and slow query detection for development and tests
+Every SQL statement executed inside an inspection is reduced to a fingerprint
+(its shape: literals, bind parameters and IN lists replaced by ?) and recorded
+with its duration and the application code that issued it. An inspection
+flags:
+    - statement shapes executed more than QUERY_REPEAT_THRESHOLD times
+      (a query inside a loop - the classic N+1)
+    - statements slower than SLOW_QUERY_MS
+
+The call site shown is the innermost frames of this backend's own code (not
+SQLAlchemy's), e.g. "repositories/order_repo.py:120 get_order_items <-
+routers/orders.py:88 get_orders", so the loop that issues the queries is
+visible.
+
+Development: with QUERY_INSPECTOR=log every request is inspected and its
+findings are logged as warnings. The engine hook costs nothing outside an
+inspection, and with the inspector off it is not even installed.
+
+Tests: wrap the code under test in assert_no_query_problems():
+
+    with assert_no_query_problems(max_repeats=3):
+        client.get("/api/orders")
+
+Configuration (environment):
+    QUERY_INSPECTOR         'off' (default) or 'log'
+    QUERY_REPEAT_THRESHOLD  max executions of one statement shape (default 5)
+    SLOW_QUERY_MS           latency budget per statement (default 100)
+"""
+import logging
+import os
+import re
+import sys
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+QUERY_INSPECTOR = os.getenv("QUERY_INSPECTOR", "off").lower()
+QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", "5"))
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+
+# Frames of this backend's code (the directory above services/)
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+_CALL_SITE_DEPTH = 3
+# Instrumentation frames (middlewares) are not call sites
+_SKIPPED_FILES = {
+    os.path.abspath(__file__),
+    os.path.join(_BACKEND_DIR, "services", "metrics_service.py"),
+}
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_BIND_PARAMETER = re.compile(r"%\([^)]+\)s|%s|\$\d+")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*\?\s*,)*\s*\?\s*\)", re.IGNORECASE)
+_VALUES_LIST = re.compile(r"\bVALUES\s*(\(\s*[?,\s]*\))(?:\s*,\s*\(\s*[?,\s]*\))*", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """The shape of a SQL statement: same fingerprint = same query with different values"""
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _BIND_PARAMETER.sub("?", shape)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _IN_LIST.sub("IN (?)", shape)
+    shape = _VALUES_LIST.sub(r"VALUES \1", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+def _call_site() -> str:
+    """The innermost frames of application code that led to the current statement"""
+    frames = []
+    frame = sys._getframe(2)
+    while frame is not None and len(frames) < _CALL_SITE_DEPTH:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_BACKEND_DIR) and filename not in _SKIPPED_FILES and "site-packages" not in filename:
+            relative = filename[len(_BACKEND_DIR):].replace(os.sep, "/")
+            frames.append(f"{relative}:{frame.f_lineno} {frame.f_code.co_name}")
+        frame = frame.f_back
+    return " <- ".join(frames) or "<unknown>"
+
+
+class StatementStats:
+    """Executions of one statement shape"""
+    __slots__ = ("fingerprint", "count", "seconds", "call_sites")
+
+    def __init__(self, shape: str):
+        self.fingerprint = shape
+        self.count = 0
+        self.seconds = 0.0
+        self.call_sites: Dict[str, int] = {}
+
+
+class QueryReport:
+    """Statements executed during one inspection, by fingerprint"""
+
+    def __init__(self, repeat_threshold: int = QUERY_REPEAT_THRESHOLD, slow_query_ms: float = SLOW_QUERY_MS):
+        self.repeat_threshold = repeat_threshold
+        self.slow_query_ms = slow_query_ms
+        self.statements: Dict[str, StatementStats] = {}
+        # (statement, milliseconds, call site)
+        self.slow_queries: List[Tuple[str, float, str]] = []
+
+    @property
+    def total_queries(self) -> int:
+        return sum(stats.count for stats in self.statements.values())
+
+    def record(self, statement: str, seconds: float, call_site: str):
+        shape = fingerprint(statement)
+        stats = self.statements.get(shape)
+        if stats is None:
+            stats = self.statements[shape] = StatementStats(shape)
+        stats.count += 1
+        stats.seconds += seconds
+        stats.call_sites[call_site] = stats.call_sites.get(call_site, 0) + 1
+        if seconds * 1000 > self.slow_query_ms:
+            self.slow_queries.append((statement, seconds * 1000, call_site))
+
+    def repeated(self) -> List[StatementStats]:
+        """Statement shapes executed more than repeat_threshold times, most frequent first"""
+        return sorted(
+            (stats for stats in self.statements.values() if stats.count > self.repeat_threshold),
+            key=lambda stats: stats.count, reverse=True
+        )
+
+    def has_problems(self) -> bool:
+        return bool(self.slow_queries) or bool(self.repeated())
+
+    def format(self) -> str:
+        """Human readable findings (empty string when there are none)"""
+        lines = []
+        for stats in self.repeated():
+            lines.append(
+                f"Repeated query ({stats.count}x, {stats.seconds * 1000:.1f}ms total, "
+                f"threshold {self.repeat_threshold}): {stats.fingerprint[:300]}"
+            )
+            for call_site, count in sorted(stats.call_sites.items(), key=lambda item: -item[1])[:3]:
+                lines.append(f"    {count}x at {call_site}")
+        for statement, milliseconds, call_site in self.slow_queries:
+            lines.append(
+                f"Slow query ({milliseconds:.1f}ms, budget {self.slow_query_ms:.0f}ms): "
+                f"{_WHITESPACE.sub(' ', statement)[:300]}"
+            )
+            lines.append(f"    at {call_site}")
+        return "\n".join(lines)
+
+
+_current_report: ContextVar[Optional[QueryReport]] = ContextVar("query_inspector_report", default=None)
+
+
+# -------------------------------
+# Engine events
+# -------------------------------
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_report.get() is not None:
+        conn.info.setdefault("query_inspector_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    report = _current_report.get()
+    starts = conn.info.get("query_inspector_start")
+    if report is None or not starts:
+        return
+    report.record(statement, time.perf_counter() - starts.pop(), _call_site())
+
+
+def instrument_engine(engine):
+    """Let inspections see the statements of an engine (idempotent)"""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# -------------------------------
+# Inspections
+# -------------------------------
+
+@contextmanager
+def inspect_queries(repeat_threshold: int = QUERY_REPEAT_THRESHOLD,
+                    slow_query_ms: float = SLOW_QUERY_MS) -> Iterator[QueryReport]:
+    """
+    Record the statements executed inside the block (including by
+    asyncio.to_thread() calls started in it)
+    Usage: with inspect_queries() as report: ...; print(report.format())
+    """
+    from database import engine
+    instrument_engine(engine)
+
+    report = QueryReport(repeat_threshold, slow_query_ms)
+    token = _current_report.set(report)
+    try:
+        yield report
+    finally:
+        _current_report.reset(token)
+
+
+@contextmanager
+def assert_no_query_problems(max_repeats: int = QUERY_REPEAT_THRESHOLD,
+                             slow_query_ms: float = SLOW_QUERY_MS,
+                             max_queries: Optional[int] = None) -> Iterator[QueryReport]:
+    """
+    Test helper: fail with an AssertionError listing the call sites when the
+    block repeats a statement shape more than max_repeats times, runs a
+    statement slower than slow_query_ms or executes more than max_queries
+    statements in total
+    """
+    with inspect_queries(max_repeats, slow_query_ms) as report:
+        yield report
+    problems = report.format()
+    if max_queries is not None and report.total_queries > max_queries:
+        problems = f"{report.total_queries} queries executed, expected at most {max_queries}\n" + problems
+    if problems:
+        raise AssertionError("Query problems detected:\n" + problems)
+
+
+class QueryInspectorMiddleware:
+    """ASGI middleware inspecting every request and logging its findings (QUERY_INSPECTOR=log)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with inspect_queries() as report:
+            await self.app(scope, receive, send)
+        if report.has_problems():
+            route = getattr(scope.get("route"), "path", None) or scope["path"]
+            logger.warning(
+                f"🐢 {scope['method']} {route}: {report.total_queries} queries\n{report.format()}"
+            )
+
+
+def inspector_enabled() -> bool:
+    return QUERY_INSPECTOR == "log"
@@ -0,0 +1,184 @@
+"""
+Webhook Queue Service - Fast-ack ingestion of Twilio and Razorpay webhooks
+With WEBHOOK_INGESTION_MODE=queue a webhook handler only validates the
+delivery and stores it in webhook_events (status 'queued', the same INSERT
+that deduplicates retries), then responds. The event is processed afterwards
+by a pool of WEBHOOK_WORKERS asyncio workers.
+
+Ordering: every event has an ordering key (the customer's phone number for
+WhatsApp messages, the order for payments). Events with the same key always go
+to the same worker, which processes its events one at a time, so the messages
+of one customer are handled in the order they arrived (within one process).
+
+Leases: a queued event is leased to the process that queued it (or took it
+over); a heartbeat renews the leases of all its events every third of
+WEBHOOK_QUEUE_LEASE_SECONDS. Events waiting in the in-memory queue of a live
+process are therefore never taken by another one, however long the backlog.
+
+Durability: a failed event stays queued and its lease is released; it is
+retried after WEBHOOK_QUEUE_RETRY_SECONDS (possibly after later events with
+its ordering key), up to WEBHOOK_QUEUE_MAX_ATTEMPTS times. Events of a process
+that stopped are taken over by a running process once their lease expires
+(right away after a clean shutdown). Delivery is at-least-once: an event is
+processed twice only if its process stalls for longer than the lease.
+
+Handlers are registered by name (register_webhook_handler) by the modules that
+own the webhook endpoints; the name is stored with the event.
+
+Configuration (environment):
+    WEBHOOK_INGESTION_MODE       'sync' (default, process before responding) or 'queue'
+    WEBHOOK_WORKERS              worker tasks per process (default 4)
+    WEBHOOK_QUEUE_RETRY_SECONDS  default 60
+    WEBHOOK_QUEUE_LEASE_SECONDS  default 60
+    WEBHOOK_QUEUE_MAX_ATTEMPTS   default 5
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import uuid
+import zlib
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_INGESTION_MODE = os.getenv("WEBHOOK_INGESTION_MODE", "sync").lower()
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "4"))
+WEBHOOK_QUEUE_RETRY_SECONDS = float(os.getenv("WEBHOOK_QUEUE_RETRY_SECONDS", "60"))
+WEBHOOK_QUEUE_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_QUEUE_MAX_ATTEMPTS", "5"))
+WEBHOOK_QUEUE_LEASE_SECONDS = float(os.getenv("WEBHOOK_QUEUE_LEASE_SECONDS", "60"))
+
+# Lease owner name of this process
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# handler name -> coroutine function taking the event data
+_handlers: Dict[str, Callable[[Dict], Awaitable[None]]] = {}
+
+_worker_queues: List[asyncio.Queue] = []
+_worker_tasks: List[asyncio.Task] = []
+
+# (source, event_id) of events waiting in or being processed by this process
+_in_flight: Set[Tuple[str, str]] = set()
+
+
+def queue_mode_enabled() -> bool:
+    """True when webhooks should be queued instead of processed before responding"""
+    return WEBHOOK_INGESTION_MODE == "queue" and bool(_worker_queues)
+
+
+def register_webhook_handler(name: str, handler: Callable[[Dict], Awaitable[None]]):
+    """Register the coroutine that processes queued events of one kind"""
+    _handlers[name] = handler
+
+
+def _dispatch(event: Dict):
+    """Hand an event to the worker owning its ordering key"""
+    if (event['source'], event['event_id']) in _in_flight:
+        return
+    _in_flight.add((event['source'], event['event_id']))
+    key = event.get('ordering_key') or event['event_id']
+    _worker_queues[zlib.crc32(key.encode()) % len(_worker_queues)].put_nowait(event)
+
+
+def enqueue_webhook(source: str, event_id: Optional[str], handler: str, data: Dict,
+                    ordering_key: Optional[str] = None) -> bool:
+    """
+    Store a delivery and schedule it for processing
+    event_id is the provider's delivery ID (None: the delivery cannot be deduplicated)
+    Returns: False if the delivery was a duplicate
+    """
+    from repositories.webhook_event_repo import enqueue_webhook_event
+
+    event_id = event_id or f"local-{uuid.uuid4().hex}"
+    payload = json.dumps({'handler': handler, 'data': data})
+    if not enqueue_webhook_event(source, event_id, ordering_key, payload, WORKER_ID, WEBHOOK_QUEUE_LEASE_SECONDS):
+        return False
+    _dispatch({'source': source, 'event_id': event_id, 'ordering_key': ordering_key, 'payload': payload})
+    return True
+
+
+async def _process(event: Dict):
+    from repositories.webhook_event_repo import complete_webhook_event, fail_webhook_event
+
+    source, event_id = event['source'], event['event_id']
+    try:
+        payload = json.loads(event['payload'])
+        handler = _handlers.get(payload['handler'])
+        if handler is None:
+            raise ValueError(f"No webhook handler registered for {payload['handler']}")
+        await handler(payload['data'])
+    except Exception as e:
+        logger.error(f"❌ Queued webhook {source}/{event_id} failed: {e}", exc_info=True)
+        retry = await asyncio.to_thread(
+            fail_webhook_event, source, event_id, f"{type(e).__name__}: {e}",
+            WEBHOOK_QUEUE_MAX_ATTEMPTS, WEBHOOK_QUEUE_RETRY_SECONDS
+        )
+        if not retry:
+            logger.error(f"❌ Giving up on webhook {source}/{event_id} after {WEBHOOK_QUEUE_MAX_ATTEMPTS} attempts")
+        return
+    await asyncio.to_thread(complete_webhook_event, source, event_id)
+
+
+async def _worker(queue: asyncio.Queue):
+    while True:
+        event = await queue.get()
+        try:
+            await _process(event)
+        except Exception as e:
+            logger.error(f"❌ Webhook worker error: {e}", exc_info=True)
+        finally:
+            _in_flight.discard((event['source'], event['event_id']))
+            queue.task_done()
+
+
+async def _maintain_leases():
+    """Heartbeat: renew this process's leases, then take over queued events
+    whose lease expired (failed and due for a retry, or of a stopped process)"""
+    from repositories.webhook_event_repo import claim_expired_webhook_events, renew_webhook_leases
+
+    while True:
+        try:
+            await asyncio.to_thread(renew_webhook_leases, WORKER_ID, WEBHOOK_QUEUE_LEASE_SECONDS)
+            for event in await asyncio.to_thread(
+                claim_expired_webhook_events, WORKER_ID, WEBHOOK_QUEUE_LEASE_SECONDS
+            ):
+                _dispatch(event)
+        except Exception as e:
+            logger.error(f"Failed to maintain queued webhook leases: {e}", exc_info=True)
+        await asyncio.sleep(WEBHOOK_QUEUE_LEASE_SECONDS / 3)
+
+
+def start_webhook_workers(workers: int = WEBHOOK_WORKERS):
+    """Start the worker pool (on application startup, queue mode only)"""
+    if WEBHOOK_INGESTION_MODE != "queue" or _worker_tasks:
+        return
+    for _ in range(max(1, workers)):
+        queue = asyncio.Queue()
+        _worker_queues.append(queue)
+        _worker_tasks.append(asyncio.create_task(_worker(queue)))
+    _worker_tasks.append(asyncio.create_task(_maintain_leases()))
+    logger.info(f"📥 Queued webhook ingestion enabled with {len(_worker_queues)} workers")
+
+
+async def stop_webhook_workers(timeout: float = 10):
+    """Finish the events already taken (up to timeout), then stop the workers
+    and release the leases of the events left"""
+    from repositories.webhook_event_repo import release_webhook_leases
+
+    if not _worker_tasks:
+        return
+    try:
+        await asyncio.wait_for(asyncio.gather(*(queue.join() for queue in _worker_queues)), timeout)
+    except asyncio.TimeoutError:
+        logger.warning("Stopping webhook workers with events left; they will be recovered from the queue")
+    for task in _worker_tasks:
+        task.cancel()
+    await asyncio.gather(*_worker_tasks, return_exceptions=True)
+    try:
+        await asyncio.to_thread(release_webhook_leases, WORKER_ID)
+    except Exception as e:
+        logger.error(f"Failed to release queued webhook leases: {e}", exc_info=True)
+    _worker_tasks.clear()
+    _worker_queues.clear()
+    _in_flight.clear()
@@ -1,12 +1,15 @@
 """
 WhatsApp Service - Handle WhatsApp messaging via Twilio
 """
+import asyncio
 import logging
-from typing import Optional
+import xml.etree.ElementTree as ElementTree
+from typing import List, Optional
 from models.order import Order
 from models.notification import RestaurantNotification
 from repositories.notification_repo import create_notification
 from repositories.settings_repo import get_settings_by_restaurant_id
+from services.metrics_service import time_external_call
 
 logger = logging.getLogger(__name__)
 
@@ -58,11 +61,13 @@ async def send_whatsapp_message(to_number: str, message: str, interactive_button
                         formatted_message += f"📌 {btn.get('title', btn.get('id', ''))}\n"
                         formatted_message += f"   → {btn.get('command', '')}\n\n"
                 
-                message_obj = client.messages.create(
-                    from_=TWILIO_WHATSAPP_NUMBER,
-                    to=to_number,
-                    body=formatted_message
-                )
+                with time_external_call("twilio", "send_message"):
+                    message_obj = await asyncio.to_thread(
+                        client.messages.create,
+                        from_=TWILIO_WHATSAPP_NUMBER,
+                        to=to_number,
+                        body=formatted_message
+                    )
                 logger.info(f"✅ WhatsApp interactive message sent to {to_number}: {message_obj.sid}")
                 return message_obj
             except Exception as e:
@@ -70,11 +75,15 @@ async def send_whatsapp_message(to_number: str, message: str, interactive_button
                 # Fall through to regular message
         
         # Regular message (no interactive buttons or fallback)
-        message_obj = client.messages.create(
-            from_=TWILIO_WHATSAPP_NUMBER,
-            to=to_number,
-            body=message
-        )
+        # The Twilio client is synchronous: run the HTTP call in a thread so
+        # it does not stall the event loop
+        with time_external_call("twilio", "send_message"):
+            message_obj = await asyncio.to_thread(
+                client.messages.create,
+                from_=TWILIO_WHATSAPP_NUMBER,
+                to=to_number,
+                body=message
+            )
         logger.info(f"✅ WhatsApp message sent successfully to {to_number}: {message_obj.sid}")
         return message_obj
     except Exception as e:
@@ -286,6 +295,14 @@ async def send_upi_payment_link(customer_phone: str, restaurant, order, amount:
         raise
 
 
+def twiml_message_bodies(twiml) -> List[str]:
+    """Text of the <Message> elements of a TwiML reply (to send them through the API instead)"""
+    root = ElementTree.fromstring(twiml)
+    return [
+        message.findtext("Body") or message.text or ""
+        for message in root.iter("Message")
+    ]
+
 def format_phone_number(phone: str) -> str:
     """Format phone number for WhatsApp (remove whatsapp: prefix, ensure country code)"""
     phone = phone.strip()
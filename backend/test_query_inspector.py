@@ -0,0 +1,96 @@
+"""
+Test script for query counts on the hot endpoints
+Seeds a few synthetic tenants (benchmarks/synthetic_data.py) and checks with
+the query inspector that the order listing, the webhook owner routing and the
+public restaurant listing issue no statement in a loop.
+
+Needs DATABASE_URL; everything created is removed afterwards.
+Run with pytest or directly: python test_query_inspector.py
+"""
+import asyncio
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+
+from fastapi.testclient import TestClient
+
+import auth
+from main import app
+from routers.webhook import process_restaurant_owner_command
+from services.query_inspector import assert_no_query_problems
+from synthetic_data import cleanup_database, generate_tenants, seed_database
+
+# Enough rows that a per-row query would exceed the repeat threshold
+RESTAURANTS = 12
+ORDERS_PER_RESTAURANT = 40
+
+# Only repeats are under test here; latency depends on the machine
+SLOW_QUERY_MS = 10_000
+
+data = None
+client = TestClient(app)
+
+
+def setup_module(module=None):
+    global data
+    data = generate_tenants(restaurants=RESTAURANTS, products=10, customers=50,
+                            orders=ORDERS_PER_RESTAURANT, history_days=7, seed=7)
+    seed_database(data)
+
+
+def teardown_module(module=None):
+    cleanup_database()
+
+
+def test_order_listing():
+    """GET /api/v1/orders: orders, their items and the restaurant in a fixed number of queries"""
+    tenant = data.tenants[0]
+    token = auth.create_access_token(tenant.user['id'], tenant.restaurant['id'])
+
+    with assert_no_query_problems(max_repeats=1, slow_query_ms=SLOW_QUERY_MS, max_queries=5):
+        response = client.get("/api/v1/orders", params={"limit": ORDERS_PER_RESTAURANT},
+                              headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200, response.text
+    assert len(response.json()) == ORDERS_PER_RESTAURANT
+
+
+def test_owner_routing():
+    """Webhook owner lookup: one query whether or not the sender owns a restaurant"""
+    owner_phone = data.tenants[-1].restaurant['phone']
+
+    # No such order: the command is recognised but nothing is sent
+    with assert_no_query_problems(max_repeats=1, slow_query_ms=SLOW_QUERY_MS, max_queries=3):
+        assert asyncio.run(process_restaurant_owner_command(owner_phone, "ACCEPT zzzzzzzz")) is None
+
+    with assert_no_query_problems(max_repeats=1, slow_query_ms=SLOW_QUERY_MS, max_queries=1):
+        assert asyncio.run(process_restaurant_owner_command("+917100000000", "ACCEPT zzzzzzzz")) is None
+
+
+def test_public_restaurant_listing():
+    """GET /api/public/restaurants (main.get_filtered_restaurants), with and without a location"""
+    restaurant = data.restaurants[0]
+
+    with assert_no_query_problems(max_repeats=1, slow_query_ms=SLOW_QUERY_MS, max_queries=3):
+        response = client.get("/api/public/restaurants")
+    assert response.status_code == 200, response.text
+    listed = {row['id'] for row in response.json()['restaurants']}
+    assert {row['id'] for row in data.restaurants} <= listed
+
+    # A cold geo index first loads the restaurants and their ratings (4 statements)
+    with assert_no_query_problems(max_repeats=1, slow_query_ms=SLOW_QUERY_MS, max_queries=6):
+        response = client.get("/api/public/restaurants", params={
+            "latitude": restaurant['latitude'], "longitude": restaurant['longitude'], "max_distance": 100,
+        })
+    assert response.status_code == 200, response.text
+    assert restaurant['id'] in {row['id'] for row in response.json()['restaurants']}
+
+
+if __name__ == "__main__":
+    setup_module()
+    try:
+        for test in (test_order_listing, test_owner_routing, test_public_restaurant_listing):
+            test()
+            print(f"✅ {test.__name__}")
+    finally:
+        teardown_module()
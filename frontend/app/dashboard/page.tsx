@@ -1,6 +1,6 @@
 'use client';
 
-import { useEffect, useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import { useRouter } from 'next/navigation';
 import { apiClient, DashboardStats, Order, Product, RestaurantInfo } from '@/lib/api';
 
@@ -8,6 +8,9 @@ export default function DashboardPage() {
   const router = useRouter();
   const [stats, setStats] = useState<DashboardStats | null>(null);
   const [orders, setOrders] = useState<Order[]>([]);
+  // Watermark for /orders/changes and the order list it is merged into
+  const changesWatermark = useRef<string | null>(null);
+  const ordersRef = useRef<Order[]>([]);
   const [menu, setMenu] = useState<Product[]>([]);
   const [loading, setLoading] = useState(true);
   const [isRefreshing, setIsRefreshing] = useState(false);
@@ -133,6 +136,8 @@ export default function DashboardPage() {
       if (isInitialLoad) {
       setLoading(true);
       }
+      // Watermark taken before the full load, so no change falls in between
+      const changes = await apiClient.getOrderChanges().catch(() => null);
       // Try to fetch data with error handling for each request
       const [statsData, ordersData, menuData] = await Promise.all([
         apiClient.getDashboardStats().catch(err => {
@@ -201,6 +206,8 @@ export default function DashboardPage() {
         setStats(statsData);
       }
       setOrders(validOrders);
+      ordersRef.current = validOrders;
+      changesWatermark.current = changes ? changes.watermark : null;
       if (Array.isArray(menuData)) {
         setMenu(menuData);
       }
@@ -221,11 +228,27 @@ export default function DashboardPage() {
   const fetchDataSilently = async () => {
     try {
       setIsRefreshing(true);
-      const [statsData, ordersData] = await Promise.all([
-        apiClient.getDashboardStats(),
-        apiClient.getOrders()
-      ]);
+      const since = changesWatermark.current;
+      const changes = since ? await apiClient.getOrderChanges(since) : null;
+      if (!changes || changes.full_reload) {
+        // No watermark yet or too many changes: reload everything
+        await fetchData(false);
+        return;
+      }
+      changesWatermark.current = changes.watermark;
+      if (changes.orders.length === 0) {
+        return;
+      }
       
+      // Merge changed orders into the current list (newest first)
+      const byId = new Map(ordersRef.current.map(order => [order.id, order]));
+      const addedOrders = changes.orders.filter(order => !byId.has(order.id)).length;
+      changes.orders.forEach(order => byId.set(order.id, order));
+      const ordersData = Array.from(byId.values()).sort(
+        (a, b) => new Date(b.created_at).getTime() - new Date(a.created_at).getTime()
+      );
+      
+
       // Check for orders in each status that need attention
       const pendingOrders = ordersData.filter(order => order.status.toLowerCase() === 'pending');
       const preparingOrders = ordersData.filter(order => order.status.toLowerCase() === 'preparing');
@@ -270,8 +293,19 @@ export default function DashboardPage() {
       }
       
       // Update data silently without causing visual jumps
-      setStats(statsData);
+      const changeStats = changes.stats;
+      if (changeStats) {
+        setStats(prev => prev ? {
+          ...prev,
+          total_orders: prev.total_orders + addedOrders,
+          pending_orders: changeStats.pending_orders,
+          preparing_orders: changeStats.preparing_orders,
+          ready_orders: changeStats.ready_orders,
+          today_orders: changeStats.today_orders
+        } : prev);
+      }
       setOrders(ordersData);
+      ordersRef.current = ordersData;
     } catch (err) {
       // Silently fail on background refresh - don't show error to user
       console.error('Background refresh failed:', err);
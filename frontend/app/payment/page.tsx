@@ -38,7 +38,8 @@ export default function PaymentPage() {
     // Cleanup polling on unmount
     return () => {
       if (pollingIntervalRef.current) {
-        clearInterval(pollingIntervalRef.current);
+        clearTimeout(pollingIntervalRef.current);
+        pollingIntervalRef.current = null;
       }
     };
   }, [orderId]);
@@ -77,10 +78,13 @@ export default function PaymentPage() {
   };
 
   const startPaymentPolling = (paymentLinkId: string) => {
-    // Poll every 3 seconds for payment status
-    pollingIntervalRef.current = setInterval(async () => {
+    // Long-poll: each request is held by the backend until the status changes (up to 8 seconds)
+    let lastStatus: string | undefined;
+    const poll = async () => {
+      let delay = 0;
       try {
-        const status = await apiClient.getPaymentStatus(paymentLinkId);
+        const status = await apiClient.getPaymentStatus(paymentLinkId, 8, lastStatus);
+        lastStatus = status.status;
         
         if (status.status === 'paid') {
           // Payment successful!
@@ -88,7 +92,7 @@ export default function PaymentPage() {
           
           // Stop polling
           if (pollingIntervalRef.current) {
-            clearInterval(pollingIntervalRef.current);
+            clearTimeout(pollingIntervalRef.current);
             pollingIntervalRef.current = null;
           }
           
@@ -99,22 +103,30 @@ export default function PaymentPage() {
           setTimeout(() => {
             router.push('/');
           }, 3000);
-        } else if (status.status === 'cancelled') {
+          return;
+        } else if (status.status === 'cancelled' || status.status === 'expired') {
           // Payment cancelled
           setPaymentStatus('failed');
           
           // Stop polling
           if (pollingIntervalRef.current) {
-            clearInterval(pollingIntervalRef.current);
+            clearTimeout(pollingIntervalRef.current);
             pollingIntervalRef.current = null;
           }
+          return;
         }
         // Continue polling if status is 'created' or 'pending'
       } catch (err) {
         console.error('Error polling payment status:', err);
-        // Continue polling on error
+        // Continue polling on error, after a pause
+        delay = 3000;
       }
-    }, 3000); // Poll every 3 seconds
+      // Stopped while the request was in flight (unmount)
+      if (pollingIntervalRef.current) {
+        pollingIntervalRef.current = setTimeout(poll, delay);
+      }
+    };
+    pollingIntervalRef.current = setTimeout(poll, 0);
   };
 
   const handlePaymentClick = () => {
@@ -88,6 +88,29 @@ export interface DashboardStats {
   today_orders: number;
 }
 
+export interface PaymentLinkStatus {
+  payment_link_id: string;
+  status: string;
+  amount: number;
+  order_id?: string | null;
+  paid_at?: number | null;
+}
+
+export interface OrderChangesStats {
+  pending_orders: number;
+  preparing_orders: number;
+  ready_orders: number;
+  today_orders: number;
+  today_revenue: number;
+}
+
+export interface OrderChanges {
+  orders: Order[];
+  watermark: string;
+  full_reload: boolean;
+  stats?: OrderChangesStats | null;
+}
+
 export interface RestaurantInfo {
   id: string;
   name: string;
@@ -424,6 +447,22 @@ class ApiClient {
     return this.request<Order[]>('/api/v1/orders');
   }
 
+  async getOrderChanges(since?: string): Promise<OrderChanges> {
+    const query = since ? `?since=${encodeURIComponent(since)}` : '';
+    return this.request<OrderChanges>(`/api/v1/orders/changes${query}`);
+  }
+
+  // wait: long-poll, the backend answers as soon as the status changes (keep below the 10s request timeout)
+  async getPaymentStatus(paymentLinkId: string, wait: number = 0, status?: string): Promise<PaymentLinkStatus> {
+    const params = new URLSearchParams({ wait: String(wait) });
+    if (status) {
+      params.set('status', status);
+    }
+    return this.request<PaymentLinkStatus>(
+      `/api/v1/payments/status/${encodeURIComponent(paymentLinkId)}?${params.toString()}`, {}, false
+    );
+  }
+
   async getOrder(orderId: string): Promise<Order> {
     return this.request<Order>(`/api/v1/orders/${orderId}`);
   }
@@ -622,15 +661,19 @@ class ApiClient {
     two_factor_enabled: boolean;
   }): Promise<{
     message: string;
-    user_id: string;
-    owner_name: string;
-    owner_email: string;
-    two_factor_enabled: boolean;
+    token?: string | null;
   }> {
-    return this.request('/api/v1/auth/account', {
+    const response = await this.request<{ message: string; token?: string | null }>('/api/v1/auth/account', {
       method: 'PUT',
       body: JSON.stringify(settings),
     });
+    
+    // A password change revokes the current token; keep the session on the new one
+    if (response.token) {
+      setToken(response.token);
+    }
+    
+    return response;
   }
 
   // Public API (no authentication required) - for customers ordering via WhatsApp